@@ -0,0 +1,253 @@
+"""
+Modo batch: documenta vários repositórios de um manifesto em um único processo.
+
+Uso: python batch.py manifesto.txt [--fetch-concurrency 4] [--doc-concurrency 2] [--report batch_report.json]
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dotenv import load_dotenv
+
+from modules import worker_pool
+from modules.analysis_cache import get_default_cache
+from modules.code_analyzer import ANALYSIS_CACHE, FILE_MEMORY_MB, FILE_TIMEOUT_SECONDS
+from modules.documentation_builder import DEFAULT_CHUNK_TOKENS, DEFAULT_LLM_CONCURRENCY
+from modules.git_fetcher import repo_name_from_url
+from modules.telemetry import export, span
+from orquestrador import ProjectOrchestrator
+
+# Limites padrão por etapa: clones são I/O, a análise já usa todos os núcleos, a API tem limite de taxa
+DEFAULT_FETCH_CONCURRENCY = 4
+DEFAULT_ANALYSIS_CONCURRENCY = 1
+DEFAULT_DOC_CONCURRENCY = 2
+
+# Opções por repositório aceitas no manifesto JSONL (repassadas ao ProjectOrchestrator)
+MANIFEST_OPTIONS = ("ref", "depth", "blobless", "max_commits", "since", "exclude_dirs", "chunked", "ranking_mode", "prompt_tokens",
+                    "dedup", "bare", "shard")
+
+def read_manifest(path):
+    """
+    Lê o manifesto: uma entrada por linha, como URL/caminho simples ou objeto JSON
+    ({"url": ..., "depth": 1, ...}; ver MANIFEST_OPTIONS). Linhas vazias e comentários (#) são ignorados.
+    Caminhos locais existentes viram caminhos absolutos.
+    """
+    entries = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("{"):
+                try:
+                    entry = json.loads(line)
+                except ValueError as e:
+                    raise ValueError(f"{path}:{line_number}: JSON inválido ({e})")
+                if not entry.get("url"):
+                    raise ValueError(f"{path}:{line_number}: entrada sem 'url'")
+            else:
+                entry = {"url": line}
+            if os.path.isdir(entry["url"]):
+                entry["url"] = os.path.abspath(entry["url"])
+            entries.append(entry)
+    return entries
+
+class ThreadRoutedStdout:
+    """
+    Substitui o sys.stdout durante o batch (ou o serviço): o que cada thread de repositório imprime
+    vai para o log daquele repositório, e o restante (progresso) continua no terminal.
+    """
+
+    def __init__(self, fallback):
+        self.fallback = fallback
+        self.local = threading.local()
+
+    def route(self, stream):
+        self.local.stream = stream
+
+    def _target(self):
+        return getattr(self.local, "stream", None) or self.fallback
+
+    def write(self, text):
+        return self._target().write(text)
+
+    def flush(self):
+        self._target().flush()
+
+    def __getattr__(self, name):
+        return getattr(self.fallback, name)
+
+def _evict_repo_analyses(repo_path):
+    # O cache em memória é por caminho: sem isso ele cresceria com todos os repositórios do catálogo
+    prefix = os.path.join(repo_path, "")
+    for filepath in [filepath for filepath in ANALYSIS_CACHE if filepath.startswith(prefix)]:
+        del ANALYSIS_CACHE[filepath]
+
+def stage_limits(fetch_concurrency=DEFAULT_FETCH_CONCURRENCY, analysis_concurrency=DEFAULT_ANALYSIS_CONCURRENCY,
+                 doc_concurrency=DEFAULT_DOC_CONCURRENCY):
+    """Um semáforo por etapa do pipeline, compartilhado por todas as threads de repositório."""
+    return {
+        "fetch": threading.BoundedSemaphore(fetch_concurrency),
+        "classify": threading.BoundedSemaphore(fetch_concurrency),
+        "commits": threading.BoundedSemaphore(fetch_concurrency),
+        "analyze": threading.BoundedSemaphore(analysis_concurrency),
+        "document": threading.BoundedSemaphore(doc_concurrency),
+        "pull_request": threading.BoundedSemaphore(doc_concurrency),
+    }
+
+def run_repository(entry, defaults, limits, log_dir, create_pr, router, log_name=None):
+    """
+    Executa o pipeline de um repositório, etapa por etapa, respeitando o limite de cada etapa.
+    A saída vai para `<log_dir>/<log_name ou nome do repositório>.log`.
+    """
+    url = entry["url"]
+    name = repo_name_from_url(url) or url
+    result = {"url": url, "name": name, "status": "ok", "error": None, "doc_path": None, "stages": {}, "waited": 0.0}
+    options = dict(defaults, **{key: entry[key] for key in MANIFEST_OPTIONS if key in entry})
+    started = time.perf_counter()
+
+    def stage(stage_name, fn):
+        queued = time.perf_counter()
+        with limits[stage_name]:
+            stage_started = time.perf_counter()
+            # Tempo parado na fila da etapa: mostra qual limite de concorrência está segurando o batch
+            result["waited"] = round(result["waited"] + stage_started - queued, 3)
+            with span(stage_name, repo=name):
+                value = fn()
+            result["stages"][stage_name] = round(time.perf_counter() - stage_started, 3)
+            return value
+
+    with open(os.path.join(log_dir, f"{log_name or name}.log"), "w", encoding="utf-8") as log:
+        router.route(log)
+        orchestrator = None
+        try:
+            orchestrator = ProjectOrchestrator(url, **options)
+            stage("fetch", orchestrator.fetch_repository)
+            result["repo_path"] = orchestrator.repo_path
+            stage("classify", orchestrator.classify_files)
+            stage("commits", orchestrator.read_commits)
+            stage("analyze", orchestrator.analyze_codebase)
+            result["doc_path"] = stage("document", orchestrator.build_documentation)
+            if not result["doc_path"]:
+                result["status"] = "no_docs"
+            elif create_pr:
+                result["pr_url"] = stage("pull_request", orchestrator.create_pull_request)
+        except Exception as e:
+            result["status"] = "error"
+            result["error"] = f"{e.__class__.__name__}: {e}"
+            print(f"[batch] Erro: {result['error']}")
+        finally:
+            if orchestrator is not None:
+                orchestrator.close()
+            router.route(None)
+            if result.get("repo_path"):
+                _evict_repo_analyses(result["repo_path"])
+
+    result["seconds"] = round(time.perf_counter() - started, 3)
+    return result
+
+def run_batch(manifest_path, report_path="batch_report.json", log_dir=os.path.join(".repos", ".batch_logs"),
+              fetch_concurrency=DEFAULT_FETCH_CONCURRENCY, analysis_concurrency=DEFAULT_ANALYSIS_CONCURRENCY,
+              doc_concurrency=DEFAULT_DOC_CONCURRENCY, create_pr=False, **defaults):
+    """
+    Documenta todos os repositórios do manifesto em um único processo.
+
+    Cada repositório percorre fetch → classificação → commits → análise → documentação em uma
+    thread própria, e cada etapa tem seu próprio limite de concorrência: enquanto um repositório
+    é analisado, outros são clonados ou aguardam a API. Caches (clones, análise por SHA de blob,
+    respostas da API) e o cliente HTTP com limites de taxa são compartilhados entre todos.
+    `defaults` são repassados ao ProjectOrchestrator (ex: jobs, max_commits, chunked).
+
+    Grava em `report_path` um relatório com status, tempo por etapa e erro de cada repositório.
+    """
+    entries = read_manifest(manifest_path)
+    os.makedirs(log_dir, exist_ok=True)
+    # Workers de análise criados a partir de um processo com várias threads não podem usar fork
+    worker_pool.use_thread_safe_start_method()
+
+    limits = stage_limits(fetch_concurrency, analysis_concurrency, doc_concurrency)
+    print(f"[batch] {len(entries)} repositório(s) no manifesto. Logs em: {log_dir}")
+
+    router = ThreadRoutedStdout(sys.stdout)
+    sys.stdout = router
+    started = time.perf_counter()
+    results = []
+    try:
+        # Threads suficientes para manter todas as etapas ocupadas ao mesmo tempo
+        with ThreadPoolExecutor(max_workers=fetch_concurrency + analysis_concurrency + doc_concurrency) as executor:
+            futures = {executor.submit(run_repository, entry, defaults, limits, log_dir, create_pr, router): index
+                       for index, entry in enumerate(entries)}
+            for number, future in enumerate(as_completed(futures), 1):
+                result = future.result()
+                results.append((futures[future], result))
+                router.fallback.write(f"[batch] ({number}/{len(entries)}) {result['name']}: {result['status']} "
+                                      f"em {result['seconds']:.1f}s\n")
+    finally:
+        sys.stdout = router.fallback
+    # O relatório segue a ordem do manifesto, não a de conclusão
+    results = [result for _, result in sorted(results, key=lambda item: item[0])]
+
+    report = {
+        "manifest": manifest_path,
+        "seconds": round(time.perf_counter() - started, 3),
+        "totals": {status: sum(1 for r in results if r["status"] == status) for status in ("ok", "no_docs", "error")},
+        "analysis_cache": get_default_cache().stats(),
+        "repos": results,
+    }
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    totals = report["totals"]
+    print(f"[batch] Concluído em {report['seconds']:.1f}s: {totals['ok']} ok, {totals['no_docs']} sem documentação, "
+          f"{totals['error']} com erro. Relatório: {report_path}")
+    return report
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Documenta vários repositórios a partir de um manifesto.")
+    parser.add_argument("manifest", help="Arquivo com uma URL/caminho por linha ou objetos JSON ({\"url\": ...}) por linha")
+    parser.add_argument("--report", default="batch_report.json", help="Relatório JSON com status e tempos por repositório")
+    parser.add_argument("--log-dir", default=os.path.join(".repos", ".batch_logs"), help="Diretório dos logs por repositório")
+    parser.add_argument("--fetch-concurrency", type=int, default=DEFAULT_FETCH_CONCURRENCY, help="Clones/fetches simultâneos")
+    parser.add_argument("--analysis-concurrency", type=int, default=DEFAULT_ANALYSIS_CONCURRENCY,
+                        help="Repositórios analisados ao mesmo tempo (cada um com --jobs processos)")
+    parser.add_argument("--doc-concurrency", type=int, default=DEFAULT_DOC_CONCURRENCY,
+                        help="Repositórios gerando documentação (chamando a API) ao mesmo tempo")
+    parser.add_argument("--jobs", "-j", type=int, default=0, help="Processos para a análise de código (0 = todos os núcleos)")
+    parser.add_argument("--max-commits", type=int, default=500, help="Máximo de commits lidos do histórico (0 = todos)")
+    parser.add_argument("--depth", type=int, default=None, help="Clone raso com os N commits mais recentes")
+    parser.add_argument("--blobless", action="store_true", help="Clone parcial sem blobs (--filter=blob:none)")
+    parser.add_argument("--bare", action="store_true", help="Lê os arquivos direto do banco de objetos do Git (clone bare, sem checkout da working tree)")
+    parser.add_argument("--incremental", action="store_true", help="Reanalisa apenas os arquivos alterados desde o último README gerado")
+    parser.add_argument("--chunked", action="store_true", help="Gera a documentação em map-reduce, com um lote de arquivos por chamada")
+    parser.add_argument("--chunk-tokens", type=int, default=DEFAULT_CHUNK_TOKENS, help="Orçamento de tokens por lote no modo --chunked")
+    parser.add_argument("--shard", action="store_true", help="Monorepos: um README por subprojeto e um índice na raiz")
+    parser.add_argument("--llm-concurrency", type=int, default=DEFAULT_LLM_CONCURRENCY, help="Chamadas simultâneas à API no modo --chunked")
+    parser.add_argument("--no-llm-cache", action="store_true", help="Ignora o cache de respostas da API e sempre chama o modelo")
+    parser.add_argument("--file-timeout", type=float, default=FILE_TIMEOUT_SECONDS,
+                        help="Tempo máximo (s) de análise por arquivo em worker isolado (0 = sem limite)")
+    parser.add_argument("--file-memory-mb", type=int, default=FILE_MEMORY_MB,
+                        help="Memória máxima (MB) do worker que analisa cada arquivo (0 = sem limite)")
+    parser.add_argument("--create-pr", action="store_true", help="Abre um Pull Request em cada repositório documentado")
+    parser.add_argument("--trace", default=None, metavar="ARQUIVO", help="Grava spans, tempos por arquivo e chamadas à API em JSON lines")
+    parser.add_argument("--chrome-trace", default=None, metavar="ARQUIVO", help="Grava o trace no formato do Chrome (chrome://tracing, Perfetto)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    load_dotenv()
+    args = parse_args(argv)
+    try:
+        report = run_batch(args.manifest, report_path=args.report, log_dir=args.log_dir,
+                           fetch_concurrency=args.fetch_concurrency, analysis_concurrency=args.analysis_concurrency,
+                           doc_concurrency=args.doc_concurrency, create_pr=args.create_pr,
+                           jobs=args.jobs, max_commits=args.max_commits, depth=args.depth, blobless=args.blobless, bare=args.bare,
+                           incremental=args.incremental, chunked=args.chunked, chunk_tokens=args.chunk_tokens,
+                           shard=args.shard, llm_concurrency=args.llm_concurrency, llm_cache=not args.no_llm_cache,
+                           file_timeout=args.file_timeout, file_memory_mb=args.file_memory_mb)
+    finally:
+        export(args.trace, args.chrome_trace)
+    sys.exit(1 if report["totals"]["error"] else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Benchmark de memória da análise: registros compactos (modules/symbols.py) contra a
+representação anterior (dicts com uma cópia do código de cada construção em `code_block`).
+
+Gera uma árvore sintética com ~100 mil símbolos, analisa todos os arquivos e mantém o
+resultado em memória como o pipeline faz até montar o prompt. Cada representação roda em
+um processo novo, que reporta o pico de memória residente (RSS) e o tamanho retido (tracemalloc).
+
+Uso: python -m benchmarks.bench_memory [--symbols 100000] [--file-kb 8] [--json]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import tracemalloc
+
+from benchmarks.synthetic import GENERATORS
+from modules.symbols import code_text, read_source
+
+try:
+    import resource
+except ImportError:  # Windows: sem pico de RSS
+    resource = None
+
+def _copy(text):
+    # Sem internação: cada casamento de regex/nó da AST gerava uma string nova
+    return text.encode("utf-8").decode("utf-8")
+
+def _legacy_function(function, source):
+    return {"name": _copy(function.name), "args": [_copy(arg) for arg in function.args],
+            "docstring": function.docstring, "async": function.is_async, "code_block": code_text(source, function)}
+
+def legacy_analysis(analysis, source):
+    """Reconstrói a análise no formato anterior: listas de dicts com o código copiado."""
+    legacy = {key: value for key, value in analysis.items() if key not in ("imports", "functions", "classes", "constants", "endpoints")}
+    legacy["imports"] = [{"name": _copy(s.name), "code_block": code_text(source, s)} for s in analysis["imports"]]
+    legacy["functions"] = [_legacy_function(s, source) for s in analysis["functions"]]
+    legacy["classes"] = [{"name": _copy(s.name), "bases": [_copy(b) for b in s.bases], "docstring": s.docstring,
+                          "methods": [_legacy_function(m, source) for m in s.methods]} for s in analysis["classes"]]
+    legacy["constants"] = [{"name": _copy(s.name), ("value" if s.has_value else "code_block"): code_text(source, s)}
+                           for s in analysis["constants"]]
+    legacy["endpoints"] = [{"method": _copy(s.method), "path": _copy(s.path)} for s in analysis["endpoints"]]
+    return legacy
+
+def count_symbols(analysis):
+    return (len(analysis["imports"]) + len(analysis["functions"]) + len(analysis["constants"])
+            + len(analysis["endpoints"]) + sum(1 + len(cls.methods) for cls in analysis["classes"]))
+
+def write_tree(root, symbols, file_kb, seed=0):
+    """Grava arquivos de Python, JS e Java até somar ~`symbols` símbolos. Retorna a lista de caminhos."""
+    from modules.code_analyzer import analyze_code
+
+    paths, total, index = [], 0, 0
+    extensions = list(GENERATORS)
+    while total < symbols:
+        ext = extensions[index % len(extensions)]
+        path = os.path.join(root, f"pkg{index // 100}", f"module_{index}.{ext}")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(GENERATORS[ext](file_kb * 1024, seed=seed + index))
+        total += count_symbols(analyze_code(path, use_disk_cache=False))
+        paths.append(path)
+        index += 1
+    return paths
+
+def _rss_kb():
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+def _measure(representation, paths, queue):
+    """Executado em um processo novo: analisa tudo e mantém o resultado na representação pedida."""
+    from modules.code_analyzer import ANALYSIS_CACHE, analyze_code
+
+    baseline_kb = _rss_kb()
+    tracemalloc.start()
+    code_analysis, symbols = {}, 0
+    for path in paths:
+        analysis = analyze_code(path, use_disk_cache=False)
+        # O cache em memória por caminho também seguraria a análise: fica só o que o pipeline guarda
+        ANALYSIS_CACHE.clear()
+        symbols += count_symbols(analysis)
+        if representation == "dicts":
+            analysis = legacy_analysis(analysis, read_source(path))
+        code_analysis[path] = analysis
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    peak_kb = _rss_kb()
+    queue.put({
+        "representation": representation,
+        "files": len(code_analysis),
+        "symbols": symbols,
+        "retained_mb": round(retained / (1024 * 1024), 2),
+        "peak_rss_mb": round(peak_kb / 1024, 1) if peak_kb else None,
+        "peak_rss_over_baseline_mb": round((peak_kb - baseline_kb) / 1024, 1) if peak_kb else None,
+    })
+
+def run(symbols=100_000, file_kb=8, seed=0):
+    root = tempfile.mkdtemp(prefix="codoc-memory-")
+    try:
+        paths = write_tree(root, symbols, file_kb, seed=seed)
+        source_bytes = sum(os.path.getsize(path) for path in paths)
+        ctx = multiprocessing.get_context("spawn")
+        results = []
+        for representation in ("dicts", "records"):
+            queue = ctx.Queue()
+            process = ctx.Process(target=_measure, args=(representation, paths, queue))
+            process.start()
+            results.append(queue.get())
+            process.join()
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+    return {"config": {"symbols": symbols, "file_kb": file_kb, "seed": seed},
+            "source_mb": round(source_bytes / (1024 * 1024), 2), "results": results}
+
+def main():
+    parser = argparse.ArgumentParser(description="Memória da análise: registros compactos vs. dicts com código copiado.")
+    parser.add_argument("--symbols", type=int, default=100_000, help="Total aproximado de símbolos na árvore sintética")
+    parser.add_argument("--file-kb", type=int, default=8, help="Tamanho aproximado de cada arquivo")
+    parser.add_argument("--seed", type=int, default=0, help="Semente do gerador")
+    parser.add_argument("--json", action="store_true", help="Emite os resultados em JSON")
+    args = parser.parse_args()
+
+    results = run(args.symbols, args.file_kb, args.seed)
+    if args.json:
+        print(json.dumps(results, indent=2, ensure_ascii=False))
+        return
+    print(f"Árvore sintética: {results['results'][0]['files']} arquivos, {results['source_mb']:.1f} MB de código")
+    print(f"{'representação':<14} {'símbolos':>9} {'retido MB':>10} {'pico RSS MB':>12} {'acima da base':>14}")
+    for item in results["results"]:
+        print(f"{item['representation']:<14} {item['symbols']:>9} {item['retained_mb']:>10.1f} "
+              f"{item['peak_rss_mb']:>12.1f} {item['peak_rss_over_baseline_mb']:>14.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""
+Benchmark de ponta a ponta do pipeline sobre um repositório sintético.
+
+Gera um repositório bare local (benchmarks/synthetic.py) e mede cada etapa isoladamente:
+clone e atualização (`fetch_repository`), `classify_files`, `read_commits`, análise de todos os
+arquivos (cache frio e quente), `build_killer_prompt` e `build_documentation` contra um servidor
+local que imita a API de chat completions. O resultado em JSON pode ser guardado por commit e
+comparado para pegar regressões. A inicialização de `main.py` (`--help`, `classify`, `analyze`) é
+medida em processos novos com `python -X importtime`.
+
+Uso: python -m benchmarks.bench_pipeline [--files-per-language 200] [--commits 500] [--json] [--output arquivo.json]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.synthetic import generate_repo
+from modules import analysis_cache, llm_client
+from modules.code_analyzer import ANALYSIS_CACHE, analyze_files
+from modules.commit_reader import read_commits
+from modules.documentation_builder import build_documentation, build_killer_prompt
+from modules.file_classifier import classify_files
+from modules.git_fetcher import fetch_repository
+
+CODE_CATEGORIES = ["backend", "frontend", "teste", "api"]
+
+TOOL_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Subcomandos do CLI cuja inicialização é medida com `-X importtime` ({repo} = clone sintético)
+STARTUP_COMMANDS = (("--help",), ("classify", "{repo}"), ("analyze", "{repo}"))
+
+class _StubLLMHandler(BaseHTTPRequestHandler):
+    """Responde a /chat/completions na hora, com um README fixo e o uso de tokens estimado."""
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        prompt_tokens = len(body) // 4
+        payload = json.dumps({
+            "choices": [{"message": {"role": "assistant", "content": "# README sintético\n\nGerado pelo stub.\n"}}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": 10, "total_tokens": prompt_tokens + 10},
+        }).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+@contextlib.contextmanager
+def stub_llm_server():
+    """Sobe o servidor stub em uma porta livre e aponta o cliente da API para ele, sem limites de taxa."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubLLMHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    overrides = {
+        "OPENAI_API_KEY": "stub",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{server.server_port}/v1",
+        "OPENAI_RPM": "0",
+        "OPENAI_TPM": "0",
+    }
+    previous = {key: os.environ.get(key) for key in overrides}
+    os.environ.update(overrides)
+    llm_client._DEFAULT_CLIENT = None
+    try:
+        yield
+    finally:
+        server.shutdown()
+        server.server_close()
+        llm_client._DEFAULT_CLIENT = None
+        for key, value in previous.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+def _timed(stages, name, fn):
+    """Executa `fn` sem a saída dos módulos e registra o tempo de relógio da etapa."""
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = fn()
+    stages[name] = {"seconds": round(time.perf_counter() - started, 4)}
+    return result
+
+def _import_times(stderr):
+    """Soma o tempo próprio de todos os imports e lista os de topo (nível 0) mais caros."""
+    total_us, top_level = 0, []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        total_us += int(self_us)
+        if not name.startswith("  "):
+            top_level.append((int(cumulative_us), name.strip()))
+    top = [{"module": name, "ms": round(us / 1000, 2)} for us, name in sorted(top_level, reverse=True)[:5]]
+    return round(total_us / 1000, 2), top
+
+def measure_startup(repo_path):
+    """Executa cada subcomando de STARTUP_COMMANDS com `python -X importtime` e mede imports e tempo total."""
+    startup = {}
+    for command in STARTUP_COMMANDS:
+        args = [arg.format(repo=repo_path) for arg in command]
+        started = time.perf_counter()
+        result = subprocess.run([sys.executable, "-X", "importtime", os.path.join(TOOL_ROOT, "main.py"), *args],
+                                capture_output=True, text=True)
+        seconds = time.perf_counter() - started
+        import_ms, top = _import_times(result.stderr)
+        startup[" ".join(command[:1])] = {"seconds": round(seconds, 4), "import_ms": import_ms,
+                                          "exit_code": result.returncode, "top_imports": top}
+    return startup
+
+def _environment():
+    git_version = subprocess.run(["git", "--version"], capture_output=True, text=True).stdout.strip()
+    tool_commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=TOOL_ROOT,
+                                 capture_output=True, text=True).stdout.strip()
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "git": git_version,
+        "commit": tool_commit or None,
+    }
+
+def run(files_per_language=100, file_kb=4, commits=200, vendored_files=100, huge_files=1, huge_file_mb=8,
+        jobs=1, seed=0, keep=False):
+    """
+    Gera o repositório sintético e mede cada etapa. Tudo (clone, caches em .repos/) fica em um
+    diretório temporário, para que cada execução comece a frio e não toque no diretório atual.
+    """
+    workdir = tempfile.mkdtemp(prefix="codoc-bench-")
+    original_cwd = os.getcwd()
+    stages = {}
+    try:
+        os.chdir(workdir)
+        # Caches de processo criados antes do chdir apontariam para o diretório errado
+        analysis_cache._DEFAULT_CACHE = None
+        ANALYSIS_CACHE.clear()
+
+        bare_path = os.path.join(workdir, "synthetic.git")
+        repo = _timed(stages, "generate", lambda: generate_repo(
+            bare_path, files_per_language=files_per_language, file_kb=file_kb, commits=commits,
+            vendored_files=vendored_files, huge_files=huge_files, huge_file_mb=huge_file_mb, seed=seed))
+        repo_url = f"file://{bare_path}"
+
+        repo_path = _timed(stages, "fetch_repository", lambda: fetch_repository(repo_url))
+        _timed(stages, "fetch_repository (atualização)", lambda: fetch_repository(repo_url))
+
+        classification = _timed(stages, "classify_files", lambda: classify_files(repo_path))
+        stages["classify_files"]["files"] = sum(len(files) for files in classification.values())
+
+        commits_by_author = _timed(stages, "read_commits", lambda: read_commits(repo_path, max_count=None))
+        stages["read_commits"]["commits"] = sum(len(commits) for commits in commits_by_author.values())
+
+        files_to_analyze = [f for category in CODE_CATEGORIES for f in classification.get(category, [])]
+        results = _timed(stages, "analyze_code (cache frio)", lambda: analyze_files(files_to_analyze, jobs=jobs))
+        stages["analyze_code (cache frio)"]["files"] = len(results)
+        stages["analyze_code (cache frio)"]["skipped"] = sum(1 for _, a in results if a.get("skipped"))
+        ANALYSIS_CACHE.clear()
+        _timed(stages, "analyze_code (cache quente)", lambda: analyze_files(files_to_analyze, jobs=jobs))
+
+        code_analysis = {
+            filepath: analysis for filepath, analysis in results
+            if not analysis.get("error") and any(analysis.get(k) for k in ("functions", "classes", "constants", "endpoints"))
+        }
+        prompt = _timed(stages, "build_killer_prompt",
+                        lambda: build_killer_prompt(repo_path, classification, commits_by_author, code_analysis))
+        stages["build_killer_prompt"]["chars"] = len(prompt)
+
+        with stub_llm_server():
+            _timed(stages, "build_documentation (stub)", lambda: build_documentation(
+                repo_path, classification, commits_by_author, code_analysis, use_cache=False))
+
+        # Inicialização do CLI em processos novos, como nos hooks de CI (caches de análise já quentes)
+        startup = measure_startup(repo_path)
+    finally:
+        os.chdir(original_cwd)
+        analysis_cache._DEFAULT_CACHE = None
+        if not keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        "config": {
+            "files_per_language": files_per_language, "file_kb": file_kb, "commits": commits,
+            "vendored_files": vendored_files, "huge_files": huge_files, "huge_file_mb": huge_file_mb,
+            "jobs": jobs, "seed": seed,
+        },
+        "repository": repo,
+        "environment": _environment(),
+        "stages": stages,
+        "startup": startup,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark das etapas do pipeline sobre um repositório sintético.")
+    parser.add_argument("--files-per-language", type=int, default=100, help="Arquivos de Python, JS e Java (cada)")
+    parser.add_argument("--file-kb", type=int, default=4, help="Tamanho aproximado de cada arquivo de código")
+    parser.add_argument("--commits", type=int, default=200, help="Commits no histórico")
+    parser.add_argument("--vendored-files", type=int, default=100, help="Arquivos em node_modules/ e vendor/")
+    parser.add_argument("--huge-files", type=int, default=1, help="Arquivos enormes (testam o filtro e o mmap)")
+    parser.add_argument("--huge-file-mb", type=int, default=8, help="Tamanho de cada arquivo enorme")
+    parser.add_argument("--jobs", "-j", type=int, default=1, help="Processos para a análise de código")
+    parser.add_argument("--seed", type=int, default=0, help="Semente do gerador")
+    parser.add_argument("--keep", action="store_true", help="Mantém o diretório temporário do benchmark")
+    parser.add_argument("--json", action="store_true", help="Emite os resultados em JSON")
+    parser.add_argument("--output", default=None, help="Grava os resultados em JSON neste arquivo")
+    args = parser.parse_args()
+
+    results = run(args.files_per_language, args.file_kb, args.commits, args.vendored_files,
+                  args.huge_files, args.huge_file_mb, args.jobs, args.seed, args.keep)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+    if args.json:
+        print(json.dumps(results, indent=2, ensure_ascii=False))
+        return
+    repo = results["repository"]
+    print(f"Repositório sintético: {repo['files']} arquivos, {repo['bytes'] / (1024 * 1024):.1f} MB, {repo['commits']} commits")
+    print(f"{'etapa':<34} {'segundos':>9}")
+    for name, stage in results["stages"].items():
+        print(f"{name:<34} {stage['seconds']:>9.3f}")
+    print(f"\n{'main.py (processo novo)':<34} {'segundos':>9} {'imports ms':>11}")
+    for name, command in results["startup"].items():
+        print(f"{name:<34} {command['seconds']:>9.3f} {command['import_ms']:>11.1f}")
+
+if __name__ == "__main__":
+    main()
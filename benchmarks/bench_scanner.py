@@ -0,0 +1,87 @@
+"""
+Benchmark de throughput (MB/s) do motor de passada única (modules/scanner.py)
+contra a implementação original com uma passada por padrão.
+
+Uso: python -m benchmarks.bench_scanner [--size-mb 8] [--repeat 3] [--json]
+"""
+import argparse
+import json
+import time
+
+from benchmarks.synthetic import synthetic_java, synthetic_js, synthetic_python
+from modules.code_analyzer import API_PATTERNS, JAVA_PATTERNS, JS_PATTERNS
+from modules.scanner import scan, scan_endpoints
+
+def legacy_scan(content, patterns):
+    """
+    Reproduz a implementação original: uma passada completa por padrão da linguagem (montando
+    os mesmos dicionários de `analyze_generic_with_regex`) e mais uma por padrão de API.
+    O grupo de argumentos só é lido quando existe: o padrão de funções Java tem apenas dois
+    grupos e fazia `analyze_generic_with_regex` falhar com IndexError.
+    """
+    analysis = {"imports": [], "functions": [], "classes": [], "constants": [], "endpoints": []}
+    for key, pattern in (patterns or {}).items():
+        for match in pattern.finditer(content):
+            if key == "functions":
+                args_str = (match.group(3) if pattern.groups >= 3 else match.group(2)) or ""
+                analysis[key].append({
+                    "name": match.group(1) or match.group(2),
+                    "args": [arg.strip() for arg in args_str.split(",") if arg.strip()],
+                    "docstring": "",
+                    "code_block": match.group(0),
+                })
+            else:
+                name = next((g for g in match.groups() if g is not None), None)
+                if name:
+                    analysis[key].append({"name": name, "code_block": match.group(0)})
+    for pattern in API_PATTERNS:
+        for match in pattern.finditer(content):
+            analysis["endpoints"].append({"method": match.group(1).upper(), "path": match.group(2)})
+    return analysis
+
+def _throughput(fn, content, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(content)
+        best = min(best, time.perf_counter() - started)
+    return len(content.encode("utf-8")) / (1024 * 1024) / best
+
+def run(size_mb=8, repeat=3):
+    size = int(size_mb * 1024 * 1024)
+    cases = [
+        ("javascript", synthetic_js(size), JS_PATTERNS, lambda c: scan(c, "javascript")),
+        ("javascript (sem endpoints)", synthetic_js(size, with_endpoints=False), JS_PATTERNS, lambda c: scan(c, "javascript")),
+        ("java", synthetic_java(size), JAVA_PATTERNS, lambda c: scan(c, "java")),
+        ("python (apenas endpoints)", synthetic_python(size), None, scan_endpoints),
+    ]
+    results = []
+    for name, content, patterns, new_fn in cases:
+        legacy = _throughput(lambda c: legacy_scan(c, patterns), content, repeat)
+        single_pass = _throughput(new_fn, content, repeat)
+        results.append({
+            "case": name,
+            "size_mb": round(len(content) / (1024 * 1024), 2),
+            "legacy_mb_s": round(legacy, 2),
+            "single_pass_mb_s": round(single_pass, 2),
+            "speedup": round(single_pass / legacy, 2),
+        })
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do motor de varredura de código.")
+    parser.add_argument("--size-mb", type=float, default=8, help="Tamanho do conteúdo sintético por caso")
+    parser.add_argument("--repeat", type=int, default=3, help="Repetições por medição (vale a melhor)")
+    parser.add_argument("--json", action="store_true", help="Emite os resultados em JSON")
+    args = parser.parse_args()
+
+    results = run(args.size_mb, args.repeat)
+    if args.json:
+        print(json.dumps(results, indent=2, ensure_ascii=False))
+        return
+    print(f"{'caso':<30} {'MB':>6} {'original MB/s':>14} {'passada única MB/s':>19} {'ganho':>7}")
+    for r in results:
+        print(f"{r['case']:<30} {r['size_mb']:>6} {r['legacy_mb_s']:>14} {r['single_pass_mb_s']:>19} {r['speedup']:>6}x")
+
+if __name__ == "__main__":
+    main()
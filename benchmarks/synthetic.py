@@ -0,0 +1,137 @@
+"""
+Geradores de conteúdo e de repositórios Git sintéticos para os benchmarks.
+
+Tudo é derivado de uma semente, então o mesmo conjunto de parâmetros sempre gera os mesmos
+arquivos e o mesmo histórico, e os resultados podem ser comparados entre commits.
+"""
+import io
+import os
+import random
+import subprocess
+
+def synthetic_js(size_bytes, seed=0, with_endpoints=True):
+    rng = random.Random(seed)
+    templates = [
+        "import {{ thing{i} }} from './module{i}';\n",
+        "const handler{i} = (req, res) => {{ return res.json({{ id: {i} }}); }};\n",
+        "function compute{i}(a, b, c) {{\n  return a * b + c + {i};\n}}\n",
+        "class Service{i} extends Base {{\n  run() {{ return {i}; }}\n}}\n",
+        "const LIMIT_{i} = {i};\n",
+        "// comentário qualquer sobre o item {i}, sem nada para extrair\n",
+        "let value{i} = items.map((x) => x * {i}).filter(Boolean);\n",
+        # Corpo de funções: a maior parte de um arquivo real não tem nada para extrair
+        "  if (options.retries > {i}) {{ await sleep(options.delay * {i}); }}\n",
+        "  result.push({{ key: 'k{i}', value: payload[{i}] ?? null }});\n",
+    ]
+    if with_endpoints:
+        templates.append("router.get('/items/{i}', handler{i});\n")
+    return _fill(rng, templates, size_bytes)
+
+def synthetic_java(size_bytes, seed=0):
+    rng = random.Random(seed)
+    templates = [
+        "import com.example.pkg{i}.Thing{i};\n",
+        "public class Service{i} {{\n",
+        "    private static final int MAX_{i} = {i};\n",
+        "    public static List<String> find{i}(String query, int limit) {{\n        return repository.find(query, limit);\n    }}\n",
+        "    // comentário qualquer sobre o item {i}\n",
+        "        if (items.size() > {i}) {{ items.remove({i}); }}\n",
+        "}}\n",
+    ]
+    return _fill(rng, templates, size_bytes)
+
+def synthetic_python(size_bytes, seed=0):
+    rng = random.Random(seed)
+    templates = [
+        "@app.get('/items/{i}')\ndef read_{i}(item_id: int):\n    return {{'id': item_id}}\n",
+        "def helper_{i}(a, b):\n    return a + b\n",
+        "# comentário qualquer sobre o item {i}\n",
+    ]
+    return _fill(rng, templates, size_bytes)
+
+def _fill(rng, templates, size_bytes):
+    parts, total, i = [], 0, 0
+    while total < size_bytes:
+        line = rng.choice(templates).format(i=i)
+        parts.append(line)
+        total += len(line)
+        i += 1
+    return "".join(parts)
+
+
+GENERATORS = {"py": synthetic_python, "js": synthetic_js, "java": synthetic_java}
+
+# Arquivos de projeto que todo repositório sintético tem (documentação, build, dependências)
+PROJECT_FILES = {
+    "README.md": "# Projeto sintético\n\nGerado para benchmarks.\n",
+    "package.json": '{"name": "synthetic", "version": "1.0.0"}\n',
+    "requirements.txt": "requests\n",
+    "Dockerfile": "FROM python:3.11-slim\n",
+    "config/settings.yml": "debug: false\n",
+}
+
+AUTHORS = [("Ana Souza", "ana@example.com"), ("Bruno Lima", "bruno@example.com"), ("Carla Dias", "carla@example.com")]
+
+def synthetic_tree(files_per_language=100, file_kb=4, vendored_files=100, huge_files=1, huge_file_mb=8, seed=0):
+    """
+    Retorna {caminho relativo: conteúdo} com `files_per_language` arquivos de Python, JS e Java
+    (mais alguns testes), dependências vendorizadas em node_modules/ e vendor/ e arquivos enormes.
+    """
+    rng = random.Random(seed)
+    tree = dict(PROJECT_FILES)
+    size = file_kb * 1024
+    for ext, generate in GENERATORS.items():
+        for i in range(files_per_language):
+            tree[f"src/{ext}/pkg{i // 50}/module_{i}.{ext}"] = generate(size, seed=rng.random())
+    for i in range(max(1, files_per_language // 10)):
+        tree[f"tests/test_module_{i}.py"] = synthetic_python(size, seed=rng.random())
+    for i in range(vendored_files):
+        folder = "node_modules" if i % 2 == 0 else "vendor"
+        tree[f"{folder}/lib{i}/index.js"] = synthetic_js(size, seed=rng.random())
+    for i in range(huge_files):
+        tree[f"src/generated/huge_{i}.js"] = synthetic_js(huge_file_mb * 1024 * 1024, seed=rng.random())
+    return tree
+
+def _blob(stream, path, content):
+    data = content.encode("utf-8")
+    stream.write(f"M 100644 inline {path}\ndata {len(data)}\n".encode("utf-8"))
+    stream.write(data)
+    stream.write(b"\n")
+
+def _commit(stream, number, message, files, rng):
+    name, email = rng.choice(AUTHORS)
+    timestamp = 1_600_000_000 + number * 3600
+    data = message.encode("utf-8")
+    stream.write(f"commit refs/heads/main\nauthor {name} <{email}> {timestamp} +0000\n"
+                 f"committer {name} <{email}> {timestamp} +0000\ndata {len(data)}\n".encode("utf-8"))
+    stream.write(data)
+    stream.write(b"\n")
+    for path, content in files:
+        _blob(stream, path, content)
+    stream.write(b"\n")
+
+def generate_repo(path, files_per_language=100, file_kb=4, commits=100, vendored_files=100,
+                  huge_files=1, huge_file_mb=8, seed=0):
+    """
+    Cria em `path` um repositório bare com a árvore de `synthetic_tree` e `commits` commits
+    (o primeiro adiciona tudo; cada um dos seguintes altera um arquivo de código), via `git fast-import`.
+    Retorna um resumo com a contagem de arquivos, bytes e commits.
+    """
+    rng = random.Random(seed)
+    tree = synthetic_tree(files_per_language, file_kb, vendored_files, huge_files, huge_file_mb, seed)
+    source_files = sorted(p for p in tree if p.startswith("src/") and "/generated/" not in p)
+
+    stream = io.BytesIO()
+    _commit(stream, 0, "Commit inicial do projeto sintético", sorted(tree.items()), rng)
+    for number in range(1, commits):
+        target = rng.choice(source_files)
+        tree[target] += f"// alteração {number}\n" if not target.endswith(".py") else f"# alteração {number}\n"
+        _commit(stream, number, f"Ajusta {os.path.basename(target)} (#{number})\n\nDetalhes da alteração {number}.", [(target, tree[target])], rng)
+
+    subprocess.run(["git", "init", "--bare", "--quiet", "--initial-branch=main", path], check=True)
+    subprocess.run(["git", "fast-import", "--quiet"], cwd=path, input=stream.getvalue(), check=True)
+    return {
+        "files": len(tree),
+        "bytes": sum(len(content.encode("utf-8")) for content in tree.values()),
+        "commits": commits,
+    }
@@ -0,0 +1,322 @@
+"""
+Modo serviço: um processo residente que recebe jobs "documentar este repositório/ref" por HTTP
+(TCP local ou socket Unix), guarda-os em uma fila persistente (SQLite) e os processa com um pool
+de workers.
+
+Clones em .repos/, o cache de análise, o cliente da API e os analisadores compilados continuam
+quentes entre um job e outro: um push vira um fetch + a análise do delta, sem o custo de subir o
+processo e clonar tudo de novo.
+
+Uso: python daemon.py [--port 8765 | --socket /tmp/codoc.sock] [--workers 2] [--jobs 0]
+
+Endpoints:
+- POST /jobs       {"url": ..., "ref": "main", "chunked": true, ...} (opções: ver batch.MANIFEST_OPTIONS)
+- POST /webhook    payload de push do GitHub ou do GitLab (apenas pushes no branch padrão)
+- GET  /jobs       últimos jobs (?status=queued&limit=50)
+- GET  /jobs/<id>  situação e resultado de um job
+- GET  /health     contagem de jobs por situação e estatísticas dos caches
+"""
+import argparse
+import hashlib
+import hmac
+import json
+import os
+import signal
+import socketserver
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from dotenv import load_dotenv
+
+from batch import (DEFAULT_ANALYSIS_CONCURRENCY, DEFAULT_DOC_CONCURRENCY, MANIFEST_OPTIONS, ThreadRoutedStdout,
+                   run_repository, stage_limits)
+from modules import worker_pool
+from modules.analysis_cache import get_default_cache
+from modules.code_analyzer import FILE_MEMORY_MB, FILE_TIMEOUT_SECONDS
+from modules.documentation_builder import DEFAULT_CHUNK_TOKENS, DEFAULT_LLM_CONCURRENCY
+from modules.git_fetcher import FETCH_STATS
+from modules.job_queue import DEFAULT_QUEUE_PATH, JobQueue
+from modules.telemetry import TRACER
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_WORKERS = 2
+
+# Tamanho máximo do corpo de uma requisição (payloads de push com muitos commits são grandes)
+MAX_BODY_BYTES = 25 * 1024 * 1024
+
+class DocumentationDaemon:
+    """Fila persistente + threads worker que executam o pipeline de cada job."""
+
+    def __init__(self, queue, workers=DEFAULT_WORKERS, log_dir=os.path.join(".repos", ".daemon_logs"),
+                 analysis_concurrency=DEFAULT_ANALYSIS_CONCURRENCY, doc_concurrency=DEFAULT_DOC_CONCURRENCY,
+                 create_pr=False, **defaults):
+        self.queue = queue
+        self.workers = workers
+        self.log_dir = log_dir
+        self.create_pr = create_pr
+        self.defaults = defaults
+        # Cada worker leva um repositório do fetch ao README; a análise e a API têm limites próprios
+        self.limits = stage_limits(workers, analysis_concurrency, doc_concurrency)
+        self.stopping = threading.Event()
+        self.threads = []
+        self.active = 0
+        self.active_lock = threading.Lock()
+        self.router = None
+
+    def submit(self, url, ref=None, options=None):
+        if os.path.isdir(url):
+            url = os.path.abspath(url)
+        return self.queue.enqueue(url, ref=ref, options=options)
+
+    def start(self):
+        os.makedirs(self.log_dir, exist_ok=True)
+        # Threads + workers de análise: fork herdaria locks ocupados (ver modules/worker_pool.py)
+        worker_pool.use_thread_safe_start_method()
+        recovered = self.queue.recover()
+        if recovered:
+            print(f"[daemon] {recovered} job(s) interrompido(s) na execução anterior voltaram para a fila.")
+        self.router = ThreadRoutedStdout(sys.stdout)
+        sys.stdout = self.router
+        for number in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"daemon-worker-{number}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def stop(self):
+        """Para de retirar jobs e espera os que estão em execução terminarem."""
+        self.stopping.set()
+        self.queue.wake_all()
+        running = self.queue.stats().get("running", 0)
+        if running:
+            self._log(f"[daemon] Aguardando {running} job(s) em execução (Ctrl+C de novo para sair; eles voltam para a fila).")
+        for thread in self.threads:
+            thread.join()
+        if self.router:
+            sys.stdout = self.router.fallback
+
+    def _log(self, text):
+        (self.router.fallback if self.router else sys.stdout).write(text + "\n")
+
+    def _work(self):
+        while not self.stopping.is_set():
+            job = self.queue.claim(timeout=1)
+            if job is None:
+                continue
+            with self.active_lock:
+                self.active += 1
+            self._log(f"[daemon] Job {job['id']}: {job['url']}{' @ ' + job['ref'] if job['ref'] else ''} iniciado.")
+            entry = dict(job["options"], url=job["url"], ref=job["ref"] or None)
+            try:
+                result = run_repository(entry, self.defaults, self.limits, self.log_dir, self.create_pr,
+                                        self.router, log_name=f"job-{job['id']}")
+            except Exception as e:
+                result = {"url": job["url"], "status": "error", "error": f"{e.__class__.__name__}: {e}"}
+            self.queue.finish(job["id"], result, error=result.get("error"))
+            self._log(f"[daemon] Job {job['id']}: {result['status']} em {result.get('seconds', 0):.1f}s.")
+            with self.active_lock:
+                self.active -= 1
+                # Sem jobs em andamento, a telemetria acumulada é descartada para não crescer indefinidamente
+                if not self.active:
+                    TRACER.reset()
+
+    def health(self):
+        return {
+            "jobs": self.queue.stats(),
+            "workers": self.workers,
+            "active": self.active,
+            "clones": dict(FETCH_STATS),
+            "analysis_cache": get_default_cache().stats(),
+        }
+
+def push_from_webhook(headers, payload):
+    """
+    Extrai (url, motivo) de um push do GitHub ou do GitLab. `url` é None quando o evento deve ser
+    ignorado (outro tipo de evento, branch removido ou diferente do padrão).
+    """
+    event = headers.get("X-GitHub-Event") or headers.get("X-Gitlab-Event") or ""
+    if event not in ("push", "Push Hook"):
+        return None, f"evento ignorado: {event or 'desconhecido'}"
+    after = payload.get("after")
+    if payload.get("deleted") or (after and not after.strip("0")):
+        return None, "branch removido"
+    repository = payload.get("repository") or {}
+    project = payload.get("project") or {}
+    url = repository.get("clone_url") or project.get("git_http_url") or repository.get("git_http_url")
+    default_branch = repository.get("default_branch") or project.get("default_branch")
+    if not url:
+        return None, "payload sem URL do repositório"
+    if default_branch and payload.get("ref") != f"refs/heads/{default_branch}":
+        return None, f"push fora do branch padrão ({payload.get('ref')})"
+    return url, None
+
+def webhook_authorized(headers, body, secret=None):
+    """
+    Confere o segredo compartilhado (DAEMON_WEBHOOK_SECRET) com o GitHub (assinatura HMAC em
+    X-Hub-Signature-256) ou o GitLab (X-Gitlab-Token). Sem segredo configurado, aceita tudo.
+    """
+    secret = os.getenv("DAEMON_WEBHOOK_SECRET", "") if secret is None else secret
+    if not secret:
+        return True
+    signature = headers.get("X-Hub-Signature-256")
+    if signature:
+        expected = "sha256=" + hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+        return hmac.compare_digest(signature, expected)
+    return hmac.compare_digest(headers.get("X-Gitlab-Token", ""), secret)
+
+class _JobHandler(BaseHTTPRequestHandler):
+    """API HTTP do serviço; `self.server.daemon` é o DocumentationDaemon."""
+
+    def _send(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length", 0))
+        if length > MAX_BODY_BYTES:
+            raise ValueError("corpo da requisição grande demais")
+        return self.rfile.read(length)
+
+    def _enqueue(self, url, ref, options):
+        job, deduplicated = self.server.daemon.submit(url, ref=ref, options=options)
+        self._send(200 if deduplicated else 202, {"job": job, "deduplicated": deduplicated})
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        parts = [part for part in parsed.path.split("/") if part]
+        daemon = self.server.daemon
+        if parts == ["health"]:
+            self._send(200, daemon.health())
+        elif parts == ["jobs"]:
+            query = parse_qs(parsed.query)
+            limit = int(query.get("limit", ["50"])[0])
+            self._send(200, {"jobs": daemon.queue.list(status=query.get("status", [None])[0], limit=limit)})
+        elif len(parts) == 2 and parts[0] == "jobs" and parts[1].isdigit():
+            job = daemon.queue.get(int(parts[1]))
+            self._send(200 if job else 404, job or {"error": "job não encontrado"})
+        else:
+            self._send(404, {"error": "rota não encontrada"})
+
+    def do_POST(self):
+        path = urlparse(self.path).path.rstrip("/")
+        try:
+            body = self._read_body()
+            if self.headers.get("Content-Type", "").startswith("application/x-www-form-urlencoded"):
+                # Webhooks do GitHub configurados com o formato de formulário mandam o JSON no campo "payload"
+                payload = json.loads(parse_qs(body.decode("utf-8")).get("payload", ["{}"])[0])
+            else:
+                payload = json.loads(body or b"{}")
+        except ValueError as e:
+            self._send(400, {"error": f"JSON inválido: {e}"})
+            return
+
+        if not isinstance(payload, dict):
+            self._send(400, {"error": "o corpo deve ser um objeto JSON"})
+            return
+        if path == "/jobs":
+            if not payload.get("url"):
+                self._send(400, {"error": "informe 'url'"})
+                return
+            unknown = set(payload) - {"url", "ref"} - set(MANIFEST_OPTIONS)
+            if unknown:
+                self._send(400, {"error": f"opções desconhecidas: {', '.join(sorted(unknown))}"})
+                return
+            options = {key: payload[key] for key in MANIFEST_OPTIONS if key in payload and key != "ref"}
+            self._enqueue(payload["url"], payload.get("ref"), options)
+        elif path == "/webhook":
+            if not webhook_authorized(self.headers, body):
+                self._send(401, {"error": "assinatura do webhook inválida"})
+                return
+            url, reason = push_from_webhook(self.headers, payload)
+            if url is None:
+                self._send(200, {"ignored": reason})
+                return
+            # Sem ref: o job documenta o branch padrão como ele estiver quando for executado
+            self._enqueue(url, None, {})
+        else:
+            self._send(404, {"error": "rota não encontrada"})
+
+    def address_string(self):
+        # Conexões pelo socket Unix não têm endereço (host, porta)
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+    def log_message(self, format, *args):
+        self.server.daemon._log(f"[daemon] {self.address_string()} {format % args}")
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+def make_server(daemon, host=DEFAULT_HOST, port=DEFAULT_PORT, socket_path=None):
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        server = _UnixHTTPServer(socket_path, _JobHandler)
+    else:
+        server = ThreadingHTTPServer((host, port), _JobHandler)
+    server.daemon = daemon
+    return server
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, socket_path=None, queue_path=DEFAULT_QUEUE_PATH, **options):
+    """Sobe a fila, os workers e o servidor HTTP; roda até Ctrl+C ou SIGTERM."""
+    queue = JobQueue(queue_path)
+    daemon = DocumentationDaemon(queue, **options)
+    server = make_server(daemon, host=host, port=port, socket_path=socket_path)
+    # SIGTERM (ex: systemd, docker stop) encerra como um Ctrl+C
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    daemon.start()
+    address = socket_path or f"http://{host}:{server.server_address[1]}"
+    daemon._log(f"[daemon] Escutando em {address} com {daemon.workers} worker(s). Fila: {queue_path}")
+    try:
+        server.serve_forever()
+    except (KeyboardInterrupt, SystemExit):
+        daemon._log("\n[daemon] Encerrando...")
+    finally:
+        server.server_close()
+        if socket_path and os.path.exists(socket_path):
+            os.unlink(socket_path)
+        daemon.stop()
+        queue.close()
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Serviço residente que documenta repositórios a partir de uma fila de jobs.")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="Endereço HTTP (padrão: apenas local)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="Porta HTTP")
+    parser.add_argument("--socket", default=None, metavar="CAMINHO", help="Escuta em um socket Unix em vez de TCP")
+    parser.add_argument("--queue", default=DEFAULT_QUEUE_PATH, help="Banco SQLite da fila de jobs")
+    parser.add_argument("--log-dir", default=os.path.join(".repos", ".daemon_logs"), help="Diretório dos logs por job")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Jobs processados ao mesmo tempo")
+    parser.add_argument("--analysis-concurrency", type=int, default=DEFAULT_ANALYSIS_CONCURRENCY,
+                        help="Repositórios analisados ao mesmo tempo (cada um com --jobs processos)")
+    parser.add_argument("--doc-concurrency", type=int, default=DEFAULT_DOC_CONCURRENCY,
+                        help="Repositórios gerando documentação (chamando a API) ao mesmo tempo")
+    parser.add_argument("--jobs", "-j", type=int, default=0, help="Processos para a análise de código (0 = todos os núcleos)")
+    parser.add_argument("--max-commits", type=int, default=500, help="Máximo de commits lidos do histórico (0 = todos)")
+    parser.add_argument("--full", action="store_true",
+                        help="Reanalisa todos os arquivos a cada job (padrão: apenas o que mudou desde o último README)")
+    parser.add_argument("--chunked", action="store_true", help="Gera a documentação em map-reduce, com um lote de arquivos por chamada")
+    parser.add_argument("--chunk-tokens", type=int, default=DEFAULT_CHUNK_TOKENS, help="Orçamento de tokens por lote no modo --chunked")
+    parser.add_argument("--llm-concurrency", type=int, default=DEFAULT_LLM_CONCURRENCY, help="Chamadas simultâneas à API no modo --chunked")
+    parser.add_argument("--no-llm-cache", action="store_true", help="Ignora o cache de respostas da API e sempre chama o modelo")
+    parser.add_argument("--file-timeout", type=float, default=FILE_TIMEOUT_SECONDS,
+                        help="Tempo máximo (s) de análise por arquivo em worker isolado (0 = sem limite)")
+    parser.add_argument("--file-memory-mb", type=int, default=FILE_MEMORY_MB,
+                        help="Memória máxima (MB) do worker que analisa cada arquivo (0 = sem limite)")
+    parser.add_argument("--create-pr", action="store_true", help="Abre um Pull Request em cada repositório documentado")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    load_dotenv()
+    args = parse_args(argv)
+    serve(host=args.host, port=args.port, socket_path=args.socket, queue_path=args.queue, log_dir=args.log_dir,
+          workers=args.workers, analysis_concurrency=args.analysis_concurrency, doc_concurrency=args.doc_concurrency,
+          create_pr=args.create_pr, jobs=args.jobs, max_commits=args.max_commits, incremental=not args.full,
+          chunked=args.chunked, chunk_tokens=args.chunk_tokens, llm_concurrency=args.llm_concurrency,
+          llm_cache=not args.no_llm_cache, file_timeout=args.file_timeout, file_memory_mb=args.file_memory_mb)
+
+if __name__ == "__main__":
+    main()
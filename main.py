@@ -1,80 +1,316 @@
-import sys
+"""
+CLI do projeto: o pipeline completo ou cada etapa isolada, sobre uma URL ou um checkout local.
+
+Uso:
+  python main.py run <repo> [--incremental] [--create-pr]    pipeline completo (também: python main.py <repo>)
+  python main.py classify <repo> [--json]                    classificação dos arquivos
+  python main.py dedup <repo> [--json]                       grupos de arquivos de conteúdo idêntico
+  python main.py shard <repo> [--json]                       subprojetos de um monorepo (diretórios com manifesto)
+  python main.py commits <repo> [--json]                     commits por autor
+  python main.py analyze <repo> [--json]                     análise estática dos arquivos de código
+  python main.py index <repo> [--json | --mermaid]           grafo de imports, tabela de símbolos e diagrama
+  python main.py rank <repo> [--json]                        arquivos em ordem de relevância (churn, autores, fan-in)
+  python main.py prompt <repo> [--output prompt.md]          prompt enviado ao modelo
+  python main.py document <repo> [--shard]                   README_GERADO.md (--shard: um por subprojeto + índice)
+  python main.py pr <repo>                                   Pull Request com o README gerado
+  python main.py batch manifesto.txt [...]                   vários repositórios (ver batch.py)
+  python main.py serve [...]                                 serviço com fila de jobs (ver daemon.py)
+
+Os subcomandos de etapa usam um diretório local existente no lugar (sem clonar) e guardam sua
+saída em .repos/.cache/stages, no diretório da ferramenta: `prompt` logo depois de `analyze` não
+refaz a classificação nem a análise. As dependências pesadas (GitPython, requests, multiprocessing)
+só são importadas pela etapa que as usa, para que chamadas curtas e frequentes (ex: hooks de CI)
+iniciem rápido.
+
+Com `--bare`, o clone não tem working tree: os arquivos do HEAD são lidos do banco de objetos do
+Git (modules/git_objects.py), o README vai para .repos/.docs/<nome> (nunca para dentro do clone
+bare) e `pr` fica indisponível.
+"""
+import argparse
+import contextlib
+import json
 import os
-import subprocess
-import shutil
-from pathlib import Path
-from urllib.parse import urlparse
-from collections import defaultdict
-from dotenv import load_dotenv
-
-from modules.git_fetcher import fetch_repository
-from modules.file_classifier import classify_files
-from modules.commit_reader import read_commits
-from modules.code_analyzer import analyze_code
-from modules.documentation_builder import build_documentation
-from modules.github_manager import create_pull_request
-
-
-def main():
+import sys
+
+STAGE_COMMANDS = ("classify", "dedup", "shard", "commits", "analyze", "index", "rank", "prompt", "document", "pr")
+# Delegados aos CLIs de batch.py e daemon.py, com as mesmas opções
+DELEGATED_COMMANDS = {"batch": "batch", "serve": "daemon"}
+COMMANDS = ("run",) + STAGE_COMMANDS + tuple(DELEGATED_COMMANDS)
+
+# Etapa -> (etapas de que depende, incluindo ela mesma)
+STAGE_INPUTS = {
+    "classify": ("classify",),
+    "dedup": ("classify", "dedup"),
+    "shard": ("classify", "shard"),
+    "commits": ("commits",),
+    "analyze": ("classify", "dedup", "analyze"),
+    "index": ("classify", "dedup", "analyze", "index"),
+    "rank": ("classify", "dedup", "analyze", "index", "rank"),
+    "prompt": ("classify", "dedup", "commits", "analyze", "index", "rank"),
+    "document": ("classify", "dedup", "commits", "analyze", "index", "rank"),
+    "pr": (),
+}
+# Etapa -> (método do ProjectOrchestrator, atributo com a saída)
+STAGE_METHODS = {
+    "classify": ("classify_files", "classification"),
+    "dedup": ("deduplicate_files", "duplicates"),
+    "shard": ("detect_shards", "shards"),
+    "commits": ("read_commits", "commits"),
+    "analyze": ("analyze_codebase", "code_analysis"),
+    "index": ("build_index", "index"),
+    "rank": ("rank_files", "ranking"),
+}
+
+def _repo_options(parser):
+    parser.add_argument("repo", help="URL do repositório (https://, git@ ou file://) ou diretório local")
+    parser.add_argument("--ref", default=None, help="Branch, tag ou commit a documentar (padrão: branch padrão do remoto)")
+    parser.add_argument("--depth", type=int, default=None, help="Clone raso com os N commits mais recentes")
+    parser.add_argument("--blobless", action="store_true", help="Clone parcial sem blobs (--filter=blob:none)")
+    parser.add_argument("--bare", action="store_true", help="Lê os arquivos direto do banco de objetos do Git (clone bare, sem checkout da working tree)")
+    parser.add_argument("--trace", default=None, metavar="ARQUIVO", help="Grava spans, tempos por arquivo e chamadas à API em JSON lines")
+    parser.add_argument("--chrome-trace", default=None, metavar="ARQUIVO", help="Grava o trace no formato do Chrome (chrome://tracing, Perfetto)")
+
+def _classify_options(parser):
+    parser.add_argument("--exclude", action="append", default=None, metavar="DIR",
+                        help="Diretório a ignorar na classificação (repetível; substitui a lista padrão)")
+
+def _dedup_options(parser):
+    parser.add_argument("--dedup", choices=("exact", "whitespace", "off"), default="exact",
+                        help="Analisa e documenta uma vez só os arquivos de conteúdo idêntico (whitespace: também a menos de espaços)")
+
+def _commit_options(parser):
+    parser.add_argument("--max-commits", type=int, default=500, help="Máximo de commits lidos do histórico (0 = todos)")
+    parser.add_argument("--since", default=None, help="Lê apenas commits desde esta data (ex: '6 months ago')")
+    parser.add_argument("--incremental-commits", action="store_true", help="Lê apenas commits posteriores ao último SHA processado")
+
+def _analysis_options(parser):
+    parser.add_argument("--jobs", "-j", type=int, default=1, help="Processos para a análise de código (0 = todos os núcleos)")
+    parser.add_argument("--file-timeout", type=float, default=None,
+                        help="Tempo máximo (s) de análise por arquivo em worker isolado (0 = sem limite; padrão: ANALYSIS_TIMEOUT_SECONDS)")
+    parser.add_argument("--file-memory-mb", type=int, default=None,
+                        help="Memória máxima (MB) do worker que analisa cada arquivo (0 = sem limite; padrão: ANALYSIS_MAX_MEMORY_MB)")
+
+def _ranking_options(parser, history=False):
+    if history:
+        # `rank` sozinho: a janela do histórico usa as mesmas opções da leitura de commits
+        parser.add_argument("--max-commits", type=int, default=500, help="Máximo de commits lidos do histórico (0 = todos)")
+        parser.add_argument("--since", default=None, help="Lê apenas commits desde esta data (ex: '6 months ago')")
+    parser.add_argument("--rank", choices=("both", "history", "imports", "off"), default="both",
+                        help="Sinais da priorização dos arquivos: histórico (churn, autores, recência), fan-in de imports, ambos ou nenhum")
+    parser.add_argument("--prompt-tokens", type=int, default=None,
+                        help="Orçamento de tokens do prompt; omite os arquivos menos relevantes (0 = sem limite; padrão: PROMPT_TOKEN_BUDGET)")
+
+def _documentation_options(parser):
+    parser.add_argument("--chunked", action="store_true", help="Gera a documentação em map-reduce, com um lote de arquivos por chamada")
+    parser.add_argument("--chunk-tokens", type=int, default=None, help="Orçamento de tokens por lote no modo --chunked")
+    parser.add_argument("--llm-concurrency", type=int, default=None,
+                        help="Chamadas simultâneas à API no modo --chunked e subprojetos documentados ao mesmo tempo no modo --shard")
+    parser.add_argument("--shard", action="store_true",
+                        help="Monorepo: um README por subprojeto (diretório com package.json, pom.xml, ...), gerados em paralelo, e um índice na raiz")
+    parser.add_argument("--stream", action="store_true", help="Recebe a resposta em streaming e grava o README à medida que chega")
+    parser.add_argument("--no-llm-cache", action="store_true", help="Ignora o cache de respostas da API e sempre chama o modelo")
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Documenta automaticamente um repositório Git.")
+    commands = parser.add_subparsers(dest="command", metavar="comando", required=True)
+
+    run = commands.add_parser("run", help="Pipeline completo: clone, classificação, commits, análise e documentação")
+    for add_options in (_repo_options, _classify_options, _dedup_options, _commit_options, _analysis_options, _ranking_options,
+                        _documentation_options):
+        add_options(run)
+    run.add_argument("--incremental", action="store_true", help="Reanalisa apenas os arquivos alterados desde o último README gerado")
+    run.add_argument("--create-pr", action="store_true", help="Abre um Pull Request com o README gerado")
+
+    stage_help = {
+        "classify": "Classifica os arquivos por categoria",
+        "dedup": "Agrupa os arquivos de código de conteúdo idêntico (um representante por grupo)",
+        "shard": "Detecta os subprojetos de um monorepo pelos manifestos de dependências",
+        "commits": "Lê os commits do histórico, agrupados por autor",
+        "analyze": "Analisa os arquivos de código (funções, classes, constantes, endpoints)",
+        "index": "Resolve os imports entre os arquivos (grafo de dependências) e indexa os símbolos definidos",
+        "rank": "Ordena os arquivos analisados por relevância (churn, autores, recência, fan-in)",
+        "prompt": "Monta o prompt enviado ao modelo",
+        "document": "Gera o README_GERADO.md",
+        "pr": "Abre um Pull Request com o README_GERADO.md já gerado",
+    }
+    for command in STAGE_COMMANDS:
+        stage = commands.add_parser(command, help=stage_help[command])
+        _repo_options(stage)
+        inputs = STAGE_INPUTS[command]
+        if "classify" in inputs:
+            _classify_options(stage)
+        if "dedup" in inputs:
+            _dedup_options(stage)
+        if "commits" in inputs:
+            _commit_options(stage)
+        if "analyze" in inputs:
+            _analysis_options(stage)
+        if "rank" in inputs:
+            _ranking_options(stage, history="commits" not in inputs)
+        if command == "document":
+            _documentation_options(stage)
+        if command in STAGE_METHODS:
+            stage.add_argument("--json", action="store_true", help="Emite a saída da etapa em JSON (logs vão para o stderr)")
+        if command == "index":
+            stage.add_argument("--mermaid", action="store_true", help="Emite o diagrama de componentes em Mermaid")
+        if command == "prompt":
+            stage.add_argument("--output", default=None, metavar="ARQUIVO", help="Grava o prompt no arquivo em vez do stdout")
+        if inputs:
+            stage.add_argument("--fresh", action="store_true", help="Recalcula as etapas anteriores em vez de usar o cache de etapas")
+
+    commands.add_parser("batch", help="Documenta vários repositórios de um manifesto (opções: main.py batch --help)", add_help=False)
+    commands.add_parser("serve", help="Serviço residente com fila de jobs (opções: main.py serve --help)", add_help=False)
+    return parser
+
+def _orchestrator(args):
+    # Importado aqui: `main.py --help` não carrega nenhum módulo do pipeline
+    from modules.file_classifier import DEFAULT_EXCLUDE_DIRS
+    from orquestrador import ProjectOrchestrator
+
+    option = lambda name, default=None: getattr(args, name, default)
+    return ProjectOrchestrator(
+        args.repo, ref=args.ref, depth=args.depth, blobless=args.blobless, bare=args.bare, jobs=option("jobs", 1),
+        max_commits=option("max_commits", 500), since=option("since"), incremental_commits=option("incremental_commits", False),
+        incremental=option("incremental", False), chunked=option("chunked", False), chunk_tokens=option("chunk_tokens"),
+        llm_concurrency=option("llm_concurrency"), llm_cache=not option("no_llm_cache", False), stream=option("stream", False),
+        exclude_dirs=option("exclude") or DEFAULT_EXCLUDE_DIRS, file_timeout=option("file_timeout"),
+        file_memory_mb=option("file_memory_mb"), trace_path=args.trace, chrome_trace_path=args.chrome_trace,
+        ranking_mode=option("rank", "both"), prompt_tokens=option("prompt_tokens"), dedup=option("dedup", "exact"),
+        shard=option("shard", False),
+    )
+
+def _stage_options(orchestrator, stage):
+    """Opções que mudam a saída de cada etapa: outra combinação invalida a saída salva."""
+    if stage in ("classify", "shard"):
+        return {"exclude_dirs": sorted(orchestrator.exclude_dirs)}
+    if stage == "commits":
+        return {"max_commits": orchestrator.max_commits, "since": orchestrator.since}
+    if stage == "dedup":
+        return {"dedup": orchestrator.dedup, **_stage_options(orchestrator, "classify")}
+    from modules.code_analyzer import ANALYZER_VERSION
+    options = {"analyzer": ANALYZER_VERSION, **_stage_options(orchestrator, "dedup")}
+    if stage == "rank":
+        options.update(ranking=orchestrator.ranking_mode, **_stage_options(orchestrator, "commits"))
+    return options
+
+def _stage_output(orchestrator, stage):
+    """Saída da etapa em forma serializável em JSON (os registros da análise viram listas)."""
+    output = getattr(orchestrator, STAGE_METHODS[stage][1])
+    if stage == "analyze":
+        from modules.symbols import pack
+        return {filepath: pack(analysis) for filepath, analysis in output.items()}
+    if stage == "index":
+        return output.to_json()
+    return output
+
+def _set_stage_output(orchestrator, stage, saved):
+    if stage == "analyze":
+        from modules.symbols import unpack
+        saved = {filepath: unpack(analysis) for filepath, analysis in saved.items()}
+    elif stage == "index":
+        from modules.code_index import CodeIndex
+        saved = CodeIndex(saved)
+    setattr(orchestrator, STAGE_METHODS[stage][1], saved)
+
+def _run_stage(orchestrator, stage, key, fresh):
+    from modules.stage_cache import load_stage, save_stage
+    from modules.telemetry import span
+
+    method = STAGE_METHODS[stage][0]
+    # Leitura incremental de commits depende do checkpoint, não só do HEAD
+    if stage == "commits" and orchestrator.incremental_commits:
+        key = None
+    options = _stage_options(orchestrator, stage)
+    saved = None if fresh else load_stage(orchestrator.repo_path, stage, key, options)
+    if saved is not None:
+        print(f"[cli] {stage}: saída reaproveitada do cache de etapas ({key[:7]}).")
+        _set_stage_output(orchestrator, stage, saved)
+        return
+    with span(stage, repo=orchestrator.repo_path):
+        getattr(orchestrator, method)()
+    save_stage(orchestrator.repo_path, stage, key, _stage_output(orchestrator, stage), options)
+
+def run_stage_command(args):
+    """Executa um subcomando de etapa e devolve o código de saída do processo."""
+    from modules.stage_cache import tree_key
+
+    orchestrator = _orchestrator(args)
+    result_stream = sys.stdout
+    # O stdout fica só com o resultado (JSON, prompt); o progresso das etapas vai para o stderr
+    with contextlib.redirect_stdout(sys.stderr), contextlib.closing(orchestrator):
+        if os.path.isdir(args.repo) and not args.ref:
+            # Absoluto: os caminhos salvos no cache de etapas não podem depender do diretório atual
+            orchestrator.repo_path = os.path.abspath(args.repo)
+        else:
+            orchestrator.fetch_repository()
+        key = tree_key(orchestrator.repo_path)
+        for stage in STAGE_INPUTS[args.command]:
+            _run_stage(orchestrator, stage, key, args.fresh)
+
+        if args.command == "prompt":
+            prompt = orchestrator.build_prompt()
+        elif args.command == "document":
+            doc_path = orchestrator.build_documentation()
+            if not doc_path:
+                print("- Falha ao gerar a documentação.")
+                return 1
+        elif args.command == "pr":
+            if not os.path.exists(os.path.join(orchestrator.output_path, "README_GERADO.md")):
+                print("[cli] README_GERADO.md não encontrado: rode `main.py document` antes.")
+                return 1
+            pr_url = orchestrator.create_pull_request()
+            if not pr_url:
+                return 1
+
+    if args.command == "index":
+        if args.json:
+            # O grafo resolvido e a tabela de símbolos, em vez dos dados brutos guardados no cache
+            index = orchestrator.index
+            json.dump({"imports": index.imports, "importers": index.importers, "symbols": index.symbols},
+                      result_stream, ensure_ascii=False)
+            result_stream.write("\n")
+        if args.mermaid:
+            result_stream.write(orchestrator.index.mermaid() + "\n")
+    elif args.command in STAGE_METHODS:
+        if args.json:
+            json.dump(_stage_output(orchestrator, args.command), result_stream, ensure_ascii=False)
+            result_stream.write("\n")
+    elif args.command == "prompt":
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                f.write(prompt)
+        else:
+            result_stream.write(prompt)
+    elif args.command == "document":
+        result_stream.write(f"{doc_path}\n")
+    elif args.command == "pr":
+        result_stream.write(f"{pr_url}\n")
+    return 0
+
+def main(argv=None):
+    argv = list(sys.argv[1:] if argv is None else argv)
+    # Compatibilidade: `python main.py <repo> [opções]` continua rodando o pipeline completo
+    if argv and argv[0] not in COMMANDS and not argv[0].startswith("-"):
+        argv.insert(0, "run")
+    if argv and argv[0] in DELEGATED_COMMANDS:
+        module = __import__(DELEGATED_COMMANDS[argv[0]])
+        module.main(argv[1:])
+        return
+
+    args = build_parser().parse_args(argv)
+    from dotenv import load_dotenv
     load_dotenv()
-    if len(sys.argv) < 2:
-        print("Uso: python main.py <url-do-repositorio-github>")
-        sys.exit(1)
 
-    repo_url = sys.argv[1]
-    
-    try:
-        print("[1] Clonando repositório...")
-        repo_path = fetch_repository(repo_url)
-        print(f"Repositório clonado em: {repo_path}")
-    except Exception as e:
-        print(f"Erro ao clonar o repositório: {e}")
-        sys.exit(1)
-
-    print("\n[2] Classificando arquivos...")
-    classification = classify_files(repo_path)
-    for category, files in classification.items():
-        print(f"- {category}: {len(files)} arquivos")
-
-    print("\n[3] Lendo commits...")
-    commits = read_commits(repo_path)
-    print(f"- Encontrados {sum(len(c) for c in commits.values())} commits de {len(commits)} autores.")
-
-    print("\n[4] Analisando o código...")
-    code_analysis = defaultdict(dict)
-    # Define as categorias de arquivos que contêm código que deve ser analisado
-    categories_to_analyze = ["backend", "frontend", "teste", "api"]
-    
-    files_to_analyze = []
-    for category in categories_to_analyze:
-        if category in classification:
-            files_to_analyze.extend(classification[category])
-
-    if not files_to_analyze:
-        print("- Nenhum arquivo de código encontrado para análise nas categorias relevantes.")
-    else:
-        for filepath in files_to_analyze:
-            analysis = analyze_code(filepath)
-            # Adiciona a análise apenas se não houver erro e se algo útil foi de fato encontrado
-            if analysis and not analysis.get("error"):
-                if analysis.get("functions") or analysis.get("classes") or analysis.get("constants") or analysis.get("endpoints"):
-                    code_analysis[filepath] = analysis
-
-        print(f"- Análise de código concluída para {len(code_analysis)} arquivos.")
-
-    print("\n[5] Gerando documentação...")
-    doc_path = build_documentation(repo_path, classification, commits, code_analysis)
-    if doc_path:
-        print(f"- Documentação gerada em: {doc_path}")
-        # print("\n[6] Criando Pull Request...")
-        # pr_url = create_pull_request(repo_path)
-        # if pr_url:
-        #     print(f"- Pull Request criado com sucesso: {pr_url}")
-        # else:
-        #     print("- Falha ao criar o Pull Request. Verifique o log e se o 'gh' CLI está autenticado.")
-    else:
-        print("- Falha ao gerar a documentação. O Pull Request não será criado.")
+    if args.command == "run":
+        _orchestrator(args).run(create_pr=args.create_pr)
+        return
 
+    from modules.telemetry import export
+    try:
+        status = run_stage_command(args)
+    finally:
+        export(args.trace, args.chrome_trace)
+    sys.exit(status)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,148 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_CACHE_DIR = os.path.join(".repos", ".cache")
+DEFAULT_MAX_BYTES = int(os.getenv("ANALYSIS_CACHE_MAX_MB", "512")) * 1024 * 1024
+# Versão do esquema da tabela `entries`, gravada em `PRAGMA user_version`:
+# 1 = key, value, size, last_access; 2 = + created_at (validade das entradas)
+SCHEMA_VERSION = 2
+
+def git_blob_sha(data):
+    """Calcula o SHA-1 de blob do Git (o mesmo de `git hash-object`) para o conteúdo em bytes."""
+    # Atualiza o hash em duas partes para não copiar `data` (que pode ser um mmap de vários MB)
+    digest = hashlib.sha1(f"blob {len(data)}\0".encode())
+    digest.update(data)
+    return digest.hexdigest()
+
+class AnalysisCache:
+    """
+    Cache persistente (SQLite) de resultados de análise, endereçado por conteúdo.
+
+    A chave combina a versão do analisador, a extensão do arquivo e o SHA do blob,
+    então arquivos inalterados (ou copiados entre repositórios) não são reanalisados.
+    Quando o tamanho total ultrapassa `max_bytes`, as entradas menos usadas recentemente são removidas.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, filename="analysis.sqlite", ttl=None):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, filename)
+        self.max_bytes = max_bytes
+        # Validade das entradas em segundos (None = sem expiração; análises só mudam com o conteúdo)
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        # Uma conexão por instância, compartilhada entre threads (ex: chamadas map simultâneas) sob lock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+            "created_at REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_access ON entries(last_access)")
+        self._migrate()
+        self._conn.commit()
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def _migrate(self):
+        """Atualiza um arquivo de cache criado por uma versão anterior (a tabela já existia sem as colunas novas)."""
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+            return
+        self._conn.commit()
+        # Trava de escrita antes de reler: dois processos abrindo o mesmo arquivo migram uma vez só
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(entries)")}
+            if "created_at" not in columns:
+                # Sem a data de criação original, o último acesso é a melhor aproximação
+                self._conn.execute("ALTER TABLE entries ADD COLUMN created_at REAL NOT NULL DEFAULT 0")
+                self._conn.execute("UPDATE entries SET created_at = last_access")
+            self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            self._conn.commit()
+        except BaseException:
+            self._conn.rollback()
+            raise
+
+    @staticmethod
+    def make_key(version, extension, blob_sha):
+        return f"{version}:{extension}:{blob_sha}"
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT value, created_at FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is not None and self.ttl is not None and time.time() - row[1] > self.ttl:
+                self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._conn.commit()
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+        return json.loads(row[0])
+
+    def put(self, key, analysis):
+        value = json.dumps(analysis, ensure_ascii=False)
+        size = len(value.encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, now, now),
+            )
+            self._conn.commit()
+            self._total_bytes += size
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        # Recalcula o total real (outros processos podem ter escrito no mesmo arquivo)
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        target = int(self.max_bytes * 0.9)
+        cursor = self._conn.execute("SELECT key, size FROM entries ORDER BY last_access ASC")
+        to_delete = []
+        for key, size in cursor:
+            if self._total_bytes <= target:
+                break
+            to_delete.append((key,))
+            self._total_bytes -= size
+        self._conn.executemany("DELETE FROM entries WHERE key = ?", to_delete)
+        self._conn.commit()
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "bytes": self._total_bytes}
+
+    def close(self):
+        self._conn.close()
+
+_DEFAULT_CACHE = None
+_DEFAULT_CACHE_LOCK = threading.Lock()
+# Caches herdados via fork: a conexão SQLite do pai não pode ser usada no filho, nem fechada
+# (o close poderia fazer checkpoint e apagar o WAL que o pai ainda usa); fica só referenciada
+_FORKED_CACHES = []
+
+def get_default_cache():
+    """Retorna a instância de cache compartilhada do processo, criando-a na primeira chamada."""
+    global _DEFAULT_CACHE
+    with _DEFAULT_CACHE_LOCK:
+        if _DEFAULT_CACHE is None:
+            _DEFAULT_CACHE = AnalysisCache()
+        return _DEFAULT_CACHE
+
+def _reset_after_fork():
+    # Vale para qualquer fork (workers isolados da análise, batch): o filho abre sua conexão
+    global _DEFAULT_CACHE, _DEFAULT_CACHE_LOCK
+    if _DEFAULT_CACHE is not None:
+        _FORKED_CACHES.append(_DEFAULT_CACHE)
+    _DEFAULT_CACHE = None
+    # Outra thread do pai podia estar com o lock no momento do fork
+    _DEFAULT_CACHE_LOCK = threading.Lock()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -1,8 +1,40 @@
 import ast
+import functools
+import mmap
 import os
 import re
+import time
+
+from modules.analysis_cache import AnalysisCache, get_default_cache, git_blob_sha
+from modules.git_objects import BlobReader
+from modules.scanner import EXTENSION_LANGUAGES, scan, scan_endpoints
+from modules.symbols import ConstantSymbol, ImportSymbol, intern, make_class, make_function, pack, unpack
+from modules.telemetry import TRACER
+from modules.worker_pool import STATUS_CRASH, STATUS_MEMORY, STATUS_TIMEOUT, run_isolated
+
+# Incremente sempre que a saída dos analisadores mudar, para invalidar o cache persistente
+ANALYZER_VERSION = "8"
+
+# --- Filtro Pré-Análise ---
+
+# Arquivos acima deste tamanho não são analisados (bundles, dumps, stubs gerados gigantes)
+MAX_FILE_BYTES = int(float(os.getenv("ANALYSIS_MAX_FILE_MB", "5")) * 1024 * 1024)
+# A partir deste tamanho o arquivo é lido via mmap (sem cópia) e varrido com regex de bytes
+MMAP_THRESHOLD = 512 * 1024
+SNIFF_BYTES = 8192
+# Linhas maiores que isso no início do arquivo indicam código minificado
+MAX_LINE_LENGTH = 2000
+GENERATED_MARKERS = (b"@generated", b"DO NOT EDIT", b"Code generated by", b"<auto-generated")
+MINIFIED_SUFFIXES = (".min.js", ".min.css", ".bundle.js")
+
+# Orçamento por arquivo da análise em workers isolados (0 = sem limite)
+FILE_TIMEOUT_SECONDS = float(os.getenv("ANALYSIS_TIMEOUT_SECONDS", "30"))
+FILE_MEMORY_MB = int(os.getenv("ANALYSIS_MAX_MEMORY_MB", "1024"))
 
 # --- Padrões de Regex para Diferentes Linguagens ---
+#
+# Implementação original, com uma passada completa por padrão. A análise usa o motor de
+# passada única de modules/scanner.py; estes padrões ficam como referência para o benchmark.
 
 # JavaScript (funções, classes, imports, constantes)
 JS_PATTERNS = {
@@ -26,17 +58,110 @@ API_PATTERNS = [
     re.compile(r"(?:app|router)\.(get|post|put|delete|patch)\(['\"](.*?)['\"]")  # Express.js
 ]
 
+def _text(value):
+    if isinstance(value, bytes):
+        return value.decode("utf-8", errors="replace")
+    return value
+
+def sniff_skip_reason(filepath, head, size):
+    """
+    Decide, a partir do tamanho e dos primeiros bytes, se o arquivo deve ser ignorado.
+    Retorna o motivo (str) ou None se o arquivo deve ser analisado.
+    """
+    if size > MAX_FILE_BYTES:
+        return f"muito grande ({size // 1024} KB)"
+    if b"\0" in head:
+        return "binário"
+    if filepath.endswith(MINIFIED_SUFFIXES):
+        return "minificado"
+    if any(marker in head[:2048] for marker in GENERATED_MARKERS):
+        return "gerado automaticamente"
+    complete_lines = head.split(b"\n")[:-1]
+    if (not complete_lines and len(head) == SNIFF_BYTES) or any(len(line) > MAX_LINE_LENGTH for line in complete_lines):
+        return "minificado"
+    return None
+
 # --- Analisadores Específicos por Linguagem ---
 
+def _line_starts(source):
+    """Deslocamento (em bytes) do início de cada linha, calculado uma única vez por arquivo."""
+    starts = [0]
+    for line in source.splitlines(keepends=True):
+        starts.append(starts[-1] + len(line))
+    return starts
+
+class _PythonVisitor(ast.NodeVisitor):
+    """
+    Percorre a AST uma única vez. Os spans são calculados pela tabela de início de linhas (as
+    colunas da AST são em bytes UTF-8), sem copiar o código de cada construção.
+    """
+
+    def __init__(self, source):
+        self.line_starts = _line_starts(source)
+        self.current_class = None
+        self.analysis = {"imports": [], "functions": [], "classes": [], "constants": []}
+
+    def _span(self, node):
+        return (self.line_starts[node.lineno - 1] + node.col_offset,
+                self.line_starts[node.end_lineno - 1] + node.end_col_offset)
+
+    def visit_Import(self, node):
+        start, end = self._span(node)
+        for alias in node.names:
+            self.analysis["imports"].append(ImportSymbol(intern(alias.name), start, end))
+
+    def visit_ImportFrom(self, node):
+        # `from pkg import mod` vira `pkg.mod`: o nome importado pode ser um submódulo (ver modules/code_index.py)
+        module = "." * node.level + (node.module or "")
+        separator = "." if node.module else ""
+        start, end = self._span(node)
+        for alias in node.names:
+            self.analysis["imports"].append(ImportSymbol(intern(f"{module}{separator}{alias.name}"), start, end))
+
+    def visit_Assign(self, node):
+        target = node.targets[0]
+        if isinstance(target, ast.Name) and target.id.isupper():
+            self.analysis["constants"].append(ConstantSymbol(intern(target.id), *self._span(node.value), has_value=True))
+
+    def visit_ClassDef(self, node):
+        record = make_class(node.name, [ast.unparse(base) for base in node.bases], ast.get_docstring(node) or "",
+                            *self._span(node))
+        self.analysis["classes"].append(record)
+        self._visit_body(node, record)
+
+    def _visit_function(self, node, is_async):
+        record = make_function(node.name, [arg.arg for arg in node.args.args], ast.get_docstring(node) or "",
+                               is_async, *self._span(node))
+        # Métodos ficam na sua classe; funções aninhadas continuam em "functions"
+        if self.current_class is not None:
+            self.current_class.methods.append(record)
+        else:
+            self.analysis["functions"].append(record)
+        self._visit_body(node, None)
+
+    def visit_FunctionDef(self, node):
+        self._visit_function(node, False)
+
+    def visit_AsyncFunctionDef(self, node):
+        self._visit_function(node, True)
+
+    def _visit_body(self, node, current_class):
+        outer, self.current_class = self.current_class, current_class
+        self.generic_visit(node)
+        self.current_class = outer
+
 def analyze_python_file(content):
-    tree = ast.parse(content)
-    analysis = {"imports": [], "functions": [], "classes": [], "constants": []}
-    for node in ast.walk(tree):
-        if isinstance(node, ast.Assign) and isinstance(node.targets[0], ast.Name) and node.targets[0].id.isupper():
-            analysis["constants"].append({"name": node.targets[0].id, "value": ast.get_source_segment(content, node.value)})
-        elif isinstance(node, ast.FunctionDef):
-            analysis["functions"].append({"name": node.name, "args": [arg.arg for arg in node.args.args], "docstring": ast.get_docstring(node) or "", "code_block": ast.get_source_segment(content, node)})
-    return analysis
+    """
+    Extrai imports, funções (incluindo `async`), classes com seus métodos e constantes de um
+    arquivo Python (str ou bytes) em tempo linear no tamanho do arquivo.
+
+    Os registros (modules/symbols.py) guardam os deslocamentos em bytes de cada construção no
+    arquivo, não o código: ver `symbols.code_text`.
+    """
+    source = content if isinstance(content, bytes) else content.encode("utf-8")
+    visitor = _PythonVisitor(source)
+    visitor.visit(ast.parse(source))
+    return visitor.analysis
 
 def analyze_generic_with_regex(content, patterns):
     analysis = {"imports": [], "functions": [], "classes": [], "constants": []}
@@ -44,59 +169,281 @@ def analyze_generic_with_regex(content, patterns):
         for match in pattern.finditer(content):
             if key == "functions":
                 # Tratamento especial para funções para extrair argumentos
-                func_name = match.group(1) or match.group(2)
-                args_str = match.group(3) or ""
+                func_name = _text(match.group(1) or match.group(2))
+                args_str = _text(match.group(3) or "")
                 args = [arg.strip() for arg in args_str.split(",") if arg.strip()]
                 analysis[key].append({
                     "name": func_name,
                     "args": args,
                     "docstring": "", # Regex não consegue extrair docstrings de forma confiável
-                    "code_block": match.group(0)
+                    "code_block": _text(match.group(0))
                 })
             else:
                 name = next((g for g in match.groups() if g is not None), None)
                 if name:
-                    analysis[key].append({"name": name, "code_block": match.group(0)})
+                    analysis[key].append({"name": _text(name), "code_block": _text(match.group(0))})
     return analysis
 
 # --- Função Principal de Despacho (Dispatcher) ---
 
 ANALYSIS_CACHE = {}
 
-def analyze_code(filepath):
+def analyze_code(filepath, use_disk_cache=True):
+    """
+    Analisa um arquivo de código. Os resultados ficam em memória (por caminho) e em disco,
+    endereçados pelo SHA do blob, para que arquivos inalterados não sejam reanalisados entre execuções.
+
+    Arquivos binários, grandes demais, gerados ou minificados não são lidos por inteiro:
+    o resultado traz `skipped` com o motivo.
+    """
     if filepath in ANALYSIS_CACHE:
         return ANALYSIS_CACHE[filepath]
 
     _, extension = os.path.splitext(filepath)
-    
-    analysis = {
-        "imports": [], "functions": [], "classes": [],
-        "constants": [], "endpoints": [], "error": None
-    }
+    analysis = _empty_analysis()
 
     try:
-        with open(filepath, "r", encoding="utf-8") as f:
-            content = f.read()
+        with open(filepath, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            head = f.read(SNIFF_BYTES)
+            skip_reason = sniff_skip_reason(filepath, head, size)
+            if skip_reason:
+                analysis["skipped"] = skip_reason
+                ANALYSIS_CACHE[filepath] = analysis
+                return analysis
 
-        if extension == ".py":
-            analysis.update(analyze_python_file(content))
-        elif extension in [".js", ".jsx", ".ts", ".tsx"]:
-            analysis.update(analyze_generic_with_regex(content, JS_PATTERNS))
-        elif extension == ".java":
-            analysis.update(analyze_generic_with_regex(content, JAVA_PATTERNS))
-        elif extension in [".md", ".txt", ".html", ".css"]:
-            ANALYSIS_CACHE[filepath] = analysis
-            return analysis
-
-        for pattern in API_PATTERNS:
-            for match in pattern.finditer(content):
-                analysis["endpoints"].append({
-                    "method": match.group(1).upper(),
-                    "path": match.group(2)
-                })
+            if size >= MMAP_THRESHOLD:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    analysis = _analyze_content(filepath, extension, data, analysis, use_disk_cache)
+            else:
+                data = head + f.read()
+                analysis = _analyze_content(filepath, extension, data, analysis, use_disk_cache)
 
+    except MemoryError:
+        analysis = _empty_analysis(error=STATUS_MEMORY)
     except Exception as e:
         analysis["error"] = f"Falha ao analisar o arquivo: {e}"
 
     ANALYSIS_CACHE[filepath] = analysis
     return analysis
+
+def analyze_blob(filepath, data, blob_sha=None, use_disk_cache=True, lookup=True):
+    """
+    Como `analyze_code`, mas com o conteúdo já em memória (ex: lido do banco de objetos do Git,
+    ver modules/git_objects.py). `blob_sha` da listagem da árvore evita recalcular a chave do cache;
+    `lookup=False` pula a consulta ao cache persistente já feita por `cached_blob_analysis`.
+    """
+    if filepath in ANALYSIS_CACHE:
+        return ANALYSIS_CACHE[filepath]
+
+    _, extension = os.path.splitext(filepath)
+    analysis = _empty_analysis()
+    try:
+        skip_reason = sniff_skip_reason(filepath, data[:SNIFF_BYTES], len(data))
+        if skip_reason:
+            analysis["skipped"] = skip_reason
+        else:
+            analysis = _analyze_content(filepath, extension, data, analysis, use_disk_cache, blob_sha, lookup)
+    except MemoryError:
+        analysis = _empty_analysis(error=STATUS_MEMORY)
+    except Exception as e:
+        analysis["error"] = f"Falha ao analisar o arquivo: {e}"
+
+    ANALYSIS_CACHE[filepath] = analysis
+    return analysis
+
+def cached_blob_analysis(filepath, blob_sha, size):
+    """
+    Resultado de um blob sem lê-lo: pelo SHA (cache persistente) ou pelo tamanho e nome (filtro
+    pré-análise). None se o conteúdo precisar ser lido e analisado.
+    """
+    if filepath in ANALYSIS_CACHE:
+        return ANALYSIS_CACHE[filepath]
+    if size > MAX_FILE_BYTES or filepath.endswith(MINIFIED_SUFFIXES):
+        analysis = _empty_analysis()
+        analysis["skipped"] = sniff_skip_reason(filepath, b"", size)
+        ANALYSIS_CACHE[filepath] = analysis
+        return analysis
+    cached = get_default_cache().get(AnalysisCache.make_key(ANALYZER_VERSION, os.path.splitext(filepath)[1], blob_sha))
+    if cached is None:
+        return None
+    analysis = ANALYSIS_CACHE[filepath] = unpack(cached)
+    return analysis
+
+def _empty_analysis(error=None):
+    return {
+        "imports": [], "functions": [], "classes": [],
+        "constants": [], "endpoints": [], "error": error, "skipped": None
+    }
+
+def _analyze_content(filepath, extension, data, analysis, use_disk_cache, blob_sha=None, lookup=True):
+    """Consulta o cache persistente e, se preciso, analisa `data` (bytes ou mmap)."""
+    disk_cache = get_default_cache() if use_disk_cache else None
+    cache_key = AnalysisCache.make_key(ANALYZER_VERSION, extension, blob_sha or git_blob_sha(data))
+    if disk_cache is not None and lookup:
+        cached = disk_cache.get(cache_key)
+        if cached is not None:
+            return unpack(cached)
+
+    if extension in [".md", ".txt", ".html", ".css"]:
+        return analysis
+
+    # A varredura é sempre em bytes (modules/scanner.py). Arquivos pequenos só têm o UTF-8 validado
+    # (um arquivo inválido vira erro da análise); os grandes (mmap) são varridos sem cópia
+    is_mapped = isinstance(data, mmap.mmap)
+    if not is_mapped:
+        data.decode("utf-8")
+
+    language = EXTENSION_LANGUAGES.get(extension)
+    if language:
+        # Uma única passada extrai imports, funções, classes, constantes e endpoints
+        analysis.update(scan(data, language))
+    else:
+        if extension == ".py":
+            analysis.update(analyze_python_file(data[:] if is_mapped else data))
+        analysis["endpoints"].extend(scan_endpoints(data))
+
+    if disk_cache is not None:
+        disk_cache.put(cache_key, pack(analysis))
+    return analysis
+
+def report_skipped(results, repo_path, limit=20):
+    """Imprime os arquivos ignorados pelo filtro pré-análise, com o motivo de cada um."""
+    skipped = [(filepath, analysis["skipped"]) for filepath, analysis in results if analysis.get("skipped")]
+    if not skipped:
+        return
+    print(f"- {len(skipped)} arquivo(s) ignorado(s) antes da análise:")
+    for filepath, reason in skipped[:limit]:
+        print(f"  - {os.path.relpath(filepath, repo_path)}: {reason}")
+    if len(skipped) > limit:
+        print(f"  - ... e mais {len(skipped) - limit}.")
+
+# --- Análise em Paralelo ---
+
+# Modo banco de objetos: os itens são (filepath, SHA do blob) e cada processo lê os blobs pelo seu
+# próprio `git cat-file --batch`, aberto no primeiro uso
+_BLOB_REPO = None
+_BLOB_READER = None
+
+def _init_worker(blob_repo=None):
+    # A conexão SQLite herdada via fork já foi descartada (ver analysis_cache._reset_after_fork)
+    global _BLOB_REPO, _BLOB_READER
+    _BLOB_REPO, _BLOB_READER = blob_repo, None
+
+def _blob_reader():
+    global _BLOB_READER
+    if _BLOB_READER is None:
+        _BLOB_READER = BlobReader(_BLOB_REPO)
+    return _BLOB_READER
+
+def _item_path(item):
+    return item[0] if isinstance(item, tuple) else item
+
+def _analyze_timed(item, data=None):
+    """
+    Analisa um arquivo (caminho ou (caminho, SHA do blob)) medindo o tempo no próprio processo
+    (o pai só recebe o resultado). `data` é o blob, se já tiver sido lido em lote.
+    """
+    start = time.time()
+    started = time.perf_counter()
+    if isinstance(item, tuple):
+        filepath, blob_sha = item
+        if data is None:
+            data = _blob_reader().read(blob_sha) or b""
+        # O processo pai já consultou o cache persistente pelo SHA (`cached_blob_analysis`)
+        analysis = analyze_blob(filepath, data, blob_sha, lookup=False)
+        size = len(data)
+    else:
+        analysis = analyze_code(item)
+        try:
+            size = os.path.getsize(item)
+        except OSError:
+            size = 0
+    timing = {"start": start, "seconds": time.perf_counter() - started, "pid": os.getpid(), "bytes": size}
+    return analysis, timing
+
+def _iter_timed(items, reader=None):
+    """Analisa os itens em ordem; blobs são lidos em lote por um único pedido ao `cat-file`."""
+    blobs = [item[1] for item in items if isinstance(item, tuple)]
+    contents = iter((reader or _blob_reader()).read_many(blobs)) if blobs else None
+    for item in items:
+        data = None
+        if isinstance(item, tuple):
+            data = next(contents)[1] or b""
+        yield _analyze_timed(item, data)
+
+def _analyze_isolated(item):
+    """Executado no worker isolado: analisa um arquivo e devolve também o uso do cache persistente."""
+    cache = get_default_cache()
+    hits, misses = cache.hits, cache.misses
+    analysis, timing = _analyze_timed(item)
+    return pack(analysis), timing, cache.hits - hits, cache.misses - misses
+
+def analyze_files(filepaths, jobs=1, chunk_size=None, timeout=FILE_TIMEOUT_SECONDS, max_memory_mb=FILE_MEMORY_MB,
+                  tree=None):
+    """
+    Analisa vários arquivos em lotes espalhados por `jobs` workers isolados (modules/worker_pool.py).
+    Retorna uma lista de (filepath, analysis) na mesma ordem de `filepaths`, para manter o prompt estável.
+
+    Com `timeout` (segundos) ou `max_memory_mb`, um worker que estoura o orçamento em um arquivo é
+    morto: o arquivo fica com `error` "timeout" (ou "memory") e o restante do lote segue um arquivo
+    por vez. Sem orçamento (ambos 0) e com um único job, a análise roda no próprio processo.
+
+    Com `tree` (modules/git_objects.GitTree), o conteúdo vem do banco de objetos do Git em vez do
+    disco, e os blobs cujo SHA já está no cache persistente nem são lidos.
+    """
+    filepaths = [intern(filepath) for filepath in filepaths]
+    if jobs is None or jobs <= 0:
+        jobs = os.cpu_count() or 1
+    items, blob_repo = filepaths, None
+    if tree is not None:
+        items, blob_repo = [], tree.repo_path
+        for filepath in dict.fromkeys(filepaths):
+            if cached_blob_analysis(filepath, tree.blob_sha(filepath), tree.size(filepath)) is None:
+                items.append((filepath, tree.blob_sha(filepath)))
+    if not (timeout or max_memory_mb) and (jobs == 1 or len(items) < 2):
+        # No próprio processo: o `cat-file` da árvore é o mesmo da renderização do prompt
+        for item, (analysis, timing) in zip(items, _iter_timed(items, tree.reader() if tree else None)):
+            TRACER.record_file(_item_path(item), timing, analysis)
+        return [(filepath, ANALYSIS_CACHE[filepath]) for filepath in filepaths]
+    if chunk_size is None:
+        # Lotes pequenos o bastante para balancear a carga, grandes o bastante para amortizar o IPC
+        chunk_size = max(1, min(256, len(items) // (jobs * 4)))
+    _analyze_files_isolated(items, jobs, timeout, max_memory_mb, blob_repo, chunk_size=chunk_size)
+    return [(filepath, ANALYSIS_CACHE[filepath]) for filepath in filepaths]
+
+def _analyze_files_isolated(items, jobs, timeout, max_memory_mb, blob_repo=None, chunk_size=1):
+    # Arquivos já analisados neste processo não precisam de worker
+    todo = [item for item in dict.fromkeys(items) if _item_path(item) not in ANALYSIS_CACHE]
+    cache = get_default_cache()
+    for index, status, result in run_isolated(_analyze_isolated, todo, jobs=jobs, timeout=timeout,
+                                              max_memory_mb=max_memory_mb, chunk_size=chunk_size,
+                                              initializer=functools.partial(_init_worker, blob_repo)):
+        if status == "ok":
+            packed, timing, hits, misses = result
+            analysis = unpack(packed)
+            cache.hits += hits
+            cache.misses += misses
+        else:
+            analysis = _empty_analysis(error=status)
+            # Tempo até o worker ser morto (timeout) ou até a falha ser percebida
+            seconds = timeout if status == STATUS_TIMEOUT else 0.0
+            timing = {"start": time.time() - seconds, "seconds": seconds, "pid": None, "bytes": 0}
+        ANALYSIS_CACHE[_item_path(todo[index])] = analysis
+        TRACER.record_file(_item_path(todo[index]), timing, analysis)
+
+def report_offenders(results, repo_path, limit=20):
+    """
+    Resume os arquivos que estouraram o orçamento de tempo/memória ou derrubaram o worker,
+    candidatos a entrar na lista de exclusões.
+    """
+    offenders = [(filepath, analysis["error"]) for filepath, analysis in results
+                 if analysis.get("error") in (STATUS_TIMEOUT, STATUS_MEMORY, STATUS_CRASH)]
+    if not offenders:
+        return
+    labels = {STATUS_TIMEOUT: "tempo esgotado", STATUS_MEMORY: "memória esgotada", STATUS_CRASH: "worker encerrado"}
+    print(f"- {len(offenders)} arquivo(s) estouraram o orçamento da análise (considere excluí-los):")
+    for filepath, error in offenders[:limit]:
+        print(f"  - {os.path.relpath(filepath, repo_path)}: {labels[error]}")
+    if len(offenders) > limit:
+        print(f"  - ... e mais {len(offenders) - limit}.")
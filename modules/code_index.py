@@ -0,0 +1,222 @@
+import os
+import posixpath
+import re
+from collections import defaultdict
+
+# --- Índice do Código: Grafo de Imports e Tabela de Símbolos ---
+#
+# Construído uma vez por execução a partir da saída do analisador. Os imports de cada arquivo são
+# resolvidos para arquivos do próprio repositório, formando o grafo de dependências entre módulos
+# (vizinhos de um arquivo em O(1)), e cada definição vai para a tabela nome -> (arquivo, span).
+#
+# O índice guarda por arquivo apenas os dados brutos (nomes importados e definições), que são o que
+# se persiste (estado incremental, cache de etapas); as arestas são sempre re-resolvidas, porque um
+# import antes sem destino pode passar a apontar para um arquivo novo.
+
+# Diagrama Mermaid: máximo de componentes (os mais conectados) e de arestas desenhadas
+MAX_DIAGRAM_NODES = 25
+MAX_DIAGRAM_EDGES = 60
+
+def file_entry(analysis):
+    """Dados de um arquivo que entram no índice: nomes importados e definições [nome, tipo, início, fim]."""
+    symbols = [[s.name, "function", s.start, s.end] for s in analysis.get("functions", ())]
+    for cls in analysis.get("classes", ()):
+        symbols.append([cls.name, "class", cls.start, cls.end])
+        symbols.extend([f"{cls.name}.{m.name}", "method", m.start, m.end] for m in cls.methods)
+    symbols.extend([s.name, "constant", s.start, s.end] for s in analysis.get("constants", ()))
+    return {"imports": [s.name for s in analysis.get("imports", ())], "symbols": symbols}
+
+def _rel(repo_path, filepath):
+    return os.path.relpath(filepath, repo_path).replace(os.sep, "/")
+
+def _module_key(rel_path):
+    key = posixpath.splitext(rel_path)[0]
+    # Pacotes: `import pkg` aponta para pkg/__init__.py e `./components` para components/index.js
+    if posixpath.basename(key) in ("__init__", "index"):
+        key = posixpath.dirname(key)
+    return key
+
+class CodeIndex:
+    """
+    Grafo de dependências entre os arquivos analisados e tabela de símbolos.
+
+    - `imports[arquivo]`: arquivos do repositório que ele importa;
+    - `importers[arquivo]`: arquivos que o importam (fan-in = `len`);
+    - `symbols[nome]`: lista de (arquivo, tipo, início, fim), com spans em bytes como em modules/symbols.py.
+
+    Caminhos são relativos ao repositório, sempre com `/`.
+    """
+
+    def __init__(self, files=None):
+        self.files = dict(files or {})
+        self.modules = {}
+        self._by_name = defaultdict(list)
+        for rel_path in self.files:
+            key = _module_key(rel_path)
+            self.modules[key] = rel_path
+            self._by_name[posixpath.basename(key)].append(key)
+
+        self.imports = {}
+        self.importers = defaultdict(list)
+        self.symbols = defaultdict(list)
+        for rel_path, entry in self.files.items():
+            importer_dir = posixpath.dirname(rel_path)
+            targets = []
+            for name in entry["imports"]:
+                target = self.resolve(importer_dir, name)
+                if target and target != rel_path and target not in targets:
+                    targets.append(target)
+                    self.importers[target].append(rel_path)
+            self.imports[rel_path] = targets
+            for name, kind, start, end in entry["symbols"]:
+                self.symbols[name].append((rel_path, kind, start, end))
+
+    @classmethod
+    def from_analysis(cls, repo_path, code_analysis, duplicates=None):
+        """
+        Índice dos arquivos de `code_analysis`. As cópias de `duplicates` (modules/dedup.py) entram no
+        grafo com os imports do representante, mas sem símbolos: cada definição aparece uma vez.
+        """
+        files = {}
+        for filepath, analysis in code_analysis.items():
+            entry = files[_rel(repo_path, filepath)] = file_entry(analysis)
+            for copy in (duplicates or {}).get(filepath, ()):
+                files[_rel(repo_path, copy)] = {"imports": entry["imports"], "symbols": []}
+        return cls(files)
+
+    def updated(self, repo_path, code_analysis, removed=(), duplicates=None):
+        """Novo índice com os arquivos de `code_analysis` reindexados e os de `removed` retirados (modo incremental)."""
+        removed = set(removed)
+        files = {rel_path: entry for rel_path, entry in self.files.items() if rel_path not in removed}
+        files.update(CodeIndex.from_analysis(repo_path, code_analysis, duplicates).files)
+        return CodeIndex(files)
+
+    def to_json(self):
+        return self.files
+
+    def _lookup(self, candidate):
+        """Arquivo cujo módulo é `candidate` ou termina com ele (`com/acme/Service`, `modules/symbols`)."""
+        for key in self._by_name.get(posixpath.basename(candidate), ()):
+            if key == candidate or key.endswith("/" + candidate):
+                return self.modules[key]
+        return None
+
+    def resolve(self, importer_dir, name):
+        """
+        Arquivo do repositório importado por `name`, ou None (bibliotecas externas, imports dinâmicos).
+
+        Imports relativos (`./utils`, `from .models import X`) são resolvidos a partir do diretório
+        do arquivo; os absolutos (`modules.symbols`, `com.acme.Service`) casam pelo sufixo do caminho.
+        `from pkg import mod` chega como `pkg.mod`: tenta o nome completo e depois o módulo pai.
+        """
+        name = name.strip().removeprefix("static ").rstrip(";").strip()
+        if name.startswith("./") or name.startswith("../"):
+            key = _module_key(posixpath.normpath(posixpath.join(importer_dir, name)))
+            return self.modules.get(key)
+        if name.startswith("."):
+            level = len(name) - len(name.lstrip("."))
+            base = importer_dir
+            for _ in range(level - 1):
+                base = posixpath.dirname(base)
+            parts = [part for part in name[level:].split(".") if part and part != "*"]
+            for size in (len(parts), len(parts) - 1):
+                if size < 0:
+                    continue
+                key = posixpath.normpath(posixpath.join(base, *parts[:size])) if size else base
+                if key in self.modules:
+                    return self.modules[key]
+            return None
+        parts = [part for part in name.replace("/", ".").split(".") if part and part != "*"]
+        for size in (len(parts), len(parts) - 1):
+            if size > 0:
+                target = self._lookup("/".join(parts[:size]))
+                if target:
+                    return target
+        return None
+
+    def neighbours(self, rel_path):
+        """(arquivos que `rel_path` importa, arquivos que o importam)."""
+        return self.imports.get(rel_path, []), self.importers.get(rel_path, [])
+
+    def lookup(self, name):
+        """Definições de `name` (função, classe, `Classe.metodo` ou constante): [(arquivo, tipo, início, fim)]."""
+        return self.symbols.get(name, [])
+
+    def fan_in(self):
+        return {rel_path: len(importers) for rel_path, importers in self.importers.items()}
+
+    def stats(self):
+        return {"files": len(self.files), "edges": sum(len(targets) for targets in self.imports.values()),
+                "symbols": sum(len(definitions) for definitions in self.symbols.values())}
+
+    def _common_prefix(self):
+        directories = [posixpath.dirname(rel_path).split("/") for rel_path in self.files]
+        common = []
+        for parts in zip(*directories):
+            if len(set(parts)) != 1 or not parts[0]:
+                break
+            common.append(parts[0])
+        return len(common)
+
+    def components(self, max_nodes=MAX_DIAGRAM_NODES):
+        """
+        Agrupa os arquivos em componentes: diretórios abaixo do prefixo comum a todos (ex: `src/`), no
+        nível mais profundo que ainda rende no máximo `max_nodes` componentes; arquivos da raiz são
+        componentes próprios. Retorna ({arquivo: componente}, {(origem, destino): imports}).
+        """
+        common = self._common_prefix()
+        paths = {rel_path: rel_path.split("/")[common:] for rel_path in self.files}
+        max_depth = max((len(parts) - 1 for parts in paths.values()), default=0)
+
+        def group(depth):
+            return {rel_path: "/".join(parts[:min(depth, len(parts) - 1)]) or _module_key(parts[0]) or parts[0]
+                    for rel_path, parts in paths.items()}
+
+        component_of = group(1)
+        for depth in range(2, max_depth + 1):
+            candidate = group(depth)
+            if len(set(candidate.values())) > max_nodes:
+                break
+            component_of = candidate
+        return component_of, self.component_edges(component_of)
+
+    def component_edges(self, component_of):
+        """Imports entre componentes diferentes: {(origem, destino): imports}."""
+        edges = defaultdict(int)
+        for rel_path, targets in self.imports.items():
+            for target in targets:
+                source, destination = component_of[rel_path], component_of[target]
+                if source != destination:
+                    edges[(source, destination)] += 1
+        return dict(edges)
+
+    def mermaid(self, max_nodes=MAX_DIAGRAM_NODES, max_edges=MAX_DIAGRAM_EDGES, component_of=None):
+        """
+        Diagrama de componentes em Mermaid (`graph LR`) a partir dos imports reais, ou "" sem arestas.
+        `component_of` ({arquivo: componente}) substitui o agrupamento por diretório (ex: subprojetos).
+        """
+        if component_of is None:
+            component_of, edges = self.components(max_nodes)
+        else:
+            edges = self.component_edges(component_of)
+        if not edges:
+            return ""
+        degree = defaultdict(int)
+        for (source, destination), count in edges.items():
+            degree[source] += count
+            degree[destination] += count
+        nodes = sorted(degree, key=lambda node: (-degree[node], node))[:max_nodes]
+        kept = set(nodes)
+        drawn = sorted(((pair, count) for pair, count in edges.items() if pair[0] in kept and pair[1] in kept),
+                       key=lambda item: (-item[1], item[0]))[:max_edges]
+        files_per_component = defaultdict(int)
+        for component in component_of.values():
+            files_per_component[component] += 1
+        ids = {node: f"c{index}_{re.sub(r'[^A-Za-z0-9_]', '_', node)}" for index, node in enumerate(sorted(kept))}
+
+        lines = ["graph LR"]
+        for node in sorted(kept):
+            lines.append(f'    {ids[node]}["{node} ({files_per_component[node]} arq.)"]')
+        for (source, destination), count in drawn:
+            lines.append(f"    {ids[source]} -->|{count}| {ids[destination]}")
+        return "\n".join(lines)
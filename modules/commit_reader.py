@@ -1,20 +1,89 @@
-from git import Repo
+import os
+import subprocess
 from collections import defaultdict
 
-def read_commits(repo_path):
+# Separadores de campo/registro que não aparecem em mensagens de commit comuns
+FIELD_SEP = "\x1f"
+RECORD_SEP = "\x1e"
+LOG_FORMAT = f"%H{FIELD_SEP}%an{FIELD_SEP}%cI{FIELD_SEP}%B{RECORD_SEP}"
+
+CHECKPOINT_FILE = "codoc_commit_checkpoint"
+
+def _git(repo_path, *args):
+    result = subprocess.run(["git", *args], cwd=repo_path, capture_output=True, text=True)
+    return result.returncode, result.stdout.strip()
+
+def _checkpoint_path(repo_path):
+    # Fica dentro do .git do clone, que sobrevive ao fetch incremental do git_fetcher
+    _, git_dir = _git(repo_path, "rev-parse", "--absolute-git-dir")
+    return os.path.join(git_dir, CHECKPOINT_FILE)
+
+def load_checkpoint(repo_path):
+    try:
+        with open(_checkpoint_path(repo_path), "r", encoding="utf-8") as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+def save_checkpoint(repo_path, sha):
+    with open(_checkpoint_path(repo_path), "w", encoding="utf-8") as f:
+        f.write(sha)
+
+def iter_commits(repo_path, max_count=None, since=None, paths=None, since_sha=None, rev="HEAD"):
+    """
+    Lê o histórico em streaming a partir de um único `git log --format=...`, sem criar objetos por commit.
+
+    `since_sha` limita a leitura aos commits mais novos que ele (`since_sha..rev`).
+    """
+    command = ["git", "log", f"--format={LOG_FORMAT}"]
+    if max_count:
+        command.append(f"--max-count={int(max_count)}")
+    if since:
+        command.append(f"--since={since}")
+    command.append(f"{since_sha}..{rev}" if since_sha else rev)
+    if paths:
+        command.append("--")
+        command.extend(paths)
+
+    process = subprocess.Popen(command, cwd=repo_path, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                               text=True, encoding="utf-8", errors="replace")
+    buffer = ""
+    try:
+        for chunk in iter(lambda: process.stdout.read(65536), ""):
+            buffer += chunk
+            *records, buffer = buffer.split(RECORD_SEP)
+            for record in records:
+                record = record.lstrip("\n")
+                if not record:
+                    continue
+                sha, author, date, message = record.split(FIELD_SEP, 3)
+                yield {"hash": sha, "author": author, "date": date, "message": message.strip()}
+    finally:
+        process.stdout.close()
+        process.wait()
+
+def read_commits(repo_path, max_count=None, since=None, paths=None, incremental=False):
     """
     Lê o histórico de commits de um repositório e agrupa por autor.
+
+    Com `incremental=True`, lê apenas os commits posteriores ao último SHA processado
+    (checkpoint salvo no repositório) e avança o checkpoint para o HEAD atual.
     """
-    repo = Repo(repo_path)
+    since_sha = None
+    if incremental:
+        since_sha = load_checkpoint(repo_path)
+        # Checkpoint inválido (force-push, clone raso novo, etc.): volta para a leitura completa
+        if since_sha and _git(repo_path, "merge-base", "--is-ancestor", since_sha, "HEAD")[0] != 0:
+            since_sha = None
+
     commits_by_author = defaultdict(list)
+    for commit in iter_commits(repo_path, max_count=max_count, since=since, paths=paths, since_sha=since_sha):
+        author = commit.pop("author")
+        commits_by_author[author].append(commit)
 
-    for commit in repo.iter_commits():
-        author = commit.author.name
-        commit_data = {
-            "hash": commit.hexsha,
-            "message": commit.message.strip(),
-            "date": commit.committed_datetime.isoformat(),
-        }
-        commits_by_author[author].append(commit_data)
+    if incremental:
+        returncode, head = _git(repo_path, "rev-parse", "HEAD")
+        if returncode == 0:
+            save_checkpoint(repo_path, head)
 
-    return dict(commits_by_author)
\ No newline at end of file
+    return dict(commits_by_author)
@@ -0,0 +1,73 @@
+import hashlib
+import os
+import re
+from collections import defaultdict
+
+from modules.analysis_cache import git_blob_sha
+from modules.code_analyzer import MAX_FILE_BYTES
+from modules.symbols import read_source
+
+# --- Deduplicação de Arquivos ---
+#
+# Bibliotecas vendorizadas, migrations copiadas e serviços gerados a partir do mesmo template
+# repetem arquivos inteiros. Cópias de mesmo conteúdo (e mesma extensão, que decide o analisador)
+# formam um grupo: só o representante é analisado e entra no prompt, com a lista das cópias.
+#
+# - "exact": mesmo SHA de blob. Só arquivos com a mesma extensão e o mesmo tamanho são lidos;
+# - "whitespace": também iguais a menos de espaços, tabulações e quebras de linha (lê todos);
+# - "off": sem deduplicação.
+#
+# No modo `--bare` (modules/git_objects.py), tamanhos e SHAs vêm da listagem da árvore: o modo
+# "exact" não lê nenhum arquivo.
+
+WHITESPACE = re.compile(rb"\s+")
+
+def _read(filepath, tree=None):
+    """Conteúdo do arquivo (ou do blob, no modo `--bare`); None se não puder ser lido, e ele fica fora dos grupos."""
+    try:
+        return tree.read_source(filepath) if tree is not None else read_source(filepath)
+    except OSError:
+        return None
+
+def _whitespace_key(data):
+    return hashlib.sha1(WHITESPACE.sub(b" ", data).strip()).hexdigest()
+
+def group_duplicates(filepaths, mode="exact", tree=None):
+    """
+    Agrupa os arquivos de conteúdo igual. Retorna {representante: [cópias]} apenas para os grupos
+    com mais de um arquivo; o representante é o menor caminho do grupo (estável entre execuções).
+    Com `tree` (GitTree), tamanho, SHA e conteúdo vêm do banco de objetos em vez do disco.
+    """
+    if mode == "off":
+        return {}
+    by_size = defaultdict(list)
+    for filepath in dict.fromkeys(filepaths):
+        try:
+            size = tree.size(filepath) if tree is not None else os.path.getsize(filepath)
+        except OSError:
+            continue
+        # Arquivos vazios não têm o que documentar; os grandes demais o analisador nem lê
+        if 0 < size <= MAX_FILE_BYTES:
+            # No modo exato, tamanhos diferentes já bastam para descartar a igualdade sem ler o arquivo
+            by_size[(os.path.splitext(filepath)[1], size if mode == "exact" else None)].append(filepath)
+
+    groups = defaultdict(list)
+    for (extension, _), candidates in by_size.items():
+        if len(candidates) < 2:
+            continue
+        for filepath in candidates:
+            if tree is not None and mode == "exact":
+                groups[(extension, tree.blob_sha(filepath))].append(filepath)
+                continue
+            data = _read(filepath, tree)
+            if data is None:
+                continue
+            key = git_blob_sha(data) if mode == "exact" else _whitespace_key(data)
+            groups[(extension, key)].append(filepath)
+
+    duplicates = {}
+    for members in groups.values():
+        if len(members) > 1:
+            members.sort()
+            duplicates[members[0]] = members[1:]
+    return duplicates
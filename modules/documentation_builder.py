@@ -1,51 +1,402 @@
+import contextlib
+import io
 import os
-import requests
 import json
+import time
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
 
-API_URL = "https://api.openai.com/v1/chat/completions"
+from modules.llm_client import get_default_client
+from modules.response_cache import get_response_cache, prompt_key
+from modules.symbols import code_text, read_source
 
-def build_documentation(repo_path, classification, commits, code_analysis):
+MODEL = "gpt-4o"
+TEMPERATURE = 0.4
+
+SYSTEM_MESSAGE = ("Você é um arquiteto de soluções e redator técnico de elite, com a rara habilidade de analisar sistemas complexos e produzir documentação cristalina. "
+                  "Sua análise é incisiva, precisa e antecipa as necessidades do leitor. Você segue padrões de documentação rigorosos como o 'Diátaxis' e o 'arc42'. "
+                  "Seu público são outros engenheiros de software; a clareza e a precisão técnica são imperativas. Use Markdown e formatação Mermaid para diagramas quando aplicável.")
+
+# Modo map-reduce: orçamento de tokens por lote de arquivos e chamadas simultâneas
+DEFAULT_CHUNK_TOKENS = 60000
+DEFAULT_LLM_CONCURRENCY = 4
+REFERENCE_MARKER = "<!-- REFERENCIA_TECNICA -->"
+HISTORY_HEADING = "## 4. Análise do Histórico"
+# Orçamento de tokens do prompt único: arquivos de menor prioridade (modules/ranking.py) são omitidos; 0 = sem limite
+DEFAULT_PROMPT_TOKENS = int(os.getenv("PROMPT_TOKEN_BUDGET", "0"))
+
+def estimate_tokens(text):
+    # Estimativa conservadora (~4 caracteres por token para texto/código em inglês e português)
+    return len(text) // 4 + 1
+
+@lru_cache(maxsize=1)
+def _tokenizer():
+    # tiktoken é opcional: sem ele, o orçamento usa a estimativa por caracteres
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(MODEL)
+    except (KeyError, ValueError):
+        return tiktoken.get_encoding("o200k_base")
+
+def count_tokens(text):
+    """Tokens de `text` no tokenizador do modelo (se tiktoken estiver instalado) ou a estimativa de `estimate_tokens`."""
+    encoding = _tokenizer()
+    if encoding is None:
+        return estimate_tokens(text)
+    return len(encoding.encode(text, disallowed_special=()))
+
+def _chat_completion(prompt, timeout=300, use_cache=True):
+    """
+    Faz uma chamada ao endpoint de chat completions e retorna (conteúdo, uso de tokens).
+    Prompts idênticos (mesmo modelo, mensagem de sistema e temperatura) são respondidos pelo cache persistente.
+    """
+    cache = get_response_cache() if use_cache else None
+    key = prompt_key(MODEL, SYSTEM_MESSAGE, TEMPERATURE, prompt)
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached["content"], cached["usage"]
+
+    payload = {
+        "model": MODEL,
+        "messages": [{"role": "system", "content": SYSTEM_MESSAGE}, {"role": "user", "content": prompt}],
+        "temperature": TEMPERATURE
+    }
+    # Cliente compartilhado: keep-alive, retentativas em 429/5xx e limites de RPM/TPM (ver modules/llm_client.py)
+    response_data = get_default_client().chat_completion(payload, estimated_tokens=estimate_tokens(prompt), timeout=timeout)
+    content, usage = response_data["choices"][0]["message"]["content"], response_data.get("usage", {})
+    if cache is not None:
+        cache.put(key, {"content": content, "usage": usage})
+    return content, usage
+
+def _stream_completion_to_file(prompt, doc_filepath, timeout=300, use_cache=True):
+    """
+    Chama a API em modo streaming (SSE), acrescentando cada trecho a `<README>.part` à medida que
+    chega; só uma resposta completa substitui o README e entra no cache. Um stream interrompido ou
+    cortado por tamanho levanta IncompleteStreamError (modules/llm_client.py) e apaga o `.part`.
+    Reporta o tempo até o primeiro byte e a latência total. Retorna o uso de tokens.
+    """
+    cache = get_response_cache() if use_cache else None
+    key = prompt_key(MODEL, SYSTEM_MESSAGE, TEMPERATURE, prompt)
+    cached = cache.get(key) if cache is not None else None
+    if cached is not None:
+        with open(doc_filepath, "w", encoding="utf-8") as f:
+            f.write(cached["content"])
+        return cached["usage"]
+
+    payload = {
+        "model": MODEL,
+        "messages": [{"role": "system", "content": SYSTEM_MESSAGE}, {"role": "user", "content": prompt}],
+        "temperature": TEMPERATURE
+    }
+    parts, usage = [], {}
+    started = time.monotonic()
+    first_byte = None
+    partial_filepath = doc_filepath + ".part"
+    try:
+        with open(partial_filepath, "w", encoding="utf-8") as f:
+            for event in get_default_client().stream_chat_completion(payload, estimated_tokens=estimate_tokens(prompt), timeout=timeout):
+                usage = event.get("usage") or usage
+                for choice in event.get("choices", []):
+                    text = (choice.get("delta") or {}).get("content")
+                    if not text:
+                        continue
+                    if first_byte is None:
+                        first_byte = time.monotonic() - started
+                        print(f"[doc_builder] Primeiro trecho recebido em {first_byte:.2f}s.")
+                    f.write(text)
+                    f.flush()
+                    parts.append(text)
+        os.replace(partial_filepath, doc_filepath)
+    except BaseException:
+        # Resposta incompleta: o README anterior (se houver) fica intacto e nada vai para o cache
+        with contextlib.suppress(OSError):
+            os.remove(partial_filepath)
+        raise
+    print(f"[doc_builder] Resposta completa em {time.monotonic() - started:.2f}s ({sum(len(p) for p in parts)} caracteres).")
+    if cache is not None:
+        cache.put(key, {"content": "".join(parts), "usage": usage})
+    return usage
+
+def _report_cache(use_cache):
+    if use_cache:
+        stats = get_response_cache().stats()
+        print(f"[doc_builder] Cache de respostas: {stats['hits']} hit(s), {stats['misses']} miss(es).")
+
+def _write_readme(output_dir, doc_content):
+    doc_filepath = os.path.join(output_dir, "README_GERADO.md")
+    with open(doc_filepath, "w", encoding="utf-8") as f:
+        f.write(doc_content)
+    return doc_filepath
+
+def build_documentation(repo_path, classification, commits, code_analysis, file_sections=None,
+                        chunked=False, chunk_tokens=DEFAULT_CHUNK_TOKENS, concurrency=DEFAULT_LLM_CONCURRENCY,
+                        use_cache=True, stream=False, token_budget=None, diagram="", output_dir=None):
+    """
+    Gera o README_GERADO.md em `output_dir` (padrão: `repo_path`). As seções entram no prompt na ordem de `file_sections` (priorizada
+    pelo orquestrador); `token_budget` limita o prompt único e é ignorado no modo `chunked`, que
+    já divide os arquivos em lotes de `chunk_tokens`. `diagram` é o grafo de componentes em Mermaid
+    extraído dos imports (modules/code_index.py), dado ao modelo como base da seção de arquitetura.
+    """
     api_key = os.getenv("OPENAI_API_KEY")
     if not api_key:
         print("[doc_builder] Chave da API não encontrada.")
         return None
+    output_dir = output_dir or repo_path
 
-    prompt = build_killer_prompt(repo_path, classification, commits, code_analysis)
-    
-    headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
+    if file_sections is None:
+        file_sections = build_file_sections(repo_path, code_analysis)
 
-    system_message = ("Você é um arquiteto de soluções e redator técnico de elite, com a rara habilidade de analisar sistemas complexos e produzir documentação cristalina. "
-                      "Sua análise é incisiva, precisa e antecipa as necessidades do leitor. Você segue padrões de documentação rigorosos como o 'Diátaxis' e o 'arc42'. "
-                      "Seu público são outros engenheiros de software; a clareza e a precisão técnica são imperativas. Use Markdown e formatação Mermaid para diagramas quando aplicável.")
+    if chunked:
+        return build_documentation_map_reduce(repo_path, commits, file_sections, chunk_tokens=chunk_tokens,
+                                              concurrency=concurrency, use_cache=use_cache, diagram=diagram,
+                                              output_dir=output_dir)
 
-    payload = {
-        "model": "gpt-4o",
-        "messages": [{"role": "system", "content": system_message}, {"role": "user", "content": prompt}],
-        "temperature": 0.4
-    }
+    prompt = build_killer_prompt(repo_path, classification, commits, code_analysis, file_sections=file_sections,
+                                 token_budget=token_budget, diagram=diagram)
 
     print("[doc_builder] Gerando documentação com o prompt de elite...")
+    if stream:
+        doc_filepath = os.path.join(output_dir, "README_GERADO.md")
+        try:
+            token_usage = _stream_completion_to_file(prompt, doc_filepath, use_cache=use_cache)
+            print(f"[doc_builder] Total de tokens usados: {token_usage.get('total_tokens', 'N/A')}")
+            _report_cache(use_cache)
+            return doc_filepath
+        except Exception as e:
+            print(f"[doc_builder] Erro na chamada da API: {e}")
+            return None
+
+    started = time.monotonic()
     try:
-        response = requests.post(API_URL, headers=headers, json=payload, timeout=300)
-        response.raise_for_status()
-        response_data = response.json()
-        doc_content = response_data["choices"][0]["message"]["content"]
-        token_usage = response_data.get("usage", {})
+        doc_content, token_usage = _chat_completion(prompt, use_cache=use_cache)
+        print(f"[doc_builder] Resposta recebida em {time.monotonic() - started:.2f}s.")
         print(f"[doc_builder] Total de tokens usados: {token_usage.get('total_tokens', 'N/A')}")
-        doc_filepath = os.path.join(repo_path, "README_GERADO.md")
-        with open(doc_filepath, "w", encoding="utf-8") as f:
-            f.write(doc_content)
-        return doc_filepath
+        _report_cache(use_cache)
+        return _write_readme(output_dir, doc_content)
     except Exception as e:
         print(f"[doc_builder] Erro na chamada da API: {e}")
         return None
 
-def build_killer_prompt(repo_path, classification, commits, code_analysis):
-    repo_name = os.path.basename(repo_path.strip("/"))
+# --- Modo Map-Reduce ---
+
+CONTINUATION_TITLE = "#### Arquivo: `{rel_path}` (continuação, parte {part} de {total})\n\n"
+
+def split_section(rel_path, section, token_budget):
+    """
+    Divide uma seção maior que `token_budget` em partes que cabem nele, em quebras de linha (uma linha
+    maior que a parte inteira é cortada). Cada parte depois da primeira ganha o título do arquivo
+    marcado como continuação; um bloco de código cortado é fechado no fim da parte e reaberto na seguinte.
+    """
+    lines = section.splitlines(keepends=True)
+    longest_fence = max((len(line) for line in lines if line.startswith("```")), default=0)
+    overhead = len(CONTINUATION_TITLE.format(rel_path=rel_path, part=len(section), total=len(section)))
+    # estimate_tokens(parte) <= token_budget  <=>  len(parte) < 4 * token_budget
+    limit = max(4 * token_budget - 1 - overhead - longest_fence - len("\n```\n"), 80)
+
+    parts, current, size, fence = [], [], 0, ""
+
+    def flush():
+        nonlocal current, size
+        part = "".join(current)
+        if fence:
+            part += ("" if part.endswith("\n") else "\n") + "```\n"
+        parts.append(part)
+        current, size = [fence] if fence else [], 0
+
+    for line in lines:
+        while size + len(line) > limit:
+            if size:
+                flush()
+            else:
+                current.append(line[:limit])
+                line, size = line[limit:], limit
+        if not line:
+            continue
+        if line.startswith("```"):
+            fence = "" if fence else line
+        current.append(line)
+        size += len(line)
+    if size:
+        flush()
+
+    return parts[:1] + [CONTINUATION_TITLE.format(rel_path=rel_path, part=number, total=len(parts)) + part
+                        for number, part in enumerate(parts[1:], 2)]
+
+def batch_sections(file_sections, token_budget):
+    """
+    Agrupa as seções por arquivo em lotes cujo tamanho estimado não passa de `token_budget`.
+    Uma seção maior que o orçamento é dividida em partes (`split_section`), que entram nos lotes
+    como seções comuns. A ordem original é preservada.
+    """
+    batches, current, current_tokens = [], [], 0
+    for rel_path, section in file_sections.items():
+        tokens = estimate_tokens(section)
+        pieces = split_section(rel_path, section, token_budget) if tokens > token_budget else [section]
+        for piece in pieces:
+            tokens = estimate_tokens(piece)
+            if current and current_tokens + tokens > token_budget:
+                batches.append(current)
+                current, current_tokens = [], 0
+            current.append(piece)
+            current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+def build_map_prompt(repo_name, sections):
+    prompt = (f"# Referência Técnica (parcial) do Projeto: {repo_name}\n\n"
+              "Você está documentando apenas um subconjunto dos arquivos do projeto. "
+              "Para cada arquivo abaixo, gere a documentação técnica seguindo o formato rigoroso indicado, "
+              "mantendo o título `#### Arquivo:` de cada um. Não escreva introdução nem conclusão.\n\n")
+    return "".join([prompt, *sections])
+
+def _digest(map_output, max_chars=4000):
+    # Apenas títulos e itens de destaque: o suficiente para a visão geral sem reenviar tudo
+    lines = [line for line in map_output.splitlines() if line.startswith("#") or line.lstrip().startswith("- **")]
+    return "\n".join(lines)[:max_chars]
+
+def build_reduce_prompt(repo_name, commits, map_outputs, diagram=""):
+    """
+    Prompt da fase "reduce". As seções 1, 2 e 4 são escritas pelo modelo; a seção 3 é montada pela
+    ferramenta (ver `build_documentation_map_reduce`) e entra no lugar de REFERENCE_MARKER.
+    """
     prompt = f"""# Análise e Documentação Técnica do Projeto: {repo_name}
 
+A referência técnica de cada arquivo já foi escrita separadamente, em {len(map_outputs)} lote(s) de arquivos. Abaixo estão, um lote após o outro, os títulos e símbolos documentados de cada lote (juntos, eles cobrem todos os arquivos do projeto), seguidos do histórico de commits.
+
+Escreva o README com **exatamente** esta estrutura, nesta ordem:
+
 ## 1. Análise Arquitetural (Framework Diátaxis - Visão Geral)
 
+Escrita por você. Sintetize os resumos de **todos** os lotes como um único projeto (não descreva lote por lote nem arquivo por arquivo): o **propósito fundamental**, o **domínio do problema** que ele resolve, e os **principais componentes de software** e suas interações. Se possível, gere um diagrama de componentes simples usando Mermaid.
+
+## 2. Guia de Iniciação Rápida (Tutorial)
+
+Escrita por você. Crie um guia passo a passo para um novo desenvolvedor configurar e executar este projeto localmente, a partir dos arquivos de dependência e de build que aparecem nos resumos.
+
+## 3. Referência Técnica Detalhada
+
+**Não escreva esta seção.** No lugar dela, escreva em uma linha isolada exatamente `{REFERENCE_MARKER}`. A ferramenta substitui essa linha pelo título da seção 3 seguido da referência completa de todos os lotes, concatenada na ordem dos arquivos e sem alterações: não repita o título nem a documentação dos arquivos.
+
+## 4. Análise do Histórico de Desenvolvimento (Explanation)
+
+Escrita por você, logo depois da linha acima, seguindo as instruções da seção 4 no final deste prompt e usando apenas os commits listados ali.
+
+"""
+    out = io.StringIO()
+    out.write(prompt)
+    out.write(render_dependency_graph(diagram))
+    out.write("### Resumo da Referência Técnica\n\n")
+    for number, output in enumerate(map_outputs, 1):
+        out.write(f"**Lote {number} de {len(map_outputs)}:**\n\n{_digest(output)}\n\n")
+    write_commit_history(out, commits)
+    out.write(PROMPT_FOOTER)
+    return out.getvalue()
+
+def build_documentation_map_reduce(repo_path, commits, file_sections,
+                                   chunk_tokens=DEFAULT_CHUNK_TOKENS, concurrency=DEFAULT_LLM_CONCURRENCY, use_cache=True,
+                                   diagram="", output_dir=None):
+    """
+    Gera a documentação em duas fases: chamadas "map" simultâneas documentam lotes de arquivos
+    limitados por tokens, e uma chamada "reduce" escreve arquitetura, guia rápido e histórico.
+    """
+    repo_name = os.path.basename(repo_path.strip("/"))
+    batches = batch_sections(file_sections, chunk_tokens)
+    print(f"[doc_builder] Modo map-reduce: {len(batches)} lote(s), até {concurrency} chamada(s) simultânea(s)...")
+
+    total_tokens = 0
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+            prompts = [build_map_prompt(repo_name, batch) for batch in batches]
+            # executor.map devolve na ordem dos lotes, então a referência técnica mantém a ordem dos arquivos
+            map_results = list(executor.map(lambda prompt: _chat_completion(prompt, use_cache=use_cache), prompts))
+        map_outputs = [content for content, _ in map_results]
+        total_tokens += sum(usage.get("total_tokens", 0) for _, usage in map_results)
+
+        overview, usage = _chat_completion(build_reduce_prompt(repo_name, commits, map_outputs, diagram=diagram),
+                                           use_cache=use_cache)
+        total_tokens += usage.get("total_tokens", 0)
+    except Exception as e:
+        print(f"[doc_builder] Erro na chamada da API: {e}")
+        return None
+
+    reference = "## 3. Referência Técnica Detalhada (How-to Guides & Reference)\n\n" + "\n\n".join(map_outputs) + "\n"
+    if REFERENCE_MARKER in overview:
+        doc_content = overview.replace(REFERENCE_MARKER, reference, 1)
+    elif HISTORY_HEADING in overview:
+        # Sem o marcador, a referência ainda fica entre o guia rápido (seção 2) e o histórico (seção 4)
+        before, _, after = overview.partition(HISTORY_HEADING)
+        doc_content = before.rstrip() + "\n\n" + reference + "\n" + HISTORY_HEADING + after
+    else:
+        doc_content = overview.rstrip() + "\n\n" + reference
+    print(f"[doc_builder] Total de tokens usados: {total_tokens}")
+    _report_cache(use_cache)
+    return _write_readme(output_dir or repo_path, doc_content)
+
+# --- Modo Monorepo ---
+#
+# Cada subprojeto (modules/sharding.py) ganha o próprio README_GERADO.md; o da raiz vira um índice
+# montado sem chamar a API, a partir do primeiro parágrafo de cada README e dos imports entre eles.
+
+def shard_summary(readme, max_chars=600):
+    """Primeiro parágrafo de texto corrido de um README (ignora títulos, blocos de código e tabelas)."""
+    paragraph, in_code = [], False
+    for line in readme.splitlines():
+        stripped = line.strip()
+        if stripped.startswith("```"):
+            in_code = not in_code
+            continue
+        if in_code or not stripped or stripped.startswith(("#", "|", "---", "<")):
+            if paragraph:
+                break
+            continue
+        paragraph.append(stripped)
+    summary = " ".join(paragraph)
+    return summary if len(summary) <= max_chars else summary[:max_chars].rsplit(" ", 1)[0] + "..."
+
+def build_shard_index(repo_name, shards, diagram="", root_doc=None):
+    """
+    Índice do monorepo: tabela dos subprojetos com link para o README de cada um, diagrama de
+    dependências entre eles e o resumo de cada README. `shards` é uma lista de dicts com "root",
+    "manifests", "files" e "readme" (caminho do README gerado, ou None se a geração falhou);
+    `root_doc` é a documentação do código fora dos subprojetos, anexada no final.
+    """
+    out = io.StringIO()
+    out.write(f"# {repo_name}: Índice dos Subprojetos\n\n")
+    out.write(f"Monorepo com {len(shards)} subprojetos, cada um documentado no próprio README.\n\n")
+    out.write("| Subprojeto | Manifestos | Arquivos documentados | Documentação |\n|---|---|---|---|\n")
+    for shard in shards:
+        link = f"[README]({shard['root']}/README_GERADO.md)" if shard["readme"] else "*não gerada*"
+        out.write(f"| `{shard['root']}` | {', '.join(shard['manifests'])} | {shard['files']} | {link} |\n")
+    if diagram:
+        out.write(f"\n## Dependências entre os Subprojetos\n\n```mermaid\n{diagram}\n```\n")
+    out.write("\n## Subprojetos\n")
+    for shard in shards:
+        summary = "*Documentação não gerada.*"
+        if shard["readme"]:
+            with open(shard["readme"], "r", encoding="utf-8") as f:
+                summary = shard_summary(f.read()) or summary
+        out.write(f"\n### [`{shard['root']}`]({shard['root']}/README_GERADO.md)\n\n{summary}\n")
+    if root_doc:
+        out.write(f"\n## Código Fora dos Subprojetos\n\n{root_doc.strip()}\n")
+    return out.getvalue()
+
+def write_shard_index(repo_path, shards, diagram="", root_doc=None, output_dir=None):
+    """Grava o índice do monorepo (ver `build_shard_index`) no README_GERADO.md de `output_dir` (padrão: a raiz)."""
+    repo_name = os.path.basename(repo_path.strip("/"))
+    return _write_readme(output_dir or repo_path, build_shard_index(repo_name, shards, diagram=diagram, root_doc=root_doc))
+
+# --- Montagem do Prompt ---
+#
+# O prompt é escrito incrementalmente em um objeto tipo arquivo (`out.write`), evitando
+# `prompt += ...` em laços aninhados, que copia o prompt inteiro a cada concatenação.
+
+PROMPT_INTRO = """## 1. Análise Arquitetural (Framework Diátaxis - Visão Geral)
+
 Com base em toda a informação fornecida (estrutura de arquivos, código-fonte, commits), sintetize a arquitetura do projeto. Descreva o **propósito fundamental**, o **domínio do problema** que ele resolve, e os **principais componentes de software** e suas interações. Se possível, gere um diagrama de componentes simples usando Mermaid.
 
 ## 2. Guia de Iniciação Rápida (Tutorial)
@@ -64,38 +415,186 @@ Para cada arquivo analisado, gere a documentação técnica seguindo o formato r
 
 """
 
+def render_dependency_graph(diagram):
+    """Bloco com o diagrama de componentes extraído dos imports, ou "" se não houver dependências internas."""
+    if not diagram:
+        return ""
+    return ("### Grafo de Dependências (extraído dos imports)\n\n"
+            "Os componentes e as setas abaixo (com o número de imports entre eles) vêm da análise estática do código. "
+            "Use-os como base do diagrama de componentes da seção 1, em vez de inferir as dependências:\n\n"
+            f"```mermaid\n{diagram}\n```\n\n")
+
+PROMPT_FOOTER = "---\n*Documentação gerada por um especialista em análise de sistemas. Revise para garantir 100% de precisão.*"
+
+def _write_function(write, func, label, text):
+    prefix = "async " if func.is_async else ""
+    write(f"- **{label}: `{prefix}{func.name}`**\n")
+    write(f"  - **Descrição:** (Analise o bloco de código e a docstring `{func.docstring}` para criar uma descrição técnica precisa.)\n")
+    write(f"  - **Parâmetros:**\n    | Nome | Descrição |\n    |---|---|\n")
+    if func.args:
+        for arg in func.args:
+            write(f"    | `{arg}` | (Descreva o parâmetro) |\n")
+    else:
+        write("    | N/A | - |\n")
+    write(f"  - **Retorno:** (Analise o bloco de código para determinar o que é retornado.)\n")
+    write(f"  - **Bloco de Código:**\n```python\n{text(func)}\n```\n")
+
+def write_file_section(out, rel_path, analysis, filepath=None, copies=(), reader=read_source):
+    """
+    Escreve em `out` o bloco `#### Arquivo:` do prompt para um único arquivo analisado.
+    O código das funções e constantes é recortado de `filepath` (lido uma vez por `reader`, só se necessário);
+    o OSError de um arquivo que não pode mais ser lido é repassado a quem chamou.
+    `copies` são os caminhos relativos de cópias do mesmo arquivo (modules/dedup.py), listadas uma vez aqui.
+    """
+    write = out.write
+    source = None
+
+    def text(symbol):
+        nonlocal source
+        if source is None:
+            source = reader(filepath) if filepath else b""
+        return code_text(source, symbol)
+
+    write(f"#### Arquivo: `{rel_path}`\n\n")
+    if copies:
+        write(f"*Conteúdo idêntico em {len(copies)} outro(s) arquivo(s), documentados aqui uma única vez: "
+              f"{', '.join(f'`{copy}`' for copy in copies)}.*\n\n")
+
+    if analysis.get("constants"):
+        write("##### Constantes e Variáveis Globais\n| Nome | Valor/Inicialização | Descrição |\n|---|---|---|\n")
+        for const in analysis["constants"]:
+            write(f"| `{const.name}` | `{text(const) if const.has_value else 'N/A'}` | (Inferir o propósito da constante) |\n")
+        write("\n")
+
+    if analysis.get("functions"):
+        write("##### Funções\n")
+        for func in analysis["functions"]:
+            _write_function(write, func, "Função", text)
+
+    if analysis.get("classes"):
+        write("##### Classes\n")
+        for cls in analysis["classes"]:
+            bases = f" (herda de {', '.join(f'`{b}`' for b in cls.bases)})" if cls.bases else ""
+            write(f"- **Classe: `{cls.name}`**{bases}\n")
+            if cls.docstring:
+                write(f"  - **Docstring:** {cls.docstring}\n")
+            for method in cls.methods:
+                _write_function(write, method, "Método", text)
+
+    if analysis.get("endpoints"):
+        write("##### Endpoints de API\n| Método | Rota | Propósito Esperado |\n|---|---|---|\n")
+        for ep in analysis["endpoints"]:
+            write(f"| `{ep.method}` | `{ep.path}` | (Inferir o propósito do endpoint) |\n")
+        write("\n")
+
+def render_file_section(rel_path, analysis, filepath=None, copies=(), reader=read_source):
+    """Gera o bloco `#### Arquivo:` do prompt para um único arquivo analisado."""
+    out = io.StringIO()
+    write_file_section(out, rel_path, analysis, filepath=filepath, copies=copies, reader=reader)
+    return out.getvalue()
+
+def build_file_sections(repo_path, code_analysis, duplicates=None, reader=read_source):
+    """
+    Retorna {caminho relativo: bloco `#### Arquivo:`} na ordem de `code_analysis`.
+    `duplicates` ({representante: [cópias]}) acrescenta a lista de cópias ao bloco do representante;
+    `reader` lê o conteúdo de cada arquivo (ex: `GitTree.read_source` no modo `--bare`). Um arquivo
+    que não pode mais ser lido (ex: apagado desde a análise) fica fora do prompt, com um aviso.
+    """
+    duplicates = duplicates or {}
+    sections = {}
     for filepath, analysis in code_analysis.items():
         rel_path = os.path.relpath(filepath, repo_path)
-        prompt += f"#### Arquivo: `{rel_path}`\n\n"
-
-        if analysis.get("constants"):
-            prompt += "##### Constantes e Variáveis Globais\n| Nome | Valor/Inicialização | Descrição |\n|---|---|---|\n"
-            for const in analysis["constants"]:
-                prompt += f"| `{const['name']}` | `{const.get('value', 'N/A')}` | (Inferir o propósito da constante) |\n"
-            prompt += "\n"
-
-        if analysis.get("functions"):
-            prompt += "##### Funções\n"
-            for func in analysis["functions"]:
-                prompt += f"- **Função: `{func['name']}`**\n"
-                prompt += f"  - **Descrição:** (Analise o bloco de código e a docstring `{func.get('docstring', 'N/A')}` para criar uma descrição técnica precisa.)\n"
-                prompt += f"  - **Parâmetros:**\n    | Nome | Descrição |\n    |---|---|\n"
-                if func['args']:
-                    for arg in func['args']:
-                        prompt += f"    | `{arg}` | (Descreva o parâmetro) |\n"
-                else:
-                    prompt += "    | N/A | - |\n"
-                prompt += f"  - **Retorno:** (Analise o bloco de código para determinar o que é retornado.)\n"
-                prompt += f"  - **Bloco de Código:**\n```python\n{func.get('code_block', 'N/A')}\n```\n"
-
-        if analysis.get("endpoints"):
-            prompt += "##### Endpoints de API\n| Método | Rota | Propósito Esperado |\n|---|---|---|\n"
-            for ep in analysis["endpoints"]:
-                prompt += f"| `{ep['method']}` | `{ep['path']}` | (Inferir o propósito do endpoint) |\n"
-            prompt += "\n"
-
-    prompt += "## 4. Análise do Histórico de Desenvolvimento (Explanation)\n\nCom base nos commits, resuma a evolução do projeto, destacando as principais features adicionadas e as correções mais relevantes.\n\n"
-    # ... (lógica de commits existente)
-
-    prompt += "---\n*Documentação gerada por um especialista em análise de sistemas. Revise para garantir 100% de precisão.*"
-    return prompt
\ No newline at end of file
+        copies = [os.path.relpath(copy, repo_path) for copy in duplicates.get(filepath, ())]
+        try:
+            sections[rel_path] = render_file_section(rel_path, analysis, filepath, copies=copies, reader=reader)
+        except OSError as e:
+            print(f"[doc_builder] Arquivo '{rel_path}' omitido do prompt: não foi possível ler o código ({e}).")
+    return sections
+
+def fit_sections(file_sections, token_budget, reserved_tokens=0):
+    """
+    Seleciona as seções, na ordem dada (da mais para a menos relevante), que cabem em `token_budget`
+    junto com as `reserved_tokens` fixas do prompt. Uma seção que não cabe é pulada, mas as
+    seguintes, menores, ainda podem entrar. Retorna ({caminho: seção}, caminhos omitidos).
+    """
+    selected, omitted = {}, []
+    remaining = token_budget - reserved_tokens
+    for rel_path, section in file_sections.items():
+        tokens = count_tokens(section)
+        if tokens <= remaining:
+            selected[rel_path] = section
+            remaining -= tokens
+        else:
+            omitted.append(rel_path)
+    return selected, omitted
+
+def _omitted_note(count):
+    return f"*{count} arquivo(s) de menor prioridade omitido(s) para respeitar o orçamento de tokens do prompt.*\n\n"
+
+def write_killer_prompt(out, repo_path, commits, code_analysis, file_sections=None, token_budget=None, diagram=""):
+    """
+    Escreve o prompt completo em `out` (StringIO, arquivo aberto, etc.).
+    Com `token_budget`, entram apenas as primeiras seções (em ordem de prioridade) que cabem nele.
+    """
+    repo_name = os.path.basename(repo_path.strip("/"))
+    header = f"# Análise e Documentação Técnica do Projeto: {repo_name}\n\n" + render_dependency_graph(diagram)
+    omitted = []
+    if token_budget:
+        if file_sections is None:
+            file_sections = build_file_sections(repo_path, code_analysis)
+        history = render_commit_history(commits)
+        # Reserva a parte fixa do prompt e uma nota de omissão do maior tamanho possível
+        reserved = count_tokens(header + PROMPT_INTRO + history + PROMPT_FOOTER + _omitted_note(len(file_sections)))
+        file_sections, omitted = fit_sections(file_sections, token_budget, reserved)
+        if omitted:
+            print(f"[doc_builder] Orçamento de {token_budget} tokens: {len(file_sections)} arquivo(s) no prompt, "
+                  f"{len(omitted)} omitido(s).")
+
+    out.write(header)
+    out.write(PROMPT_INTRO)
+
+    # Seções já renderizadas (modo incremental) têm prioridade sobre a análise bruta
+    if file_sections is None:
+        for filepath, analysis in code_analysis.items():
+            write_file_section(out, os.path.relpath(filepath, repo_path), analysis, filepath)
+    else:
+        for section in file_sections.values():
+            out.write(section)
+    if omitted:
+        out.write(_omitted_note(len(omitted)))
+
+    write_commit_history(out, commits)
+    out.write(PROMPT_FOOTER)
+
+def build_killer_prompt(repo_path, classification, commits, code_analysis, file_sections=None, token_budget=None,
+                        diagram=""):
+    out = io.StringIO()
+    write_killer_prompt(out, repo_path, commits, code_analysis, file_sections=file_sections, token_budget=token_budget,
+                        diagram=diagram)
+    return out.getvalue()
+
+def write_commit_history(out, commits):
+    """Escreve a seção 4 do prompt com até 15 commits (no máximo 5 por autor)."""
+    out.write("## 4. Análise do Histórico de Desenvolvimento (Explanation)\n\nCom base nos commits, resuma a evolução do projeto, destacando as principais features adicionadas e as correções mais relevantes.\n\n")
+
+    if not commits:
+        out.write("Nenhum commit encontrado no histórico.\n\n")
+        return
+
+    commit_count = 0
+    for author, commit_list in commits.items():
+        if commit_count >= 15:
+            break
+        out.write(f"### Commits de {author}\n")
+        for commit in commit_list[:5]:
+            if commit_count >= 15:
+                break
+            out.write(f"- `[{commit['hash'][:7]}]` {commit['message']}\n")
+            commit_count += 1
+        out.write("\n")
+
+def render_commit_history(commits):
+    """Gera a seção 4 do prompt com até 15 commits (no máximo 5 por autor)."""
+    out = io.StringIO()
+    write_commit_history(out, commits)
+    return out.getvalue()
@@ -1,4 +1,6 @@
 import os
+import fnmatch
+import subprocess
 from collections import defaultdict
 
 # Mapeamento mais detalhado de arquivos e extensões
@@ -16,59 +18,148 @@ EXT_MAP = {
     "dados": ["*.sql", "*.csv", "*.parquet"],
 }
 
-def classify_files(repo_path):
+# Diretórios de dependências e artefatos de build que nunca são documentados (`.repos`: clones e
+# caches do próprio pipeline, quando ele roda de dentro do repositório analisado)
+DEFAULT_EXCLUDE_DIRS = ("node_modules", "vendor", "dist", "build", "target", "__pycache__", ".venv", "venv", ".git",
+                        ".repos")
+
+def _build_lookup_tables(ext_map):
     """
-    Classifica os arquivos em um repositório com base em seus nomes, extensões e diretórios.
+    Pré-compila o EXT_MAP em tabelas de busca O(1). Em cada tabela vale a primeira categoria
+    (na ordem do EXT_MAP) que declara o padrão, como na varredura linear original.
+    """
+    names, compound_suffixes, extensions, directories = {}, {}, {}, {}
+    for category, patterns in ext_map.items():
+        for pattern in patterns:
+            if pattern.endswith("/"):
+                directories.setdefault(pattern.rstrip("/"), category)
+            elif pattern.startswith("*."):
+                suffix = pattern[1:]
+                # "*.test.js" tem duas extensões: é verificado antes da extensão simples ".js"
+                table = compound_suffixes if suffix.count(".") > 1 else extensions
+                table.setdefault(suffix, category)
+            else:
+                names.setdefault(pattern, category)
+    return names, compound_suffixes, extensions, directories
+
+NAME_TABLE, COMPOUND_SUFFIX_TABLE, EXTENSION_TABLE, DIRECTORY_TABLE = _build_lookup_tables(EXT_MAP)
+
+def classify_file(filepath):
+    """
+    Retorna a categoria de um único arquivo com base em seu nome, extensão e diretório.
     """
+    file = os.path.basename(filepath)
+
+    # 1. Classificação por nome de arquivo exato
+    category = NAME_TABLE.get(file)
+    if category:
+        return category
+
+    # 2. Classificação por sufixo composto (ex: "*.test.js") e depois por extensão
+    first_dot = file.find(".", 1)
+    if first_dot != -1:
+        last_dot = file.rfind(".")
+        if last_dot != first_dot:
+            second_last_dot = file.rfind(".", 0, last_dot)
+            category = COMPOUND_SUFFIX_TABLE.get(file[second_last_dot:])
+            if category:
+                return category
+        category = EXTENSION_TABLE.get(file[last_dot:])
+        if category:
+            return category
+
+    # 3. Classificação por diretório (qualquer componente do caminho)
+    for part in filepath.replace(os.sep, "/").split("/")[:-1]:
+        category = DIRECTORY_TABLE.get(part)
+        if category:
+            return category
+
+    # 4. Arquivos não classificados
+    return "outros"
+
+def classify_paths(filepaths, repo_path=None, exclude_dirs=DEFAULT_EXCLUDE_DIRS):
+    """
+    Classifica uma lista explícita de arquivos (ex: apenas os alterados desde a última execução).
+    Com `repo_path`, classifica pelo caminho relativo e aplica `exclude_dirs`, como `classify_files`.
+    """
+    exclude_dirs = frozenset(exclude_dirs)
     classification = defaultdict(list)
-    
-    # Mapeia todos os arquivos para evitar duplicação
-    classified_files = set()
-
-    for root, dirs, files in os.walk(repo_path):
-        # Ignora o diretório .git
-        if ".git" in dirs:
-            dirs.remove(".git")
-
-        for file in files:
-            filepath = os.path.join(root, file)
-            
-            if filepath in classified_files:
+    for filepath in dict.fromkeys(filepaths):
+        rel_path = filepath
+        if repo_path is not None:
+            rel_path = os.path.relpath(filepath, repo_path).replace(os.sep, "/")
+            if _is_excluded(rel_path, exclude_dirs):
                 continue
+        classification[classify_file(rel_path)].append(filepath)
+    return classification
 
-            # 1. Classificação por nome de arquivo exato
-            for category, patterns in EXT_MAP.items():
-                if file in patterns:
-                    classification[category].append(filepath)
-                    classified_files.add(filepath)
-                    break
-            if filepath in classified_files:
-                continue
+def _is_excluded(rel_path, exclude_dirs):
+    return any(part in exclude_dirs for part in rel_path.split("/")[:-1])
 
-            # 2. Classificação por extensão
-            ext = f"*{os.path.splitext(file)[1]}"
-            for category, patterns in EXT_MAP.items():
-                if ext in patterns:
-                    classification[category].append(filepath)
-                    classified_files.add(filepath)
-                    break
-            if filepath in classified_files:
-                continue
+def list_files_git(repo_path):
+    """
+    Lista os arquivos via índice do Git (versionados + não versionados que não estão no .gitignore).
+    Retorna caminhos relativos com "/" ou None se `repo_path` não for um repositório Git.
+    """
+    result = subprocess.run(
+        ["git", "ls-files", "-z", "--cached", "--others", "--exclude-standard"],
+        cwd=repo_path, capture_output=True,
+    )
+    if result.returncode != 0:
+        return None
+    return [path for path in result.stdout.decode("utf-8", errors="surrogateescape").split("\0") if path]
 
-            # 3. Classificação por diretório
-            for category, patterns in EXT_MAP.items():
-                for pattern in patterns:
-                    if pattern.endswith("/") and pattern in filepath:
-                        classification[category].append(filepath)
-                        classified_files.add(filepath)
-                        break
-                if filepath in classified_files:
-                    break
-            if filepath in classified_files:
-                continue
+def _read_gitignore(repo_path):
+    try:
+        with open(os.path.join(repo_path, ".gitignore"), "r", encoding="utf-8") as f:
+            return [line.strip().rstrip("/") for line in f if line.strip() and not line.startswith(("#", "!"))]
+    except OSError:
+        return []
+
+def list_files_scandir(repo_path, exclude_dirs=DEFAULT_EXCLUDE_DIRS):
+    """
+    Alternativa sem Git: varre com os.scandir, podando diretórios excluídos e os padrões
+    simples do .gitignore da raiz antes de descer neles.
+    """
+    ignore_patterns = _read_gitignore(repo_path)
+
+    def ignored(name, rel_path):
+        return any(fnmatch.fnmatch(name, p) or fnmatch.fnmatch(rel_path, p.lstrip("/")) for p in ignore_patterns)
 
-            # 4. Arquivos não classificados
-            classification["outros"].append(filepath)
-            classified_files.add(filepath)
+    files = []
+    stack = [""]
+    while stack:
+        rel_dir = stack.pop()
+        with os.scandir(os.path.join(repo_path, rel_dir)) as entries:
+            for entry in entries:
+                rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                if ignored(entry.name, rel_path):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name not in exclude_dirs:
+                        stack.append(rel_path)
+                elif entry.is_file():
+                    files.append(rel_path)
+    files.sort()
+    return files
+
+def classify_files(repo_path, exclude_dirs=DEFAULT_EXCLUDE_DIRS, use_git=True):
+    """
+    Classifica os arquivos em um repositório com base em seus nomes, extensões e diretórios.
+
+    Os arquivos vêm do `git ls-files` (respeitando o .gitignore) ou, fora de um repositório Git,
+    de uma varredura com os.scandir. Diretórios em `exclude_dirs` (ex: node_modules) são ignorados.
+    """
+    exclude_dirs = frozenset(exclude_dirs)
+    rel_paths = list_files_git(repo_path) if use_git else None
+    if rel_paths is None:
+        rel_paths = list_files_scandir(repo_path, exclude_dirs)
+
+    classification = defaultdict(list)
+    for rel_path in rel_paths:
+        if _is_excluded(rel_path, exclude_dirs):
+            continue
+        # Classifica pelo caminho relativo, para que diretórios acima do repositório não influenciem
+        classification[classify_file(rel_path)].append(os.path.join(repo_path, rel_path))
 
-    return classification
\ No newline at end of file
+    return classification
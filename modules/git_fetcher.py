@@ -1,19 +1,149 @@
-from git import Repo
 import os
 import shutil
 from urllib.parse import urlparse
 
-def fetch_repository(repo_url, base_path=".repos"):
+# Contadores de reaproveitamento do cache de clones (.repos/<nome>)
+FETCH_STATS = {"hits": 0, "misses": 0}
+# Documentação gerada no modo --bare: o clone em .repos/.bare/<nome> é o próprio diretório do Git
+# (objects/, refs/, HEAD) e não recebe arquivos de fora dele
+BARE_DOCS_DIR = os.path.join(".repos", ".docs")
+
+def repo_name_from_url(repo_url):
+    return urlparse(repo_url).path.strip("/").replace(".git", "").replace("/", "_")
+
+def docs_path(repo_path, bare=False):
+    """Diretório onde o README_GERADO.md é gravado: a working tree, ou `.repos/.docs/<nome>` no modo bare."""
+    if not bare:
+        return repo_path
+    return os.path.join(BARE_DOCS_DIR, os.path.basename(os.path.normpath(repo_path)))
+
+def _clone_options(depth=None, blobless=False):
+    options = {}
+    if depth:
+        options["depth"] = int(depth)
+    if blobless:
+        options["filter"] = "blob:none"
+    return options
+
+# GitPython (~70 ms de import) é carregado só ao clonar/atualizar, não em comandos que recebem um caminho local
+
+def _checkout_ref(repo, ref, depth=None):
+    """Busca apenas `ref` (branch, tag, refs/... ou SHA) e deixa a árvore de trabalho nele, em HEAD destacado."""
+    fetch_options = {"depth": int(depth)} if depth else {}
+    repo.git.fetch("origin", ref, **fetch_options)
+    repo.git.checkout("-f", "FETCH_HEAD")
+    repo.git.clean("-fdx")
+
+def _point_head(repo, ref, depth=None):
+    """Clone bare: busca apenas `ref` e aponta o HEAD (destacado) para ele, sem working tree para o checkout."""
+    fetch_options = {"depth": int(depth)} if depth else {}
+    repo.git.fetch("origin", ref, **fetch_options)
+    repo.git.update_ref("--no-deref", "HEAD", "FETCH_HEAD")
+
+def _update_existing_bare(repo_path, repo_url, depth=None, ref=None):
+    """
+    Atualiza um clone bare com `git fetch` dos branches do remoto e aponta o HEAD para o branch
+    padrão (ou para `ref`). Retorna False se o clone não puder ser reaproveitado.
+    """
+    from git import Repo
+    from git.exc import GitCommandError, InvalidGitRepositoryError, NoSuchPathError
+
+    try:
+        repo = Repo(repo_path)
+    except (InvalidGitRepositoryError, NoSuchPathError):
+        return False
+    if not repo.bare or "origin" not in [remote.name for remote in repo.remotes] or repo.remotes.origin.url != repo_url:
+        return False
+
+    try:
+        if ref:
+            _point_head(repo, ref, depth=depth)
+            return True
+        fetch_options = {"prune": True}
+        if depth:
+            fetch_options["depth"] = int(depth)
+        # Um clone bare não tem refs remotas: os branches do remoto são espelhados em refs/heads
+        repo.git.fetch("origin", "+refs/heads/*:refs/heads/*", **fetch_options)
+        # O branch padrão pode ter mudado, ou o HEAD ter ficado destacado por um `ref` anterior
+        for line in repo.git.ls_remote("--symref", "origin", "HEAD").splitlines():
+            if line.startswith("ref: "):
+                repo.git.symbolic_ref("HEAD", line[len("ref: "):].split("\t")[0])
+                break
+    except GitCommandError as e:
+        print(f"[git_fetcher] Falha ao atualizar o clone bare existente: {e}")
+        return False
+    return True
+
+def _update_existing_clone(repo_path, repo_url, depth=None, ref=None):
+    """
+    Atualiza um clone existente com `git fetch` + reset rápido para o branch padrão do remoto
+    (ou para `ref`, se informado).
+    Retorna False se o clone não puder ser reaproveitado (corrompido, outra origem, etc.).
+    """
+    from git import Repo
+    from git.exc import GitCommandError, InvalidGitRepositoryError, NoSuchPathError
+
+    try:
+        repo = Repo(repo_path)
+    except (InvalidGitRepositoryError, NoSuchPathError):
+        return False
+
+    if "origin" not in [remote.name for remote in repo.remotes] or repo.remotes.origin.url != repo_url:
+        return False
+
+    try:
+        if ref:
+            _checkout_ref(repo, ref, depth=depth)
+            return True
+        fetch_options = {"prune": True}
+        if depth:
+            fetch_options["depth"] = int(depth)
+        repo.git.fetch("origin", **fetch_options)
+        try:
+            default_ref = repo.git.rev_parse("--abbrev-ref", "origin/HEAD")
+        except GitCommandError:
+            repo.git.remote("set-head", "origin", "--auto")
+            default_ref = repo.git.rev_parse("--abbrev-ref", "origin/HEAD")
+        branch = default_ref.split("/", 1)[1]
+        repo.git.checkout("-f", "-B", branch, default_ref)
+        repo.git.clean("-fdx")
+    except GitCommandError as e:
+        print(f"[git_fetcher] Falha ao atualizar o clone existente: {e}")
+        return False
+    return True
+
+def fetch_repository(repo_url, base_path=".repos", depth=None, blobless=False, ref=None, bare=False):
+    """
+    Clona o repositório ou, se já existir um clone em `base_path`, reaproveita-o com um fetch incremental.
+
+    `depth` ativa o clone raso (`--depth N`) e `blobless` o clone parcial (`--filter=blob:none`).
+    `ref` documenta um branch, tag ou commit específico em vez do branch padrão.
+    `bare` clona sem working tree em `<base_path>/.bare/<nome>`: os arquivos são lidos do banco de
+    objetos (modules/git_objects.py), sem gravar e reler o checkout, e a documentação vai para
+    `docs_path`.
+    """
+    from git import Repo
+
+    if bare:
+        base_path = os.path.join(base_path, ".bare")
     if not os.path.exists(base_path):
         os.makedirs(base_path)
 
-    repo_name = urlparse(repo_url).path.strip("/").replace(".git", "").replace("/", "_")
+    repo_name = repo_name_from_url(repo_url)
     repo_path = os.path.join(base_path, repo_name)
+    update_existing = _update_existing_bare if bare else _update_existing_clone
 
     if os.path.exists(repo_path):
-        print(f"[git_fetcher] Repositório já existe. Apagando para clonar novamente.")
+        if update_existing(repo_path, repo_url, depth=depth, ref=ref):
+            FETCH_STATS["hits"] += 1
+            print(f"[git_fetcher] Cache hit: {repo_path} atualizado com fetch incremental.")
+            return repo_path
+        print(f"[git_fetcher] Clone existente não reaproveitável. Apagando para clonar novamente.")
         shutil.rmtree(repo_path)
 
-    print(f"[git_fetcher] Clonando {repo_url} para {repo_path}...")
-    Repo.clone_from(repo_url, repo_path)
-    return repo_path
\ No newline at end of file
+    FETCH_STATS["misses"] += 1
+    print(f"[git_fetcher] Cache miss: clonando {repo_url} para {repo_path}...")
+    repo = Repo.clone_from(repo_url, repo_path, bare=bare, **_clone_options(depth, blobless))
+    if ref:
+        (_point_head if bare else _checkout_ref)(repo, ref, depth=depth)
+    return repo_path
@@ -0,0 +1,144 @@
+import os
+import subprocess
+import threading
+
+# --- Leitura Direto do Banco de Objetos do Git ---
+#
+# Modo `--bare`: em vez de fazer checkout da working tree e reler cada arquivo do disco, os arquivos
+# de um commit são listados com `git ls-tree -r` (caminho, SHA do blob e tamanho, sem abrir nada) e o
+# conteúdo vem de um único processo `git cat-file --batch` de longa duração. O SHA do blob da listagem
+# é a própria chave do cache de análise: arquivos já analisados nem chegam a ser lidos.
+
+# Apenas arquivos regulares (os links simbólicos, 120000, e os submódulos, 160000, ficam de fora)
+REGULAR_FILE_MODES = (b"100644", b"100755")
+
+def _decode_path(raw):
+    return raw.decode("utf-8", errors="surrogateescape")
+
+def list_tree(repo_path, rev="HEAD"):
+    """Arquivos de `rev` como [(caminho relativo com "/", SHA do blob, tamanho em bytes)], via `git ls-tree -r`."""
+    result = subprocess.run(["git", "ls-tree", "-r", "-z", "--long", "--full-tree", rev], cwd=repo_path,
+                            capture_output=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"git ls-tree falhou em {repo_path}: {result.stderr.decode(errors='replace').strip()}")
+    entries = []
+    for record in result.stdout.split(b"\0"):
+        if not record:
+            continue
+        meta, _, path = record.partition(b"\t")
+        mode, kind, sha, size = meta.split()
+        if kind == b"blob" and mode in REGULAR_FILE_MODES:
+            entries.append((_decode_path(path), sha.decode(), int(size)))
+    return entries
+
+def is_bare(repo_path):
+    result = subprocess.run(["git", "rev-parse", "--is-bare-repository"], cwd=repo_path, capture_output=True, text=True)
+    return result.returncode == 0 and result.stdout.strip() == "true"
+
+class BlobReader:
+    """
+    Um processo `git cat-file --batch` aberto durante toda a execução. `read` busca um blob;
+    `read_many` envia todos os pedidos por uma thread enquanto lê as respostas, sem esperar a ida
+    e volta de cada blob.
+    """
+
+    def __init__(self, repo_path):
+        self.process = subprocess.Popen(["git", "cat-file", "--batch"], cwd=repo_path, stdin=subprocess.PIPE,
+                                        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        self._lock = threading.Lock()
+
+    def _response(self):
+        # "<sha> <tipo> <tamanho>\n<conteúdo>\n" ou "<sha> missing\n"
+        header = self.process.stdout.readline().split()
+        if len(header) != 3:
+            return None
+        data = self.process.stdout.read(int(header[2]))
+        self.process.stdout.read(1)
+        return data
+
+    def read(self, sha):
+        """Conteúdo do blob em bytes, ou None se o objeto não existir."""
+        with self._lock:
+            self.process.stdin.write(f"{sha}\n".encode())
+            self.process.stdin.flush()
+            return self._response()
+
+    def _request(self, shas):
+        try:
+            for sha in shas:
+                self.process.stdin.write(f"{sha}\n".encode())
+            self.process.stdin.flush()
+        except (BrokenPipeError, ValueError):
+            pass
+
+    def read_many(self, shas):
+        """Gera (sha, conteúdo) na ordem de `shas`, com os pedidos enviados em lote."""
+        shas = list(shas)
+        with self._lock:
+            writer = threading.Thread(target=self._request, args=(shas,), daemon=True)
+            writer.start()
+            answered = 0
+            try:
+                for sha in shas:
+                    data = self._response()
+                    answered += 1
+                    yield sha, data
+            finally:
+                # Consumidor parou no meio: lê as respostas restantes para o processo continuar utilizável
+                writer.join()
+                for _ in range(len(shas) - answered):
+                    self._response()
+
+    def close(self):
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+        self.process.wait()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class GitTree:
+    """
+    Os arquivos de um commit, endereçados pelos mesmos caminhos que teriam em uma working tree
+    (`os.path.join(repo_path, caminho relativo)`), para que o restante do pipeline não mude.
+    """
+
+    def __init__(self, repo_path, rev="HEAD"):
+        self.repo_path = repo_path
+        self.rev = rev
+        self.entries = {os.path.join(repo_path, rel_path): (sha, size) for rel_path, sha, size in list_tree(repo_path, rev)}
+        self._reader = None
+
+    def filepaths(self):
+        return list(self.entries)
+
+    def blob_sha(self, filepath):
+        entry = self.entries.get(filepath)
+        return entry[0] if entry else None
+
+    def size(self, filepath):
+        entry = self.entries.get(filepath)
+        return entry[1] if entry else 0
+
+    def reader(self):
+        if self._reader is None:
+            self._reader = BlobReader(self.repo_path)
+        return self._reader
+
+    def read_source(self, filepath):
+        """Mesmo contrato de `symbols.read_source`: conteúdo em bytes; FileNotFoundError se o arquivo não estiver no commit."""
+        sha = self.blob_sha(filepath)
+        data = self.reader().read(sha) if sha else None
+        if data is None:
+            raise FileNotFoundError(f"{filepath} não está no commit analisado")
+        return data
+
+    def close(self):
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
@@ -37,8 +37,8 @@ def create_pull_request(repo_path):
     success, _ = run_command(["git", "checkout", "-b", branch_name], cwd=repo_path)
     if not success: return None
 
-    # 4. Adiciona e commita o arquivo de documentação
-    success, _ = run_command(["git", "add", "README_GERADO.md"], cwd=repo_path)
+    # 4. Adiciona e commita a documentação (no modo --shard, também os READMEs dos subprojetos)
+    success, _ = run_command(["git", "add", "--", ":(glob)**/README_GERADO.md"], cwd=repo_path)
     if not success: return None
 
     success, _ = run_command(["git", "commit", "-m", commit_message], cwd=repo_path)
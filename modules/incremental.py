@@ -0,0 +1,99 @@
+import json
+import os
+import shutil
+import subprocess
+
+# Estado da última documentação gerada por repositório (fora da working tree, que o fetch limpa)
+STATE_DIR = os.path.join(".repos", ".cache", "docs")
+
+def _state_dir(repo_path):
+    return os.path.join(STATE_DIR, os.path.basename(os.path.normpath(repo_path)))
+
+def _git(repo_path, *args):
+    result = subprocess.run(["git", *args], cwd=repo_path, capture_output=True, text=True)
+    if result.returncode != 0:
+        return None
+    return result.stdout
+
+def head_sha(repo_path):
+    output = _git(repo_path, "rev-parse", "HEAD")
+    return output.strip() if output else None
+
+def load_state(repo_path):
+    """
+    Retorna o estado salvo da última geração: {"sha", "sections", "history", "index", "readme"} ou None.
+    """
+    state_file = os.path.join(_state_dir(repo_path), "state.json")
+    try:
+        with open(state_file, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    readme = os.path.join(_state_dir(repo_path), "README_GERADO.md")
+    state["readme"] = readme if os.path.exists(readme) else None
+    return state
+
+def save_state(repo_path, sha, sections, doc_path, index=None, history=None):
+    """
+    Registra o SHA a partir do qual o README foi gerado, as seções por arquivo do prompt, o histórico
+    de commits enviado no prompt (seção 4), o índice do código (modules/code_index.py, para reindexar
+    só o delta) e uma cópia do README.
+    """
+    state_dir = _state_dir(repo_path)
+    os.makedirs(state_dir, exist_ok=True)
+    with open(os.path.join(state_dir, "state.json"), "w", encoding="utf-8") as f:
+        json.dump({"sha": sha, "sections": sections, "history": history, "index": index}, f, ensure_ascii=False)
+    shutil.copyfile(doc_path, os.path.join(state_dir, "README_GERADO.md"))
+
+def diff_since(repo_path, sha):
+    """
+    Lista os arquivos alterados entre `sha` e o HEAD via `git diff --name-status`.
+
+    Retorna (alterados, removidos) em caminhos relativos, ou None se o SHA não estiver no histórico local.
+    """
+    output = _git(repo_path, "diff", "--name-status", "-M", sha, "HEAD")
+    if output is None:
+        return None
+
+    changed, deleted = [], []
+    for line in output.splitlines():
+        parts = line.split("\t")
+        status = parts[0][:1]
+        if status == "D":
+            deleted.append(parts[1])
+        elif status == "R":
+            # Renomeação: o caminho antigo sai, o novo entra como adicionado
+            deleted.append(parts[1])
+            changed.append(parts[2])
+        elif status in ("A", "M", "C", "T"):
+            changed.append(parts[-1])
+    return changed, deleted
+
+def merge_sections(previous, updated, removed):
+    """
+    Aplica o delta sobre as seções anteriores: mantém a ordem original, substitui as alteradas,
+    remove as apagadas (ou que deixaram de ter algo a documentar) e acrescenta as novas no final.
+    """
+    merged = {}
+    for rel_path, section in previous.items():
+        if rel_path in removed:
+            continue
+        if rel_path in updated:
+            section = updated[rel_path]
+        if section:
+            merged[rel_path] = section
+    for rel_path, section in updated.items():
+        if rel_path not in merged and rel_path not in previous and section:
+            merged[rel_path] = section
+    return merged
+
+def restore_readme(output_dir, state):
+    """
+    Reaproveita o README da última geração, copiando-o para `output_dir`. Só vale quando nem as seções
+    nem o histórico de commits do prompt mudaram (ver `save_state`). Retorna o caminho ou None.
+    """
+    if not state or not state.get("readme"):
+        return None
+    doc_filepath = os.path.join(output_dir, "README_GERADO.md")
+    shutil.copyfile(state["readme"], doc_filepath)
+    return doc_filepath
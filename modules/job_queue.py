@@ -0,0 +1,133 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_QUEUE_PATH = os.path.join(".repos", ".cache", "jobs.sqlite")
+
+class JobQueue:
+    """
+    Fila persistente (SQLite) de jobs "documentar este repositório/ref".
+
+    - Jobs repetidos para o mesmo repositório, ref e opções que ainda estão na fila são deduplicados
+      (opções diferentes, como `chunked` ou `bare`, geram outra documentação e entram na fila).
+    - Um repositório nunca é processado por dois workers ao mesmo tempo (o clone em .repos/ é único).
+    - Jobs que estavam em execução quando o processo morreu voltam para a fila em `recover`.
+    """
+
+    def __init__(self, path=DEFAULT_QUEUE_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        # Avisada a cada novo job, para os workers não precisarem consultar a fila em laço
+        self.available = threading.Condition(self._lock)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, url TEXT NOT NULL, ref TEXT NOT NULL DEFAULT '', "
+            "options TEXT NOT NULL DEFAULT '{}', status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, "
+            "created_at REAL NOT NULL, started_at REAL, finished_at REAL, result TEXT, error TEXT)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, id)")
+        self._conn.commit()
+
+    def _row(self, row):
+        if row is None:
+            return None
+        job = dict(row)
+        job["options"] = json.loads(job["options"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def enqueue(self, url, ref=None, options=None):
+        """
+        Adiciona um job. Retorna (job, deduplicado): se já houver na fila um job com o mesmo
+        repositório, ref e opções, devolve aquele.
+        """
+        ref = ref or ""
+        # Forma canônica (chaves ordenadas): as mesmas opções em outra ordem são o mesmo job
+        options = json.dumps(options or {}, ensure_ascii=False, sort_keys=True)
+        with self.available:
+            row = self._conn.execute(
+                "SELECT * FROM jobs WHERE url = ? AND ref = ? AND options = ? AND status = 'queued' ORDER BY id LIMIT 1",
+                (url, ref, options),
+            ).fetchone()
+            if row is not None:
+                return self._row(row), True
+            cursor = self._conn.execute(
+                "INSERT INTO jobs (url, ref, options, status, created_at) VALUES (?, ?, ?, 'queued', ?)",
+                (url, ref, options, time.time()),
+            )
+            self._conn.commit()
+            self.available.notify()
+            return self._row(self._conn.execute("SELECT * FROM jobs WHERE id = ?", (cursor.lastrowid,)).fetchone()), False
+
+    def claim(self, timeout=None):
+        """
+        Retira o job mais antigo cujo repositório não está em execução, marcando-o como "running".
+        Espera até `timeout` segundos por um job; retorna None se nenhum ficar disponível.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.available:
+            while True:
+                row = self._conn.execute(
+                    "SELECT * FROM jobs WHERE status = 'queued' "
+                    "AND url NOT IN (SELECT url FROM jobs WHERE status = 'running') ORDER BY id LIMIT 1"
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = 'running', started_at = ?, attempts = attempts + 1 WHERE id = ?",
+                        (time.time(), row["id"]),
+                    )
+                    self._conn.commit()
+                    return self._row(self._conn.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone())
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self.available.wait(remaining)
+
+    def finish(self, job_id, result, error=None):
+        """Encerra o job como "done" ou, com `error`, como "failed", guardando o resultado."""
+        with self.available:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, result = ?, error = ? WHERE id = ?",
+                ("failed" if error else "done", time.time(), json.dumps(result, ensure_ascii=False), error, job_id),
+            )
+            self._conn.commit()
+            # O repositório ficou livre: um job dele que estava na fila pode ser retirado agora
+            self.available.notify_all()
+
+    def recover(self):
+        """Devolve à fila os jobs que ficaram "running" (o processo anterior morreu no meio)."""
+        with self.available:
+            count = self._conn.execute("UPDATE jobs SET status = 'queued' WHERE status = 'running'").rowcount
+            self._conn.commit()
+            return count
+
+    def get(self, job_id):
+        with self._lock:
+            return self._row(self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+    def list(self, status=None, limit=50):
+        with self._lock:
+            if status:
+                rows = self._conn.execute("SELECT * FROM jobs WHERE status = ? ORDER BY id DESC LIMIT ?", (status, limit))
+            else:
+                rows = self._conn.execute("SELECT * FROM jobs ORDER BY id DESC LIMIT ?", (limit,))
+            return [self._row(row) for row in rows.fetchall()]
+
+    def stats(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+    def wake_all(self):
+        """Acorda os workers parados em `claim` (ex: no encerramento do serviço)."""
+        with self.available:
+            self.available.notify_all()
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,190 @@
+import json
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+from modules.telemetry import TRACER
+
+DEFAULT_BASE_URL = "https://api.openai.com/v1"
+RETRY_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+class IncompleteStreamError(RuntimeError):
+    """A resposta em streaming terminou sem `[DONE]` nem `finish_reason: stop`, ou foi cortada por tamanho."""
+
+class TokenBucket:
+    """
+    Balde de tokens thread-safe, reabastecido continuamente a `rate_per_minute` por minuto.
+    `acquire` bloqueia até haver saldo; `debit` desconta sem bloquear (saldo pode ficar negativo).
+    """
+
+    def __init__(self, rate_per_minute):
+        self.capacity = float(rate_per_minute)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, amount=1):
+        # Pedidos maiores que a capacidade esperariam para sempre: limita ao balde cheio
+        amount = min(float(amount), self.capacity)
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait = (amount - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def debit(self, amount):
+        with self.lock:
+            self._refill()
+            self.tokens -= amount
+
+class LLMClient:
+    """
+    Cliente HTTP reutilizável para a API de chat completions: pool de conexões keep-alive,
+    retentativas com backoff exponencial + jitter (respeitando `Retry-After`) e limitação
+    por requisições/minuto e tokens/minuto.
+    """
+
+    def __init__(self, api_key=None, base_url=None, rpm=None, tpm=None, max_retries=None, pool_size=None):
+        self.api_key = api_key or os.getenv("OPENAI_API_KEY")
+        self.base_url = (base_url or os.getenv("OPENAI_BASE_URL") or DEFAULT_BASE_URL).rstrip("/")
+        self.max_retries = int(max_retries if max_retries is not None else os.getenv("OPENAI_MAX_RETRIES", "6"))
+        rpm = rpm if rpm is not None else int(os.getenv("OPENAI_RPM", "500"))
+        tpm = tpm if tpm is not None else int(os.getenv("OPENAI_TPM", "30000"))
+        self.request_bucket = TokenBucket(rpm) if rpm else None
+        self.token_bucket = TokenBucket(tpm) if tpm else None
+
+        pool_size = pool_size or int(os.getenv("OPENAI_POOL_SIZE", "16"))
+        # `requests` (~90 ms de import) só é carregado quando um cliente é de fato criado
+        import requests
+        from requests.adapters import HTTPAdapter
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def _retry_delay(self, attempt, response=None):
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after:
+                try:
+                    return max(0.0, float(retry_after))
+                except ValueError:
+                    try:
+                        return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+                    except (TypeError, ValueError):
+                        pass
+        # Backoff exponencial com "full jitter", limitado a 60s
+        return random.uniform(0, min(60.0, 2 ** attempt))
+
+    def post(self, path, payload, estimated_tokens=0, timeout=300, stream=False):
+        """
+        Envia um POST para `base_url + path` com throttling e retentativas. Retorna o `requests.Response`.
+        """
+        import requests
+        throttle_started = time.perf_counter()
+        if self.request_bucket:
+            self.request_bucket.acquire(1)
+        if self.token_bucket and estimated_tokens:
+            self.token_bucket.acquire(estimated_tokens)
+        TRACER.count("llm.throttle_seconds", time.perf_counter() - throttle_started)
+
+        headers = {"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"}
+        url = f"{self.base_url}{path}"
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.session.post(url, headers=headers, json=payload, timeout=timeout, stream=stream)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = self._retry_delay(attempt)
+                TRACER.count("llm.retries")
+                print(f"[llm_client] Falha de conexão ({e.__class__.__name__}). Nova tentativa em {delay:.1f}s...")
+                time.sleep(delay)
+                continue
+
+            if response.status_code in RETRY_STATUS and attempt < self.max_retries:
+                delay = self._retry_delay(attempt, response)
+                TRACER.count("llm.retries")
+                print(f"[llm_client] HTTP {response.status_code}. Nova tentativa em {delay:.1f}s...")
+                response.close()
+                time.sleep(delay)
+                continue
+
+            response.raise_for_status()
+            return response
+
+    def chat_completion(self, payload, estimated_tokens=0, timeout=300):
+        """Chama /chat/completions e retorna o JSON da resposta, ajustando o balde de tokens ao uso real."""
+        start, started = time.time(), time.perf_counter()
+        response = self.post("/chat/completions", payload, estimated_tokens=estimated_tokens, timeout=timeout)
+        response_data = response.json()
+        TRACER.record_llm(start, time.perf_counter() - started, response_data.get("usage"))
+        used = response_data.get("usage", {}).get("total_tokens", 0)
+        if self.token_bucket and used > estimated_tokens:
+            self.token_bucket.debit(used - estimated_tokens)
+        return response_data
+
+    def stream_chat_completion(self, payload, estimated_tokens=0, timeout=300):
+        """
+        Chama /chat/completions com `stream: true` e gera cada evento SSE (JSON) assim que chega.
+        O último evento traz `usage` quando a API suporta `stream_options.include_usage`.
+
+        Levanta IncompleteStreamError depois do último evento se a conexão caiu antes do fim (sem
+        `[DONE]` nem `finish_reason: stop`) ou se o modelo parou por limite de tokens (`length`).
+        """
+        payload = dict(payload, stream=True, stream_options={"include_usage": True})
+        start, started = time.time(), time.perf_counter()
+        response = self.post("/chat/completions", payload, estimated_tokens=estimated_tokens, timeout=timeout, stream=True)
+        # SSE é sempre UTF-8; sem isso o requests entrega bytes quando o servidor omite o charset
+        response.encoding = "utf-8"
+        used = 0
+        usage = None
+        first_event = None
+        done, finish_reason = False, None
+        try:
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    done = True
+                    break
+                event = json.loads(data)
+                if first_event is None:
+                    first_event = time.perf_counter() - started
+                usage = event.get("usage") or usage
+                used = (usage or {}).get("total_tokens", used)
+                for choice in event.get("choices", []):
+                    finish_reason = choice.get("finish_reason") or finish_reason
+                yield event
+            if finish_reason == "length":
+                raise IncompleteStreamError("resposta cortada pelo limite de tokens (finish_reason: length)")
+            if not done and finish_reason != "stop":
+                raise IncompleteStreamError("o stream terminou antes do fim da resposta (sem [DONE] nem finish_reason)")
+        finally:
+            response.close()
+            TRACER.record_llm(start, time.perf_counter() - started, usage, stream=True, first_event_seconds=first_event)
+            if self.token_bucket and used > estimated_tokens:
+                self.token_bucket.debit(used - estimated_tokens)
+
+_DEFAULT_CLIENT = None
+_DEFAULT_CLIENT_LOCK = threading.Lock()
+
+def get_default_client():
+    """Cliente compartilhado do processo: conexões e limites de taxa valem para todas as chamadas."""
+    global _DEFAULT_CLIENT
+    with _DEFAULT_CLIENT_LOCK:
+        if _DEFAULT_CLIENT is None:
+            _DEFAULT_CLIENT = LLMClient()
+        return _DEFAULT_CLIENT
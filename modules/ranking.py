@@ -0,0 +1,117 @@
+import math
+import os
+import subprocess
+from datetime import datetime
+
+# --- Priorização de Arquivos ---
+#
+# Ordena os arquivos documentados pelo "valor" para o leitor, para que o prompt comece pelos
+# módulos importantes e, com um orçamento de tokens, descarte primeiro os triviais. Os sinais vêm
+# de uma única passada de `git log --numstat` (churn, data da última alteração, número de autores)
+# e, opcionalmente, do fan-in de imports entre os arquivos analisados (modules/code_index.py).
+
+# Peso de cada sinal normalizado em [0, 1]; sinais desligados pelo modo saem da soma
+WEIGHTS = {"churn": 0.3, "authors": 0.15, "recency": 0.2, "fan_in": 0.35}
+# Um arquivo alterado há RECENCY_HALF_LIFE_DAYS dias (antes do commit mais novo) vale metade de um recém-alterado
+RECENCY_HALF_LIFE_DAYS = 90
+
+FIELD_SEP = "\x1f"
+RECORD_SEP = "\x1e"
+
+def file_history(repo_path, max_count=None, since=None):
+    """
+    Churn (linhas adicionadas + removidas), commits, autores e data da última alteração por arquivo,
+    em uma única passada de `git log --numstat`. Renomeações são seguidas: o histórico do caminho
+    antigo é somado ao caminho atual.
+    """
+    command = ["git", "log", "-z", "--numstat", "-M", f"--format={RECORD_SEP}%an{FIELD_SEP}%cI"]
+    if max_count:
+        command.append(f"--max-count={int(max_count)}")
+    if since:
+        command.append(f"--since={since}")
+    result = subprocess.run(command, cwd=repo_path, capture_output=True, text=True, encoding="utf-8", errors="replace")
+    if result.returncode != 0:
+        return {}
+
+    history = {}
+    # Caminho antigo -> caminho atual (o log vem do commit mais novo para o mais antigo)
+    renamed = {}
+    for record in result.stdout.split(RECORD_SEP)[1:]:
+        header, _, body = record.partition("\0")
+        author, date = header.split(FIELD_SEP, 1)
+        tokens = iter(body.lstrip("\n").split("\0"))
+        for token in tokens:
+            if not token:
+                continue
+            added, deleted, path = token.split("\t", 2)
+            if not path:
+                # Renomeação: "adicionadas\tremovidas\t" seguido do caminho antigo e do novo
+                old_path, path = next(tokens, ""), next(tokens, "")
+                renamed[old_path] = renamed.get(path, path)
+            path = renamed.get(path, path)
+            stats = history.get(path)
+            if stats is None:
+                # O primeiro commit visto é o mais recente
+                stats = history[path] = {"churn": 0, "commits": 0, "authors": set(), "last_touched": date}
+            # Arquivos binários aparecem como "-\t-"
+            stats["churn"] += (int(added) if added.isdigit() else 0) + (int(deleted) if deleted.isdigit() else 0)
+            stats["commits"] += 1
+            stats["authors"].add(author)
+    for stats in history.values():
+        stats["authors"] = len(stats["authors"])
+    return history
+
+def _normalized(values):
+    """Escala log para [0, 1]: um arquivo com churn 10x maior não vale 10x mais."""
+    top = math.log1p(max(values.values(), default=0))
+    return {key: math.log1p(value) / top if top else 0.0 for key, value in values.items()}
+
+def rank_files(rel_paths, history=None, fan_in=None):
+    """
+    Ordena `rel_paths` do mais para o menos relevante. Retorna uma lista de dicts com o caminho,
+    a pontuação e os sinais usados (pronta para JSON). `history` e `fan_in` None desligam o sinal.
+    """
+    rel_paths = [path.replace(os.sep, "/") for path in rel_paths]
+    weights = dict(WEIGHTS)
+    if history is None:
+        history = {}
+        for signal in ("churn", "authors", "recency"):
+            weights.pop(signal)
+    if fan_in is None:
+        fan_in = {}
+        weights.pop("fan_in")
+
+    stats = {path: history.get(path, {}) for path in rel_paths}
+    dates = {path: datetime.fromisoformat(s["last_touched"]) for path, s in stats.items() if s.get("last_touched")}
+    newest = max(dates.values(), default=None)
+    signals = {
+        "churn": _normalized({path: s.get("churn", 0) for path, s in stats.items()}),
+        "authors": _normalized({path: s.get("authors", 0) for path, s in stats.items()}),
+        "recency": {path: 0.5 ** ((newest - dates[path]).total_seconds() / 86400 / RECENCY_HALF_LIFE_DAYS)
+                    if path in dates else 0.0 for path in rel_paths},
+        "fan_in": _normalized({path: fan_in.get(path, 0) for path in rel_paths}),
+    }
+
+    total_weight = sum(weights.values())
+    ranking = []
+    for path in rel_paths:
+        score = sum(weight * signals[signal][path] for signal, weight in weights.items()) / total_weight if total_weight else 0.0
+        ranking.append({
+            "path": path, "score": round(score, 4), "churn": stats[path].get("churn", 0),
+            "commits": stats[path].get("commits", 0), "authors": stats[path].get("authors", 0),
+            "last_touched": stats[path].get("last_touched"), "fan_in": fan_in.get(path, 0),
+        })
+    # Empate (ex: arquivos sem histórico na janela): ordem alfabética, estável entre execuções
+    ranking.sort(key=lambda item: (-item["score"], item["path"]))
+    return ranking
+
+def order_sections(file_sections, ranking):
+    """Reordena {caminho relativo: seção} pela priorização; caminhos fora dela vão para o final."""
+    ordered = {}
+    for item in ranking or ():
+        path = item["path"].replace("/", os.sep)
+        if path in file_sections:
+            ordered[path] = file_sections[path]
+    for path, section in file_sections.items():
+        ordered.setdefault(path, section)
+    return ordered
@@ -0,0 +1,34 @@
+import hashlib
+import json
+import os
+import threading
+
+from modules.analysis_cache import AnalysisCache, DEFAULT_CACHE_DIR
+
+DEFAULT_TTL = int(os.getenv("LLM_CACHE_TTL_HOURS", "168")) * 3600
+DEFAULT_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_MB", "256")) * 1024 * 1024
+
+def prompt_key(model, system_message, temperature, prompt):
+    """Hash estável de tudo que determina a resposta do modelo."""
+    material = json.dumps([model, system_message, temperature, prompt], ensure_ascii=False)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+class ResponseCache(AnalysisCache):
+    """
+    Cache persistente de respostas da API (conteúdo + uso de tokens), endereçado pelo hash do prompt,
+    com expiração (TTL) e a mesma remoção LRU por tamanho do cache de análise.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, ttl=DEFAULT_TTL):
+        super().__init__(cache_dir=cache_dir, max_bytes=max_bytes, filename="responses.sqlite", ttl=ttl)
+
+_DEFAULT_CACHE = None
+_DEFAULT_CACHE_LOCK = threading.Lock()
+
+def get_response_cache():
+    """Retorna a instância de cache de respostas compartilhada do processo."""
+    global _DEFAULT_CACHE
+    with _DEFAULT_CACHE_LOCK:
+        if _DEFAULT_CACHE is None:
+            _DEFAULT_CACHE = ResponseCache()
+        return _DEFAULT_CACHE
@@ -0,0 +1,181 @@
+import re
+
+from modules.symbols import ClassSymbol, ConstantSymbol, Endpoint, FunctionSymbol, ImportSymbol, intern
+
+# --- Motor de Varredura em Passada Única ---
+#
+# Em vez de uma passada completa por padrão, cada arquivo é percorrido uma única vez:
+#
+# - JavaScript/TypeScript: uma alternação de palavras-chave literais (`import`, `const`, ...)
+#   localiza os candidatos e só então o padrão da construção é aplicado, ancorado, naquela posição.
+#   Uma alternação de literais puros permite ao motor `re` pular direto os caracteres que não
+#   iniciam nenhuma palavra-chave; grupos nomeados ou um `\b` inicial desligam essa otimização.
+# - Java: uma regex com uma alternativa nomeada por construção (os modificadores opcionais e o
+#   tipo de retorno impedem a busca por palavra-chave).
+#
+# A fronteira de palavra à esquerda é conferida só nos casamentos (`_preceded_by_word`).
+#
+# A varredura é sempre em bytes UTF-8: texto (str) é codificado uma vez na entrada, e arquivos
+# grandes (mmap) já chegam em bytes. Assim as posições dos casamentos já são os deslocamentos em
+# bytes dos registros (modules/symbols.py) e o mesmo arquivo gera os mesmos símbolos lido de
+# qualquer forma. Em bytes, `\w` casa só ASCII: os identificadores usam IDENT, que aceita também
+# os bytes de caracteres multibyte (`function ação(`).
+
+IDENT = r"[\w$\x80-\xff]"
+
+ENDPOINT_ALTERNATIVE = r"(?P<endpoint>(?:app|router)\.(?P<ep_method>get|post|put|delete|patch)\(['\"](?P<ep_path>[^'\"\n]*)['\"])"
+
+# Literais baratos que precisam aparecer no arquivo para valer a pena procurar endpoints
+ENDPOINT_LITERALS = (b"app.", b"router.")
+
+# Palavra-chave -> construções possíveis a partir dela, na ordem de prioridade
+JS_CONSTRUCTS = {
+    "import": [("import", r"import(?:\s+[^'\"\n;]*?\s+from)?\s+['\"](?P<import_path>[^'\"\n]*)['\"]")],
+    "const": [
+        ("arrow", rf"const\s+(?P<arrow_name>{IDENT}+)\s*=\s*(?:\([^)]*\)|async\s*\([^)]*\))\s*=>"),
+        ("constant", r"const\s+(?P<constant_name>[A-Z_][A-Z0-9_]*)\s*="),
+    ],
+    "let": [("arrow", rf"let\s+(?P<arrow_name>{IDENT}+)\s*=\s*(?:\([^)]*\)|async\s*\([^)]*\))\s*=>")],
+    "function": [("function", rf"function\s+(?P<function_name>{IDENT}+)\s*\((?P<function_args>[^)]*)\)")],
+    "class": [("class", rf"class\s+(?P<class_name>{IDENT}+)")],
+    "app.": [("endpoint", ENDPOINT_ALTERNATIVE)],
+    "router.": [("endpoint", ENDPOINT_ALTERNATIVE)],
+}
+
+JAVA_ALTERNATIVES = [
+    r"(?P<import>\bimport\s+(?P<import_path>[^;\n]*);)",
+    rf"(?P<class>(?:\b(?:public|private|protected)\s+)?(?:\b(?:abstract|final)\s+)?\bclass\s+(?P<class_name>{IDENT}+))",
+    rf"(?P<constant>(?:\b(?:public|private|protected)\s+)?\bstatic\s+final\s+{IDENT}+\s+(?P<constant_name>[A-Z_][A-Z0-9_]*)\s*=)",
+    # Genéricos sem aninhamento e sem `.*?`, para não haver retrocesso catastrófico em entradas minificadas
+    rf"(?P<function>(?:\b(?:public|private|protected)\s+)?(?:\b(?:static|final|abstract)\s+)?\b(?P<function_type>{IDENT}+)(?:<[^<>\n]*>)?\s+(?P<function_name>{IDENT}+)\s*\((?P<function_args>[^)]*)\))",
+]
+
+# Palavras que a alternativa de métodos Java confundiria com um tipo de retorno (ex: `return foo(x)`)
+JAVA_NON_TYPES = {"return", "new", "throw", "else", "case", "yield"}
+
+def _compile(pattern):
+    return re.compile(pattern.encode("utf-8"))
+
+def _compile_variants(alternatives):
+    """Compila a alternação com e sem a alternativa de endpoints."""
+    return {
+        True: _compile("|".join(alternatives + [ENDPOINT_ALTERNATIVE])),
+        False: _compile("|".join(alternatives)),
+    }
+
+def _compile_keywords(constructs):
+    """Compila o localizador de palavras-chave (com e sem endpoints) e as construções ancoradas."""
+    literals = tuple(literal.decode() for literal in ENDPOINT_LITERALS)
+    keywords = {
+        True: list(constructs),
+        False: [kw for kw in constructs if kw not in literals],
+    }
+    finders = {with_endpoints: _compile("|".join(re.escape(kw) for kw in words))
+               for with_endpoints, words in keywords.items()}
+    matchers = {keyword.encode("utf-8"): [(name, _compile(pattern)) for name, pattern in alternatives]
+                for keyword, alternatives in constructs.items()}
+    return finders, matchers
+
+SCANNERS = {"java": _compile_variants(JAVA_ALTERNATIVES)}
+JS_FINDERS, JS_MATCHERS = _compile_keywords(JS_CONSTRUCTS)
+ENDPOINT_SCANNER = _compile(ENDPOINT_ALTERNATIVE)
+
+EXTENSION_LANGUAGES = {".js": "javascript", ".jsx": "javascript", ".ts": "javascript", ".tsx": "javascript", ".java": "java"}
+
+def _as_bytes(content):
+    """str vira bytes UTF-8 (uma cópia, em C); bytes e mmap são varridos como estão."""
+    return content.encode("utf-8") if isinstance(content, str) else content
+
+def _text(value):
+    return value.decode("utf-8", errors="replace")
+
+# Bytes que continuam um identificador: conferir o byte anterior a um casamento é um teste de pertinência
+WORD_BYTES = frozenset(byte for byte in range(256) if _compile(IDENT).match(bytes([byte])))
+
+def _preceded_by_word(content, start):
+    """True se o casamento começa no meio de um identificador (ex: `reimport`, `myapp.get`)."""
+    return start > 0 and content[start - 1] in WORD_BYTES
+
+def may_have_endpoints(content):
+    """Pré-filtro literal: só procura endpoints se `app.` ou `router.` aparecer no conteúdo."""
+    content = _as_bytes(content)
+    return any(content.find(literal) != -1 for literal in ENDPOINT_LITERALS)
+
+def _endpoint(match):
+    return Endpoint(intern(_text(match.group("ep_method")).upper()), _name(match.group("ep_path")))
+
+def _iter_js_matches(content):
+    """Casamentos (tipo, match) de JS sem sobreposição, da esquerda para a direita, em `content` (bytes ou mmap)."""
+    finder = JS_FINDERS[may_have_endpoints(content)]
+    resume = 0
+    for keyword in finder.finditer(content):
+        start = keyword.start()
+        # Palavras-chave dentro de uma construção já extraída ou no meio de um identificador
+        # (o teste de `_preceded_by_word`, sem a chamada: roda uma vez por palavra-chave encontrada)
+        if start < resume or (start and content[start - 1] in WORD_BYTES):
+            continue
+        for kind, pattern in JS_MATCHERS[keyword.group()]:
+            match = pattern.match(content, start)
+            if match:
+                resume = match.end()
+                yield kind, match
+                break
+
+def _iter_java_matches(content):
+    pattern = SCANNERS["java"][may_have_endpoints(content)]
+    for match in pattern.finditer(content):
+        kind = match.lastgroup
+        if kind == "function" and _text(match.group("function_type")) in JAVA_NON_TYPES:
+            continue
+        if kind == "endpoint" and _preceded_by_word(content, match.start()):
+            continue
+        yield kind, match
+
+# Grupo com o nome de cada construção
+NAME_GROUPS = {"import": "import_path", "function": "function_name", "arrow": "arrow_name", "class": "class_name",
+               "constant": "constant_name"}
+
+def _name(raw):
+    return intern(raw.decode("utf-8", errors="replace"))
+
+def scan(content, language):
+    """
+    Extrai imports, funções, classes, constantes e endpoints em uma única passada.
+    `content` pode ser str, bytes ou mmap; os registros (modules/symbols.py) guardam o span em bytes
+    de cada construção, não o código.
+    """
+    analysis = {"imports": [], "functions": [], "classes": [], "constants": [], "endpoints": []}
+    content = _as_bytes(content)
+    matches = _iter_js_matches(content) if language == "javascript" else _iter_java_matches(content)
+    # Laço quente (um registro por construção): registros montados direto, sem make_function/make_class
+    add_import, add_function = analysis["imports"].append, analysis["functions"].append
+    add_class, add_constant = analysis["classes"].append, analysis["constants"].append
+    add_endpoint = analysis["endpoints"].append
+
+    for kind, match in matches:
+        if kind == "endpoint":
+            add_endpoint(_endpoint(match))
+            continue
+        start, end = match.span()
+        name = _name(match.group(NAME_GROUPS[kind]))
+        if kind == "import":
+            add_import(ImportSymbol(name, start, end))
+        elif kind == "function":
+            args = match.group("function_args")
+            args = tuple([_name(arg) for arg in map(bytes.strip, args.split(b",")) if arg]) if args.strip() else ()
+            add_function(FunctionSymbol(name, args, "", False, start, end))
+        elif kind == "arrow":
+            add_function(FunctionSymbol(name, (), "", False, start, end))
+        elif kind == "class":
+            add_class(ClassSymbol(name, (), "", [], start, end))
+        elif kind == "constant":
+            add_constant(ConstantSymbol(name, start, end, False))
+    return analysis
+
+def scan_endpoints(content):
+    """Apenas endpoints (ex: arquivos Python, cujo restante vem da AST), com o mesmo pré-filtro."""
+    content = _as_bytes(content)
+    if not may_have_endpoints(content):
+        return []
+    return [_endpoint(match) for match in ENDPOINT_SCANNER.finditer(content)
+            if not _preceded_by_word(content, match.start())]
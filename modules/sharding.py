@@ -0,0 +1,69 @@
+import os
+import posixpath
+from collections import defaultdict
+
+from modules.file_classifier import EXT_MAP
+
+# --- Divisão de Monorepos em Subprojetos ---
+#
+# Um monorepo com dezenas de serviços vira um prompt único grande demais para ser útil. Cada
+# diretório com um manifesto de dependências (a categoria "dependencias" da classificação:
+# package.json, pom.xml, requirements.txt, ...) é a raiz de um subprojeto, e cada arquivo pertence
+# à raiz mais profunda acima dele. Arquivos fora de qualquer subprojeto ficam com a raiz do
+# repositório (""). A classificação e a análise continuam sendo feitas uma vez para o repositório
+# inteiro (já paralelas e com cache por SHA de blob); o que se divide é o que vai para cada prompt.
+
+MANIFEST_NAMES = frozenset(EXT_MAP["dependencias"])
+# Com menos subprojetos que isso, o repositório é documentado como um projeto só
+MIN_SHARDS = 2
+
+def _rel(repo_path, filepath):
+    return os.path.relpath(filepath, repo_path).replace(os.sep, "/")
+
+def detect_shards(repo_path, manifests):
+    """
+    Raízes dos subprojetos a partir dos manifestos classificados: {raiz relativa com "/": [manifestos]}.
+    Um manifesto na raiz do repositório (ex: package.json com workspaces) não cria subprojeto.
+    """
+    shards = defaultdict(list)
+    for filepath in manifests:
+        rel_path = _rel(repo_path, filepath)
+        root, name = posixpath.split(rel_path)
+        if root and name in MANIFEST_NAMES:
+            shards[root].append(name)
+    return {root: sorted(names) for root, names in sorted(shards.items())}
+
+def shard_of(rel_path, roots):
+    """Raiz mais profunda de `roots` que contém `rel_path`, ou "" (fora de qualquer subprojeto)."""
+    directory = posixpath.dirname(rel_path)
+    while directory:
+        if directory in roots:
+            return directory
+        directory = posixpath.dirname(directory)
+    return ""
+
+def split_classification(repo_path, classification, roots):
+    """{raiz: {categoria: [arquivos]}}, com as categorias na ordem original."""
+    shards = defaultdict(lambda: defaultdict(list))
+    for category, files in classification.items():
+        for filepath in files:
+            shards[shard_of(_rel(repo_path, filepath), roots)][category].append(filepath)
+    return shards
+
+def split_analysis(repo_path, code_analysis, duplicates, roots):
+    """
+    ({raiz: {arquivo: análise}}, {raiz: {representante: [cópias]}}). Um grupo de cópias que cruza
+    subprojetos é refeito em cada um deles: o menor caminho do subprojeto vira o representante
+    local, com a análise do representante global (o conteúdo é o mesmo).
+    """
+    analyses, groups = defaultdict(dict), defaultdict(dict)
+    for filepath, analysis in code_analysis.items():
+        by_shard = defaultdict(list)
+        for member in (filepath, *(duplicates or {}).get(filepath, ())):
+            by_shard[shard_of(_rel(repo_path, member), roots)].append(member)
+        for root, members in by_shard.items():
+            members.sort()
+            analyses[root][members[0]] = analysis
+            if len(members) > 1:
+                groups[root][members[0]] = members[1:]
+    return analyses, groups
@@ -0,0 +1,68 @@
+import hashlib
+import json
+import os
+import subprocess
+
+# Saídas das etapas (classificação, commits, análise) por repositório, para que cada subcomando
+# do CLI possa rodar sozinho reaproveitando as entradas que as etapas anteriores já calcularam.
+# Fica no diretório da ferramenta, não no de trabalho: um hook de CI que roda `main.py prompt .`
+# de dentro do repositório analisado não pode gravar o cache na própria working tree.
+TOOL_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STAGE_DIR = os.path.join(TOOL_DIR, ".repos", ".cache", "stages")
+
+# Arquivos que o próprio pipeline escreve na working tree e que não a tornam "suja"
+GENERATED_FILES = ("README_GERADO.md",)
+# Clones e caches (análise, respostas da API) que o pipeline grava em .repos/ do diretório atual,
+# que pode ser o próprio repositório analisado
+GENERATED_DIRS = (".repos",)
+
+def _stage_dir(repo_path):
+    repo_path = os.path.abspath(repo_path)
+    # Checkouts locais de mesmo nome (ex: /ci/a/app e /ci/b/app) não podem dividir o mesmo cache
+    suffix = hashlib.sha1(repo_path.encode("utf-8")).hexdigest()[:8]
+    return os.path.join(STAGE_DIR, f"{os.path.basename(repo_path)}-{suffix}")
+
+def tree_key(repo_path):
+    """
+    SHA do HEAD se a working tree estiver limpa, ou None: com alterações não commitadas as saídas
+    salvas podem não corresponder aos arquivos, e as etapas são sempre recalculadas.
+    """
+    from modules.git_objects import is_bare
+    if is_bare(repo_path):
+        # Sem working tree (modo --bare): o conteúdo é sempre o do HEAD
+        head = subprocess.run(["git", "rev-parse", "HEAD"], cwd=repo_path, capture_output=True, text=True)
+        return head.stdout.strip() if head.returncode == 0 else None
+    exclude = [f":(exclude,glob)**/{name}" for name in GENERATED_FILES]
+    exclude.extend(f":(exclude,glob)**/{name}/**" for name in GENERATED_DIRS)
+    status = subprocess.run(["git", "status", "--porcelain", "--", ".", *exclude], cwd=repo_path,
+                            capture_output=True, text=True)
+    if status.returncode != 0 or status.stdout.strip():
+        return None
+    head = subprocess.run(["git", "rev-parse", "HEAD"], cwd=repo_path, capture_output=True, text=True)
+    return head.stdout.strip() if head.returncode == 0 else None
+
+def load_stage(repo_path, stage, key, options=None):
+    """Saída salva da etapa para o mesmo `key` e as mesmas `options`, ou None."""
+    if not key:
+        return None
+    try:
+        with open(os.path.join(_stage_dir(repo_path), f"{stage}.json"), "r", encoding="utf-8") as f:
+            saved = json.load(f)
+    except (OSError, ValueError):
+        return None
+    # Compara como JSON: tuplas salvas voltam como listas
+    if saved.get("key") != key or saved.get("options") != json.loads(json.dumps(options or {})):
+        return None
+    return saved["data"]
+
+def save_stage(repo_path, stage, key, data, options=None):
+    if not key:
+        return
+    stage_dir = _stage_dir(repo_path)
+    os.makedirs(stage_dir, exist_ok=True)
+    path = os.path.join(stage_dir, f"{stage}.json")
+    # Grava em um arquivo temporário e renomeia: execuções paralelas (hooks de CI) nunca leem um JSON pela metade
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"key": key, "options": options or {}, "data": data}, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
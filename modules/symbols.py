@@ -0,0 +1,110 @@
+import sys
+from dataclasses import dataclass
+
+# --- Registros Compactos da Análise ---
+#
+# Cada símbolo extraído é um objeto com __slots__ (sem __dict__ por instância) que guarda apenas
+# o deslocamento [start, end) em bytes da construção no arquivo, em vez de uma cópia do código.
+# O texto é lido do arquivo só quando o prompt é montado (`code_text`). Nomes, argumentos, bases
+# e caminhos são internados: o mesmo nome repetido em milhares de arquivos vira uma única string.
+#
+# Nos caches (JSON) e entre processos, os registros trafegam como listas (`pack` / `unpack`).
+#
+# Os __slots__ são declarados à mão em vez de `@dataclass(slots=True)` (Python 3.10+), por isso
+# nenhum campo tem valor padrão: o padrão viraria um atributo de classe em conflito com o slot.
+
+intern = sys.intern
+
+@dataclass
+class ImportSymbol:
+    __slots__ = ("name", "start", "end")
+    name: str
+    start: int
+    end: int
+
+@dataclass
+class FunctionSymbol:
+    __slots__ = ("name", "args", "docstring", "is_async", "start", "end")
+    name: str
+    args: tuple
+    docstring: str
+    is_async: bool
+    start: int
+    end: int
+
+@dataclass
+class ClassSymbol:
+    __slots__ = ("name", "bases", "docstring", "methods", "start", "end")
+    name: str
+    bases: tuple
+    docstring: str
+    methods: list
+    start: int
+    end: int
+
+@dataclass
+class ConstantSymbol:
+    __slots__ = ("name", "start", "end", "has_value")
+    name: str
+    start: int
+    end: int
+    # Python: o span é o valor atribuído (exibido no prompt); JS/Java: a declaração
+    has_value: bool
+
+@dataclass
+class Endpoint:
+    __slots__ = ("method", "path")
+    method: str
+    path: str
+
+SYMBOL_KEYS = ("imports", "functions", "classes", "constants", "endpoints")
+
+def make_function(name, args, docstring, is_async, start, end):
+    return FunctionSymbol(intern(name), tuple(intern(arg) for arg in args), docstring, is_async, start, end)
+
+def make_class(name, bases, docstring, start, end):
+    return ClassSymbol(intern(name), tuple(intern(base) for base in bases), docstring, [], start, end)
+
+def _pack_function(function):
+    return [function.name, list(function.args), function.docstring, function.is_async, function.start, function.end]
+
+def _unpack_function(item):
+    return make_function(*item)
+
+def pack(analysis):
+    """Converte os registros de uma análise em listas (JSON e pickle compactos); as demais chaves passam intactas."""
+    packed = dict(analysis)
+    packed["imports"] = [[s.name, s.start, s.end] for s in analysis.get("imports", ())]
+    packed["functions"] = [_pack_function(s) for s in analysis.get("functions", ())]
+    packed["classes"] = [[s.name, list(s.bases), s.docstring, [_pack_function(m) for m in s.methods], s.start, s.end]
+                         for s in analysis.get("classes", ())]
+    packed["constants"] = [[s.name, s.start, s.end, s.has_value] for s in analysis.get("constants", ())]
+    packed["endpoints"] = [[s.method, s.path] for s in analysis.get("endpoints", ())]
+    return packed
+
+def unpack(packed):
+    """Inverso de `pack`, internando as strings repetitivas no processo atual."""
+    analysis = dict(packed)
+    analysis["imports"] = [ImportSymbol(intern(name), start, end) for name, start, end in packed.get("imports", ())]
+    analysis["functions"] = [_unpack_function(item) for item in packed.get("functions", ())]
+    analysis["classes"] = []
+    for name, bases, docstring, methods, start, end in packed.get("classes", ()):
+        record = make_class(name, bases, docstring, start, end)
+        record.methods = [_unpack_function(item) for item in methods]
+        analysis["classes"].append(record)
+    analysis["constants"] = [ConstantSymbol(intern(name), start, end, has_value)
+                             for name, start, end, has_value in packed.get("constants", ())]
+    analysis["endpoints"] = [Endpoint(intern(method), intern(path)) for method, path in packed.get("endpoints", ())]
+    return analysis
+
+def read_source(filepath):
+    """
+    Conteúdo do arquivo para recortar os spans. Levanta OSError se ele não puder mais ser lido:
+    spans recortados de um conteúdo vazio virariam blocos de código vazios no prompt.
+    """
+    with open(filepath, "rb") as f:
+        return f.read()
+
+def code_text(source, symbol):
+    """Texto da construção no arquivo (`source` em bytes), lido apenas na montagem do prompt."""
+    return source[symbol.start:symbol.end].decode("utf-8", errors="replace")
@@ -0,0 +1,182 @@
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+
+try:
+    import resource
+except ImportError:  # Windows: sem pico de memória por etapa
+    resource = None
+
+# Limites (ms) dos baldes do histograma de tempo de análise por arquivo
+HISTOGRAM_BOUNDS_MS = (1, 5, 10, 50, 100, 500, 1000, 5000)
+
+def _max_rss_kb(who):
+    """Pico de memória residente (KB) do processo (RUSAGE_SELF) ou dos workers já encerrados (RUSAGE_CHILDREN)."""
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(who).ru_maxrss
+    # No macOS o valor vem em bytes; no Linux, em KB
+    return max_rss // 1024 if sys.platform == "darwin" else max_rss
+
+class Tracer:
+    """
+    Coleta a instrumentação de uma execução: spans das etapas (tempo e pico de memória),
+    tempo de análise por arquivo, latência e tokens das chamadas à API e contadores.
+
+    Os eventos ficam em memória e são exportados no final em JSON lines e/ou no formato
+    de trace do Chrome (chrome://tracing, Perfetto).
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.events = []
+        self.counters = defaultdict(int)
+        self.file_times = []
+        self.llm_latencies = []
+
+    def _add(self, event):
+        with self.lock:
+            self.events.append(event)
+
+    @contextlib.contextmanager
+    def span(self, name, **attrs):
+        """Mede um bloco. `attrs` (devolvido pelo `with`) pode ser completado dentro do bloco."""
+        start = time.time()
+        started = time.perf_counter()
+        try:
+            yield attrs
+        finally:
+            self._add({
+                "type": "span", "name": name, "start": start, "seconds": time.perf_counter() - started,
+                "pid": os.getpid(), "tid": threading.get_ident(), "attrs": attrs,
+                "max_rss_kb": _max_rss_kb(resource.RUSAGE_SELF) if resource else None,
+                "children_max_rss_kb": _max_rss_kb(resource.RUSAGE_CHILDREN) if resource else None,
+            })
+
+    def reset(self):
+        """Descarta o que foi coletado (processos residentes, como o serviço, reiniciam entre jobs)."""
+        with self.lock:
+            self.events = []
+            self.counters = defaultdict(int)
+            self.file_times = []
+            self.llm_latencies = []
+
+    def count(self, name, value=1):
+        with self.lock:
+            self.counters[name] += value
+
+    def record_file(self, path, timing, analysis):
+        """Registra a análise de um arquivo; `timing` traz start, seconds, pid e bytes (medidos no worker)."""
+        self.count("analysis.files")
+        self.count("analysis.bytes", timing.get("bytes", 0))
+        if analysis.get("skipped"):
+            self.count("analysis.skipped")
+        if analysis.get("error"):
+            self.count("analysis.errors")
+        with self.lock:
+            self.file_times.append((timing["seconds"], path))
+        self._add({"type": "file", "path": path, **timing, "skipped": analysis.get("skipped"), "error": analysis.get("error")})
+
+    def record_llm(self, start, seconds, usage, **attrs):
+        """Registra uma chamada à API: latência total e tokens de `usage` (prompt, completion, total)."""
+        usage = usage or {}
+        self.count("llm.calls")
+        for key in ("prompt_tokens", "completion_tokens", "total_tokens"):
+            self.count(f"llm.{key}", usage.get(key, 0))
+        with self.lock:
+            self.llm_latencies.append(seconds)
+        self._add({"type": "llm", "start": start, "seconds": seconds, "pid": os.getpid(),
+                   "tid": threading.get_ident(), "usage": usage, **attrs})
+
+    def histogram(self):
+        """Contagem de arquivos por faixa de tempo de análise (rótulos em ms)."""
+        labels = [f"<{bound}ms" for bound in HISTOGRAM_BOUNDS_MS] + [f">={HISTOGRAM_BOUNDS_MS[-1]}ms"]
+        buckets = dict.fromkeys(labels, 0)
+        for seconds, _ in self.file_times:
+            ms = seconds * 1000
+            label = next((f"<{bound}ms" for bound in HISTOGRAM_BOUNDS_MS if ms < bound), labels[-1])
+            buckets[label] += 1
+        return buckets
+
+    def slowest_files(self, limit=10):
+        return [{"path": path, "seconds": round(seconds, 4)} for seconds, path in sorted(self.file_times, reverse=True)[:limit]]
+
+    def summary(self):
+        latencies = sorted(self.llm_latencies)
+        return {
+            "stages": [{"name": e["name"], "seconds": round(e["seconds"], 4), "max_rss_kb": e["max_rss_kb"],
+                        "children_max_rss_kb": e["children_max_rss_kb"], **e["attrs"]}
+                       for e in self.events if e["type"] == "span"],
+            "counters": dict(self.counters),
+            "file_histogram": self.histogram(),
+            "slowest_files": self.slowest_files(),
+            "llm_latency": {
+                "calls": len(latencies),
+                "total_seconds": round(sum(latencies), 4),
+                "max_seconds": round(latencies[-1], 4) if latencies else None,
+                "p50_seconds": round(latencies[len(latencies) // 2], 4) if latencies else None,
+            },
+        }
+
+    def write_jsonl(self, path):
+        """Um evento por linha, na ordem em que terminaram, seguido de uma linha de resumo."""
+        with open(path, "w", encoding="utf-8") as f:
+            for event in self.events:
+                f.write(json.dumps(event, ensure_ascii=False) + "\n")
+            f.write(json.dumps({"type": "summary", **self.summary()}, ensure_ascii=False) + "\n")
+
+    def write_chrome_trace(self, path):
+        """Exporta spans, arquivos e chamadas à API como eventos completos ("ph": "X") do Chrome."""
+        trace_events = []
+        for event in self.events:
+            if event["type"] == "span":
+                name, args = event["name"], event["attrs"]
+            elif event["type"] == "file":
+                name, args = os.path.basename(event["path"]), {"path": event["path"], "bytes": event.get("bytes")}
+            else:
+                name, args = "chat_completion", event["usage"]
+            trace_events.append({
+                "name": name, "cat": event["type"], "ph": "X",
+                "ts": int(event["start"] * 1_000_000), "dur": int(event["seconds"] * 1_000_000),
+                # Arquivos analisados em workers ficam em uma faixa por processo
+                "pid": event.get("pid") or 0, "tid": event.get("tid") or event.get("pid") or 0, "args": args,
+            })
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": trace_events, "displayTimeUnit": "ms"}, f, ensure_ascii=False)
+
+    def print_summary(self, slowest=5):
+        summary = self.summary()
+        print("\n[telemetry] Tempo por etapa:")
+        for stage in summary["stages"]:
+            rss = f", pico {stage['max_rss_kb'] // 1024} MB" if stage["max_rss_kb"] else ""
+            print(f"- {stage['name']}: {stage['seconds']:.2f}s{rss}")
+        counters = summary["counters"]
+        if counters.get("analysis.files"):
+            print(f"- Análise: {counters['analysis.files']} arquivo(s), {counters['analysis.bytes'] / (1024 * 1024):.1f} MB, "
+                  f"{counters.get('analysis.skipped', 0)} ignorado(s), {counters.get('analysis.errors', 0)} com erro.")
+            for item in summary["slowest_files"][:slowest]:
+                print(f"  - {item['seconds']:.3f}s {item['path']}")
+        if summary["llm_latency"]["calls"]:
+            print(f"- API: {summary['llm_latency']['calls']} chamada(s) em {summary['llm_latency']['total_seconds']:.2f}s, "
+                  f"{counters.get('llm.total_tokens', 0)} tokens, {counters.get('llm.retries', 0)} retentativa(s).")
+
+TRACER = Tracer()
+
+def span(name, **attrs):
+    return TRACER.span(name, **attrs)
+
+def count(name, value=1):
+    TRACER.count(name, value)
+
+def export(trace_path=None, chrome_trace_path=None):
+    """Grava os arquivos de trace pedidos na linha de comando."""
+    if trace_path:
+        TRACER.write_jsonl(trace_path)
+        print(f"[telemetry] Trace gravado em: {trace_path}")
+    if chrome_trace_path:
+        TRACER.write_chrome_trace(chrome_trace_path)
+        print(f"[telemetry] Trace (formato Chrome) gravado em: {chrome_trace_path}")
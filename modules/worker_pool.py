@@ -0,0 +1,159 @@
+import multiprocessing
+import sys
+import time
+from collections import deque
+from multiprocessing.connection import wait
+
+try:
+    import resource
+except ImportError:  # Windows: sem limite de memória por processo
+    resource = None
+
+# Método de criação dos workers (None = padrão da plataforma). Processos com várias threads
+# (ex: o modo batch) devem usar "forkserver" ou "spawn": um fork pode herdar locks ocupados.
+START_METHOD = None
+
+# Situações devolvidas por `run_isolated` além de "ok"
+STATUS_TIMEOUT = "timeout"
+STATUS_MEMORY = "memory"
+STATUS_CRASH = "crash"
+
+def use_thread_safe_start_method(preload=("modules.code_analyzer",)):
+    """
+    Passa a criar os workers com "forkserver" (Linux) ou "spawn". Com o forkserver, os módulos de
+    `preload` são importados uma única vez no servidor, e cada worker já nasce com eles carregados
+    (regexes compiladas, analisadores prontos) em vez de reimportá-los.
+    """
+    global START_METHOD
+    START_METHOD = "forkserver" if sys.platform.startswith("linux") else "spawn"
+    if START_METHOD == "forkserver" and preload:
+        multiprocessing.get_context(START_METHOD).set_forkserver_preload(list(preload))
+
+def _limit_memory(max_memory_mb):
+    """Limita o espaço de endereçamento do processo atual: alocações acima dele geram MemoryError."""
+    if resource is None or not max_memory_mb:
+        return
+    limit = max_memory_mb * 1024 * 1024
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+
+def _worker_main(conn, func, initializer, max_memory_mb):
+    """
+    Laço do processo worker: recebe um lote [(índice, item)] e devolve (índice, situação, resultado)
+    para cada item assim que ele termina, sem esperar o pai.
+    """
+    _limit_memory(max_memory_mb)
+    if initializer:
+        initializer()
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            return
+        if task is None:
+            return
+        for index, item in task:
+            try:
+                conn.send((index, "ok", func(item)))
+            except MemoryError:
+                conn.send((index, STATUS_MEMORY, None))
+
+def _spawn(ctx, func, initializer, max_memory_mb):
+    parent_conn, child_conn = ctx.Pipe()
+    process = ctx.Process(target=_worker_main, args=(child_conn, func, initializer, max_memory_mb), daemon=True)
+    process.start()
+    child_conn.close()
+    return {"process": process, "conn": parent_conn, "task": None, "started": None}
+
+def _stop(worker, kill=False):
+    if not kill:
+        try:
+            worker["conn"].send(None)
+        except (OSError, ValueError):
+            kill = True
+    if kill:
+        worker["process"].kill()
+    worker["process"].join(timeout=5)
+    worker["conn"].close()
+
+def run_isolated(func, items, jobs=1, timeout=None, max_memory_mb=None, initializer=None, chunk_size=1):
+    """
+    Executa `func(item)` para cada item em `jobs` processos worker, com orçamento de tempo
+    (segundos de relógio) e de memória (MB) por item.
+
+    Cada worker recebe lotes de `chunk_size` itens em uma só mensagem e devolve os resultados um
+    a um, sem uma ida e volta por item; o orçamento de tempo de cada item conta a partir do
+    resultado anterior do mesmo worker.
+
+    Gera (índice, situação, resultado) à medida que os itens terminam, fora de ordem. A situação é
+    "ok" ou STATUS_TIMEOUT / STATUS_MEMORY / STATUS_CRASH; fora do "ok" o worker é morto e
+    substituído, então um item patológico não trava nem derruba o restante da execução. O resto
+    do lote interrompido volta para a fila um item por vez, para isolar outro item problemático.
+    """
+    items = list(items)
+    if not items:
+        return
+    ctx = multiprocessing.get_context(START_METHOD)
+    chunk_size = max(1, chunk_size)
+    pending = deque(list(range(start, min(start + chunk_size, len(items)))) for start in range(0, len(items), chunk_size))
+
+    def dispatch(worker):
+        worker["task"] = deque(pending.popleft()) if pending else None
+        if worker["task"] is not None:
+            worker["started"] = time.monotonic()
+            worker["conn"].send([(index, items[index]) for index in worker["task"]])
+
+    workers = [_spawn(ctx, func, initializer, max_memory_mb) for _ in range(max(1, min(jobs, len(pending))))]
+    try:
+        for worker in workers:
+            dispatch(worker)
+
+        while any(worker["task"] is not None for worker in workers):
+            busy = [worker for worker in workers if worker["task"] is not None]
+            wait_for = None
+            if timeout:
+                wait_for = max(0.0, min(worker["started"] for worker in busy) + timeout - time.monotonic())
+            wait([worker["conn"] for worker in busy] + [worker["process"].sentinel for worker in busy], timeout=wait_for)
+
+            now = time.monotonic()
+            for position, worker in enumerate(workers):
+                if worker["task"] is None:
+                    continue
+                failure = None
+                # Todos os resultados do lote que já chegaram
+                while worker["task"] and worker["conn"].poll():
+                    try:
+                        index, status, result = worker["conn"].recv()
+                    except EOFError:
+                        failure = (STATUS_CRASH, worker["process"].exitcode)
+                        break
+                    if status != "ok":
+                        failure = (status, result)
+                        break
+                    worker["task"].popleft()
+                    worker["started"] = time.monotonic()
+                    yield index, status, result
+                if failure is None:
+                    if not worker["task"]:
+                        dispatch(worker)
+                        continue
+                    if worker["process"].is_alive():
+                        if not timeout or now - worker["started"] < timeout:
+                            continue
+                        failure = (STATUS_TIMEOUT, timeout)
+                    else:
+                        failure = (STATUS_CRASH, worker["process"].exitcode)
+
+                # Estourou o orçamento ou morreu: descarta o processo (e o heap fragmentado) e segue com um novo
+                index = worker["task"].popleft()
+                pending.extendleft([rest] for rest in reversed(worker["task"]))
+                _stop(worker, kill=True)
+                workers[position] = _spawn(ctx, func, initializer, max_memory_mb)
+                yield index, *failure
+                dispatch(workers[position])
+    finally:
+        # Se o consumidor parar antes do fim, os workers ainda ocupados são mortos
+        for worker in workers:
+            _stop(worker, kill=worker["task"] is not None)
@@ -5,361 +5,415 @@
 
 import sys
 import os
-import subprocess
-import shutil
-import time
-import json
-import re
-import ast
-from pathlib import Path
-from urllib.parse import urlparse
 from collections import defaultdict
-from dotenv import load_dotenv
-from git import Repo
-import requests
+
+from modules.git_fetcher import docs_path, fetch_repository, FETCH_STATS
+from modules.commit_reader import read_commits
+from modules.file_classifier import DEFAULT_EXCLUDE_DIRS, classify_files, classify_paths
+from modules.telemetry import TRACER, export, span
+from modules.incremental import load_state, save_state, diff_since, head_sha, merge_sections, restore_readme
+
+# A análise (multiprocessing, SQLite, regexes compiladas) e a documentação (cliente HTTP) são
+# importadas dentro da etapa que as usa: `main.py classify`, por exemplo, não paga por elas.
+# Opções None usam o padrão do módulo da etapa (ex: FILE_TIMEOUT_SECONDS em modules/code_analyzer.py).
 
 class ProjectOrchestrator:
     """Encapsula todo o fluxo de trabalho de análise e documentação de um projeto."""
 
-    def __init__(self, repo_url):
+    def __init__(self, repo_url, depth=None, blobless=False, jobs=1, max_commits=500, since=None, incremental_commits=False,
+                 incremental=False, chunked=False, chunk_tokens=None, llm_concurrency=None, llm_cache=True,
+                 stream=False, exclude_dirs=DEFAULT_EXCLUDE_DIRS, file_timeout=None, file_memory_mb=None,
+                 trace_path=None, chrome_trace_path=None, ref=None, ranking_mode="both", prompt_tokens=None,
+                 dedup="exact", bare=False, shard=False):
         if not repo_url:
             raise ValueError("A URL do repositório não pode ser vazia.")
         self.repo_url = repo_url
+        self.ref = ref
+        self.depth = depth
+        self.blobless = blobless
+        self.jobs = jobs
+        self.max_commits = max_commits
+        self.since = since
+        self.incremental_commits = incremental_commits
+        self.incremental = incremental
+        self.chunked = chunked
+        self.chunk_tokens = chunk_tokens
+        self.llm_concurrency = llm_concurrency
+        self.llm_cache = llm_cache
+        self.stream = stream
+        self.exclude_dirs = exclude_dirs
+        self.file_timeout = file_timeout
+        self.file_memory_mb = file_memory_mb
+        self.trace_path = trace_path
+        self.chrome_trace_path = chrome_trace_path
+        self.ranking_mode = ranking_mode
+        self.prompt_tokens = prompt_tokens
+        self.dedup = dedup
+        self.bare = bare
+        self.shard = shard
+        self.state = None
+        self.delta = None
         self.repo_path = None
+        self.tree = None
         self.classification = None
         self.commits = None
+        self.duplicates = None
+        self.shards = None
         self.code_analysis = defaultdict(dict)
-        self.ANALYSIS_CACHE = {}
+        self.index = None
+        self.ranking = None
 
     # --- Etapa 1: Fetch do Repositório ---
     def fetch_repository(self, base_path=".repos"):
         print("[1] Clonando repositório...")
-        if not os.path.exists(base_path):
-            os.makedirs(base_path)
-        repo_name = urlparse(self.repo_url).path.strip("/").replace(".git", "").replace("/", "_")
-        self.repo_path = os.path.join(base_path, repo_name)
-        if os.path.exists(self.repo_path):
-            print(f"[fetcher] Repositório já existe. Apagando para clonar novamente.")
-            shutil.rmtree(self.repo_path)
-        print(f"[fetcher] Clonando {self.repo_url} para {self.repo_path}...")
-        Repo.clone_from(self.repo_url, self.repo_path)
+        # Reaproveita clones existentes em .repos/ com fetch incremental (ver modules/git_fetcher.py)
+        # Absoluto, como em `main.py <etapa> <diretório>`: as análises e o cache de etapas guardam caminhos completos
+        self.repo_path = os.path.abspath(fetch_repository(self.repo_url, base_path=base_path, depth=self.depth,
+                                                          blobless=self.blobless, ref=self.ref, bare=self.bare))
         print(f"Repositório clonado em: {self.repo_path}")
+        print(f"- Cache de clones: {FETCH_STATS['hits']} hit(s), {FETCH_STATS['misses']} miss(es).")
+
+    @property
+    def output_path(self):
+        """Onde o README_GERADO.md é gravado: a working tree, ou `.repos/.docs/<nome>` no modo `--bare`."""
+        return docs_path(self.repo_path, bare=self.bare)
+
+    def _tree(self):
+        """Arquivos do HEAD no banco de objetos (modo `--bare`), ou None para ler da working tree."""
+        from modules.git_objects import GitTree
+
+        if self.bare and self.tree is None:
+            self.tree = GitTree(self.repo_path, "HEAD")
+        return self.tree
+
+    def _reader(self):
+        from modules.symbols import read_source
+
+        tree = self._tree()
+        return tree.read_source if tree is not None else read_source
 
     # --- Etapa 2: Classificação de Arquivos ---
     def classify_files(self):
         print("\n[2] Classificando arquivos...")
-        EXT_MAP = {
-            "documentacao": ["*.md", "*.txt", "LICENSE", "CONTRIBUTING"],
-            "build": ["Dockerfile", "Makefile", "*.sh", "*.bat"],
-            "configuracao": ["*.json", "*.xml", "*.yml", "*.yaml", "*.toml", "*.ini", "*.cfg"],
-            "dependencias": ["package.json", "requirements.txt", "pom.xml", "build.gradle", "Gemfile"],
-            "frontend": ["*.js", "*.jsx", "*.ts", "*.tsx", "*.vue", "*.html", "*.css", "*.scss"],
-            "backend": ["*.py", "*.rb", "*.java", "*.go", "*.rs", "*.php", "*.cs", "*.js", "*.ts"],
-            "teste": ["*.test.js", "*.spec.ts", "*.test.py", "*.spec.rb", "tests/", "specs/"],
-            "infra": ["*.tf", "*.tfvars", "ansible/", "puppet/"],
-            "api": ["*.proto", "*.graphql", "swagger.yaml", "openapi.json"],
-            "notebooks": ["*.ipynb"],
-            "dados": ["*.sql", "*.csv", "*.parquet"],
-        }
-        self.classification = defaultdict(list)
-        classified_files = set()
-        for root, dirs, files in os.walk(self.repo_path):
-            if ".git" in dirs:
-                dirs.remove(".git")
-            for file in files:
-                filepath = os.path.join(root, file)
-                if filepath in classified_files:
-                    continue
-                # Lógica de classificação
-                for category, patterns in EXT_MAP.items():
-                    if file in patterns or f"*{os.path.splitext(file)[1]}" in patterns or any(p.endswith("/") and p in filepath for p in patterns):
-                        self.classification[category].append(filepath)
-                        classified_files.add(filepath)
-                        break
-                if filepath not in classified_files:
-                    self.classification["outros"].append(filepath)
+        if self.incremental and self.shard:
+            # Cada subprojeto é documentado por inteiro; o cache de respostas da API evita chamadas
+            # repetidas para os subprojetos cujo prompt não mudou
+            print("- Modo --shard: --incremental ignorado.")
+        elif self.incremental:
+            self.state = load_state(self.repo_path)
+            self.delta = diff_since(self.repo_path, self.state["sha"]) if self.state else None
+        if self.delta is not None:
+            changed, deleted = self.delta
+            print(f"- Modo incremental: {len(changed)} alterado(s), {len(deleted)} removido(s) desde {self.state['sha'][:7]}.")
+            changed = (os.path.join(self.repo_path, rel_path) for rel_path in changed)
+            if self.bare:
+                changed = [filepath for filepath in changed if self._tree().blob_sha(filepath)]
+            self.classification = classify_paths(changed, repo_path=self.repo_path, exclude_dirs=self.exclude_dirs)
+            return
+        if self.bare:
+            # Sem working tree: os arquivos vêm da listagem do HEAD (`git ls-tree`)
+            self.classification = classify_paths(self._tree().filepaths(), repo_path=self.repo_path,
+                                                 exclude_dirs=self.exclude_dirs)
+        else:
+            self.classification = classify_files(self.repo_path, exclude_dirs=self.exclude_dirs)
         for category, files in self.classification.items():
             if files:
                 print(f"- {category}: {len(files)} arquivos")
 
-    # --- (Outras etapas como placeholders) ---
-    def read_commits(self):
-        print("\n[3] Lendo commits... (TODO)")
-        self.commits = {}
-
-    def analyze_codebase(self):
-        print("\n[4] Analisando o código...")
+    def _files_to_analyze(self):
         categories_to_analyze = ["backend", "frontend", "teste", "api"]
         files_to_analyze = []
         for category in categories_to_analyze:
             if category in self.classification:
                 files_to_analyze.extend(self.classification[category])
+        return files_to_analyze
+
+    # --- Deduplicação (fim da Etapa 2) ---
+    def deduplicate_files(self):
+        from modules.dedup import group_duplicates
+
+        # {representante: [cópias]}: só o representante é analisado e documentado
+        self.duplicates = group_duplicates(self._files_to_analyze(), mode=self.dedup, tree=self._tree())
+        copies = sum(len(group) for group in self.duplicates.values())
+        if copies:
+            print(f"- Deduplicação ({self.dedup}): {copies} cópia(s) em {len(self.duplicates)} grupo(s) não serão analisadas.")
+
+    # --- Subprojetos de um Monorepo (fim da Etapa 2) ---
+    def detect_shards(self):
+        from modules.sharding import detect_shards
+
+        # {raiz relativa: [manifestos]}: diretórios com package.json, pom.xml, requirements.txt, ...
+        self.shards = detect_shards(self.repo_path, self.classification.get("dependencias", ()))
+        if self.shards:
+            roots = ", ".join(list(self.shards)[:5]) + (", ..." if len(self.shards) > 5 else "")
+            print(f"- Subprojetos: {len(self.shards)} ({roots}).")
+
+    # --- Etapa 3: Leitura de Commits ---
+    def read_commits(self):
+        print("\n[3] Lendo commits...")
+        self.commits = read_commits(self.repo_path, max_count=self.max_commits, since=self.since,
+                                    incremental=self.incremental_commits)
+        print(f"- Encontrados {sum(len(c) for c in self.commits.values())} commits de {len(self.commits)} autores.")
+
+    # --- Etapa 4: Análise de Código ---
+
+    def analyze_codebase(self):
+        from modules.analysis_cache import get_default_cache
+        from modules.code_analyzer import (FILE_MEMORY_MB, FILE_TIMEOUT_SECONDS, analyze_files, report_offenders,
+                                           report_skipped)
+
+        if self.duplicates is None:
+            self.deduplicate_files()
+        print("\n[4] Analisando o código...")
+        copies = {filepath for group in self.duplicates.values() for filepath in group}
+        files_to_analyze = [filepath for filepath in self._files_to_analyze() if filepath not in copies]
         if not files_to_analyze:
             print("- Nenhum arquivo de código encontrado para análise.")
             return
 
-        for filepath in files_to_analyze:
-            analysis = self._analyze_single_file(filepath)
+        results = analyze_files(files_to_analyze, jobs=self.jobs,
+                                timeout=FILE_TIMEOUT_SECONDS if self.file_timeout is None else self.file_timeout,
+                                max_memory_mb=FILE_MEMORY_MB if self.file_memory_mb is None else self.file_memory_mb,
+                                tree=self._tree())
+        for filepath, analysis in results:
             if analysis and not analysis.get("error"):
                 if analysis.get("functions") or analysis.get("classes") or analysis.get("constants") or analysis.get("endpoints"):
                     self.code_analysis[filepath] = analysis
         print(f"- Análise de código concluída para {len(self.code_analysis)} arquivos.")
+        report_skipped(results, self.repo_path)
+        report_offenders(results, self.repo_path)
+        cache_stats = get_default_cache().stats()
+        print(f"- Cache de análise: {cache_stats['hits']} hit(s), {cache_stats['misses']} miss(es).")
+
+    # --- Índice do Código (fim da Etapa 4) ---
+    def build_index(self):
+        from modules.code_index import CodeIndex
+
+        if self.delta is not None and self.state.get("index") is not None:
+            # Incremental: reindexa só os arquivos alterados sobre o índice da última geração
+            changed, deleted = self.delta
+            self.index = CodeIndex(self.state["index"]).updated(self.repo_path, self.code_analysis,
+                                                                removed=[*changed, *deleted], duplicates=self.duplicates)
+        else:
+            self.index = CodeIndex.from_analysis(self.repo_path, self.code_analysis, duplicates=self.duplicates)
+        stats = self.index.stats()
+        print(f"- Índice: {stats['files']} arquivo(s), {stats['edges']} dependência(s) entre eles, {stats['symbols']} símbolo(s).")
 
-    def _analyze_single_file(self, filepath):
-        if filepath in self.ANALYSIS_CACHE:
-            return self.ANALYSIS_CACHE[filepath]
-
-        _, extension = os.path.splitext(filepath)
-        analysis = {"imports": [], "functions": [], "classes": [], "constants": [], "endpoints": [], "error": None}
+    def _require_index(self):
+        if self.index is None:
+            self.build_index()
+        return self.index
 
-        try:
-            with open(filepath, "r", encoding="utf-8") as f:
-                content = f.read()
-
-            if extension == ".py":
-                analysis.update(self._analyze_python(content))
-            elif extension in [".js", ".jsx", ".ts", ".tsx"]:
-                analysis.update(self._analyze_js(content))
-            elif extension == ".java":
-                analysis.update(self._analyze_java(content))
-            elif extension in [".md", ".txt", ".html", ".css"]:
-                self.ANALYSIS_CACHE[filepath] = analysis
-                return analysis
-
-            for pattern in self._get_api_patterns():
-                for match in pattern.finditer(content):
-                    analysis["endpoints"].append({"method": match.group(1).upper(), "path": match.group(2)})
+    # --- Priorização dos Arquivos (início da Etapa 5) ---
+    def rank_files(self):
+        from modules.ranking import file_history, rank_files
 
-        except Exception as e:
-            analysis["error"] = f"Falha ao analisar o arquivo: {e}"
-
-        self.ANALYSIS_CACHE[filepath] = analysis
-        return analysis
-
-    def _get_api_patterns(self):
-        return [
-            re.compile(r"@(?:app|router)\.(get|post|put|delete|patch)\([\'\"](.*?)['\"]"),
-            re.compile(r"(?:app|router)\.(get|post|put|delete|patch)\([\'\"](.*?)['\"],")
-        ]
-
-    def _analyze_python(self, content):
-        tree = ast.parse(content)
-        analysis = {"imports": [], "functions": [], "classes": [], "constants": []}
-        for node in ast.walk(tree):
-            if isinstance(node, ast.Assign) and isinstance(node.targets[0], ast.Name) and node.targets[0].id.isupper():
-                analysis["constants"].append({"name": node.targets[0].id, "value": ast.get_source_segment(content, node.value)})
-            elif isinstance(node, ast.FunctionDef):
-                analysis["functions"].append({"name": node.name, "args": [arg.arg for arg in node.args.args], "docstring": ast.get_docstring(node) or "", "code_block": ast.get_source_segment(content, node)})
-        return analysis
-
-    def _analyze_js(self, content):
-        patterns = {
-            "imports": re.compile(r"import(?:\s+.*?\s+from)?\s+['\"](.*?)['\"]"),
-            "functions": re.compile(r"(?:function|const|let)\s+([\w\$]+)\s*=\s*(?:\([^)]*\)|async\s*\([^)]*\))\s*=>|function\s+([\w\$]+)\s*\(([^)]*)\)"),
-            "classes": re.compile(r"class\s+([\w\$]+)"),
-            "constants": re.compile(r"const\s+([A-Z_][A-Z0-9_]*)\s*=")
-        }
-        return self._analyze_generic_with_regex(content, patterns)
-
-    def _analyze_java(self, content):
-        patterns = {
-            "imports": re.compile(r"import\s+(.*?);"),
-            "classes": re.compile(r"(?:public|private|protected)?\s*(?:abstract|final)?\s*class\s+(\w+)"),
-            "functions": re.compile(r"(?:public|private|protected)?\s*(?:static|final|abstract)?\s*\w+(?:<.*?>)?\s+(\w+)\s*\(([^)]*)\)"),
-            "constants": re.compile(r"(?:public|private|protected)?\s*static final\s+\w+\s+([A-Z_][A-Z0-9_]*)\s*=")
-        }
-        return self._analyze_generic_with_regex(content, patterns)
-
-    def _analyze_generic_with_regex(self, content, patterns):
-        analysis = {"imports": [], "functions": [], "classes": [], "constants": []}
-        for key, pattern in patterns.items():
-            for match in pattern.finditer(content):
-                if key == "functions":
-                    func_name = match.group(1) or match.group(2)
-                    args_str = match.group(3) or ""
-                    args = [arg.strip() for arg in args_str.split(",") if arg.strip()]
-                    analysis[key].append({"name": func_name, "args": args, "docstring": "", "code_block": match.group(0)})
-                else:
-                    name = next((g for g in match.groups() if g is not None), None)
-                    if name:
-                        analysis[key].append({"name": name, "code_block": match.group(0)})
-        return analysis
+        if self.ranking_mode == "off":
+            self.ranking = []
+            return
+        rel_paths = {os.path.relpath(filepath, self.repo_path) for filepath in self.code_analysis}
+        if self.delta is not None:
+            # Incremental: os blocos preservados também concorrem
+            rel_paths.update(set(self.state["sections"]) - set(self.delta[1]))
+        history = None
+        if self.ranking_mode in ("both", "history"):
+            history = file_history(self.repo_path, max_count=self.max_commits, since=self.since)
+        fan_in = self._require_index().fan_in() if self.ranking_mode in ("both", "imports") else None
+        self.ranking = rank_files(sorted(rel_paths), history=history, fan_in=fan_in)
+        top = ", ".join(item["path"] for item in self.ranking[:3])
+        print(f"- Priorização ({self.ranking_mode}): {len(self.ranking)} arquivo(s); mais relevantes: {top or 'nenhum'}.")
+
+    def _ranked_sections(self, file_sections):
+        from modules.ranking import order_sections
+
+        if self.ranking is None:
+            self.rank_files()
+        return order_sections(file_sections, self.ranking)
+
+    def _prompt_tokens(self):
+        from modules.documentation_builder import DEFAULT_PROMPT_TOKENS
+
+        return DEFAULT_PROMPT_TOKENS if self.prompt_tokens is None else self.prompt_tokens
 
     # --- Etapa 5: Geração de Documentação ---
     def build_documentation(self):
-        print("\n[5] Gerando documentação...")
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            print("[doc_builder] Chave da API não encontrada.")
-            return None
-
-        prompt = self._build_killer_prompt()
-        
-        headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
-
-        system_message = ("Você é um arquiteto de soluções e redator técnico de elite, com a rara habilidade de analisar sistemas complexos e produzir documentação cristalina. "
-                          "Sua análise é incisiva, precisa e antecipa as necessidades do leitor. Você segue padrões de documentação rigorosos como o 'Diátaxis' e o 'arc42'. "
-                          "Seu público são outros engenheiros de software; a clareza e a precisão técnica são imperativas. Use Markdown e formatação Mermaid para diagramas quando aplicável.")
+        from modules.documentation_builder import build_file_sections, render_commit_history
 
-        payload = {
-            "model": "gpt-4o",
-            "messages": [{"role": "system", "content": system_message}, {"role": "user", "content": prompt}],
-            "temperature": 0.4
-        }
-
-        print("[doc_builder] Gerando documentação com o prompt de elite...")
-        try:
-            response = requests.post("https://api.openai.com/v1/chat/completions", headers=headers, json=payload, timeout=300)
-            response.raise_for_status()
-            response_data = response.json()
-            doc_content = response_data["choices"][0]["message"]["content"]
-            token_usage = response_data.get("usage", {})
-            print(f"[doc_builder] Total de tokens usados: {token_usage.get('total_tokens', 'N/A')}")
-            doc_filepath = os.path.join(self.repo_path, "README_GERADO.md")
-            with open(doc_filepath, "w", encoding="utf-8") as f:
-                f.write(doc_content)
-            return doc_filepath
-        except Exception as e:
-            print(f"[doc_builder] Erro na chamada da API: {e}")
+        print("\n[5] Gerando documentação...")
+        if self.shard:
+            from modules.sharding import MIN_SHARDS
+
+            if self.shards is None:
+                self.detect_shards()
+            if len(self.shards) >= MIN_SHARDS:
+                return self.build_shard_documentation()
+            print(f"- Menos de {MIN_SHARDS} subprojetos: documentado como um projeto só.")
+        file_sections = build_file_sections(self.repo_path, self.code_analysis, duplicates=self.duplicates,
+                                            reader=self._reader())
+        history = render_commit_history(self.commits)
+        if self.delta is not None:
+            # Arquivos alterados sem nada a documentar saem do prompt; os demais blocos são preservados
+            updated = dict.fromkeys(self.delta[0])
+            updated.update(file_sections)
+            file_sections = merge_sections(self.state["sections"], updated, set(self.delta[1]))
+            # Commits novos (mesmo sem arquivos documentados alterados) mudam a seção 4 do README
+            if file_sections == self.state["sections"] and history == self.state.get("history"):
+                doc_path = restore_readme(self._output_dir(""), self.state)
+                if doc_path:
+                    print("- Nenhuma seção nem commit novo: README anterior reaproveitado sem chamar a API.")
+                    return doc_path
+
+        # O estado incremental guarda todas as seções; a ordem e o orçamento valem só para o prompt
+        doc_path = self._write_documentation(self.repo_path, self._output_dir(""), self.classification, self.commits,
+                                             self.code_analysis, self._ranked_sections(file_sections),
+                                             self._require_index().mermaid())
+        current_sha = head_sha(self.repo_path)
+        if doc_path and current_sha:
+            save_state(self.repo_path, current_sha, file_sections, doc_path, index=self.index.to_json(), history=history)
+        return doc_path
+
+    def _output_dir(self, root):
+        """Diretório de saída do subprojeto `root` ("" = raiz), criado se ainda não existir."""
+        output_dir = os.path.join(self.output_path, root) if root else self.output_path
+        os.makedirs(output_dir, exist_ok=True)
+        return output_dir
+
+    def _write_documentation(self, repo_path, output_dir, classification, commits, code_analysis, file_sections, diagram):
+        from modules.documentation_builder import DEFAULT_CHUNK_TOKENS, DEFAULT_LLM_CONCURRENCY, build_documentation
+
+        return build_documentation(repo_path, classification, commits, code_analysis, file_sections=file_sections,
+                                   chunked=self.chunked, chunk_tokens=self.chunk_tokens or DEFAULT_CHUNK_TOKENS,
+                                   concurrency=self.llm_concurrency or DEFAULT_LLM_CONCURRENCY, use_cache=self.llm_cache,
+                                   stream=self.stream, token_budget=self._prompt_tokens(), diagram=diagram,
+                                   output_dir=output_dir)
+
+    def _document_shard(self, root, classification, code_analysis, duplicates):
+        from modules.code_index import CodeIndex
+        from modules.documentation_builder import build_file_sections
+        from modules.ranking import order_sections
+
+        # No modo --bare o subprojeto não existe em disco: o caminho serve só para os caminhos relativos
+        shard_path = os.path.join(self.repo_path, root) if root else self.repo_path
+        commits = read_commits(self.repo_path, max_count=self.max_commits, since=self.since, paths=[root] if root else None)
+        # Priorização do repositório inteiro, com os caminhos relativos ao subprojeto
+        prefix = f"{root}/" if root else ""
+        ranking = [dict(item, path=item["path"][len(prefix):]) for item in self.ranking if item["path"].startswith(prefix)]
+        file_sections = order_sections(build_file_sections(shard_path, code_analysis, duplicates=duplicates,
+                                                           reader=self._reader()), ranking)
+        diagram = CodeIndex.from_analysis(shard_path, code_analysis, duplicates=duplicates).mermaid()
+        return self._write_documentation(shard_path, self._output_dir(root), classification, commits, code_analysis,
+                                         file_sections, diagram)
+
+    def build_shard_documentation(self):
+        """
+        Monorepo: um README por subprojeto, gerados em paralelo (até `llm_concurrency` ao mesmo tempo),
+        e um índice na raiz com o resumo de cada um e as dependências entre eles.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+        from modules.documentation_builder import DEFAULT_LLM_CONCURRENCY, write_shard_index
+        from modules.sharding import shard_of, split_analysis, split_classification
+
+        roots = set(self.shards)
+        classifications = split_classification(self.repo_path, self.classification, roots)
+        analyses, duplicates = split_analysis(self.repo_path, self.code_analysis, self.duplicates, roots)
+        # Compartilhados pelas threads: calculados antes delas
+        if self.ranking is None:
+            self.rank_files()
+        index = self._require_index()
+        if self._tree() is not None:
+            self._tree().reader()
+
+        # A raiz só ganha documentação própria se tiver código fora dos subprojetos
+        todo = [root for root in self.shards if analyses.get(root)] + ([""] if analyses.get("") else [])
+        concurrency = max(1, self.llm_concurrency or DEFAULT_LLM_CONCURRENCY)
+        print(f"- Monorepo: {len(todo)} subprojeto(s) com código, até {concurrency} documentado(s) ao mesmo tempo...")
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = {root: executor.submit(self._document_shard, root, classifications[root], analyses[root],
+                                             duplicates.get(root)) for root in todo}
+            readmes = {root: future.result() for root, future in futures.items()}
+        if not any(readmes.values()):
             return None
 
-    def _build_killer_prompt(self):
-        repo_name = os.path.basename(self.repo_path.strip("/"))
-        prompt = f"# Análise e Documentação Técnica do Projeto: {repo_name}\n\n## 1. Análise Arquitetural (Framework Diátaxis - Visão Geral)\n\nCom base em toda a informação fornecida (estrutura de arquivos, código-fonte, commits), sintetize a arquitetura do projeto. Descreva o **propósito fundamental**, o **domínio do problema** que ele resolve, e os **principais componentes de software** e suas interações. Se possível, gere um diagrama de componentes simples usando Mermaid.\n\n## 2. Guia de Iniciação Rápida (Tutorial)\n\nCrie um guia passo a passo para um novo desenvolvedor configurar e executar este projeto localmente. Baseie-se nos arquivos de dependência (ex: `package.json`, `requirements.txt`) e de build.\n\n## 3. Referência Técnica Detalhada (How-to Guides & Reference)\n\n### 3.1. Estrutura do Projeto\n\n(Aqui você descreve a estrutura de arquivos que já estava sendo feita)\n\n### 3.2. Análise do Código-Fonte\n\nPara cada arquivo analisado, gere a documentação técnica seguindo o formato rigoroso abaixo:\n\n"
-
-        for filepath, analysis in self.code_analysis.items():
-            rel_path = os.path.relpath(filepath, self.repo_path)
-            prompt += f"#### Arquivo: `{rel_path}`\n\n"
-
-            if analysis.get("constants"):
-                prompt += "##### Constantes e Variáveis Globais\n| Nome | Valor/Inicialização | Descrição |\n|---|---|---|\n"
-                for const in analysis["constants"]:
-                    prompt += f"| `{const['name']}` | `{const.get('value', 'N/A')}` | (Inferir o propósito da constante) |\n"
-                prompt += "\n"
-
-            if analysis.get("functions"):
-                prompt += "##### Funções\n"
-                for func in analysis["functions"]:
-                    prompt += f"- **Função: `{func['name']}`**\n"
-                    prompt += f"  - **Descrição:** (Analise o bloco de código e a docstring `{func.get('docstring', 'N/A')}` para criar uma descrição técnica precisa.)\n"
-                    prompt += f"  - **Parâmetros:**\n    | Nome | Descrição |\n    |---|---|\n"
-                    if func['args']:
-                        for arg in func['args']:
-                            prompt += f"    | `{arg}` | (Descreva o parâmetro) |\n"
-                    else:
-                        prompt += "    | N/A | - |\n"
-                    prompt += f"  - **Retorno:** (Analise o bloco de código para determinar o que é retornado.)\n"
-                    prompt += f"  - **Bloco de Código:**\n```python\n{func.get('code_block', 'N/A')}\n```\n"
-
-            if analysis.get("endpoints"):
-                prompt += "##### Endpoints de API\n| Método | Rota | Propósito Esperado |\n|---|---|---|\n"
-                for ep in analysis["endpoints"]:
-                    prompt += f"| `{ep['method']}` | `{ep['path']}` | (Inferir o propósito do endpoint) |\n"
-                prompt += "\n"
-
-        prompt += "## 4. Análise do Histórico de Desenvolvimento (Explanation)\n\nCom base nos commits, resuma a evolução do projeto, destacando as principais features adicionadas e as correções mais relevantes.\n\n"
-
-        if not self.commits:
-            prompt += "Nenhum commit encontrado no histórico.\n\n"
-        else:
-            commit_count = 0
-            for author, commit_list in self.commits.items():
-                if commit_count >= 15:
-                    break
-                prompt += f"### Commits de {author}\n"
-                for commit in commit_list[:5]:
-                    if commit_count >= 15:
-                        break
-                    prompt += f"- `[{commit['hash'][:7]}]` {commit['message']}\n"
-                    commit_count += 1
-                prompt += "\n"
-
-        prompt += "---\n*Documentação gerada por um especialista em análise de sistemas. Revise para garantir 100% de precisão.*"
-        return prompt
+        root_doc = None
+        if readmes.get(""):
+            with open(readmes[""], "r", encoding="utf-8") as f:
+                root_doc = f.read()
+        shards = [{"root": root, "manifests": manifests, "readme": readmes.get(root),
+                   "files": len(analyses.get(root, ())) + sum(len(copies) for copies in duplicates.get(root, {}).values())}
+                  for root, manifests in self.shards.items()]
+        component_of = {rel_path: shard_of(rel_path, roots) or "(raiz)" for rel_path in index.files}
+        generated = sum(1 for root in self.shards if readmes.get(root))
+        print(f"- Subprojetos documentados: {generated} de {len(self.shards)}.")
+        return write_shard_index(self.repo_path, shards, diagram=index.mermaid(component_of=component_of), root_doc=root_doc,
+                                 output_dir=self._output_dir(""))
+
+    def build_prompt(self):
+        from modules.documentation_builder import build_file_sections, build_killer_prompt
+
+        file_sections = self._ranked_sections(build_file_sections(self.repo_path, self.code_analysis,
+                                                                  duplicates=self.duplicates, reader=self._reader()))
+        return build_killer_prompt(self.repo_path, self.classification, self.commits, self.code_analysis,
+                                   file_sections=file_sections, token_budget=self._prompt_tokens(),
+                                   diagram=self._require_index().mermaid())
 
     # --- Etapa 6: Criação de Pull Request ---
     def create_pull_request(self):
-        print("\n[6] Criando Pull Request...")
-        # 0. Verifica se o gh CLI está instalado
-        if subprocess.run(["command", "-v", "gh"], capture_output=True).returncode != 0:
-            print("[gh_manager] Erro: O GitHub CLI ('gh') não está instalado ou não foi encontrado no PATH.")
-            return None
+        from modules.github_manager import create_pull_request
 
-        # 1. Define nomes e mensagens
-        branch_name = f"gemini-docs-{int(time.time())}"
-        commit_message = "docs: Add auto-generated project documentation"
-        pr_title = "[AI] Documentação Automática do Projeto"
-        pr_body = ("Este Pull Request foi gerado automaticamente por um agente de IA.\n\n"
-                   "Ele contém uma documentação inicial do projeto, criada a partir da análise estática "
-                   "do código-fonte, estrutura de arquivos e histórico de commits.\n\n"
-                   "**Por favor, revise cuidadosamente antes de fazer o merge.**")
-
-        # 2. Configura o usuário do Git para o commit
-        self._run_command(["git", "config", "user.name", "Gemini Documentation Agent"])
-        self._run_command(["git", "config", "user.email", "gemini-agent@google.com"])
-
-        # 3. Cria um novo branch
-        success, _ = self._run_command(["git", "checkout", "-b", branch_name])
-        if not success: return None
-
-        # 4. Adiciona e commita o arquivo de documentação
-        success, _ = self._run_command(["git", "add", "README_GERADO.md"])
-        if not success: return None
-
-        success, _ = self._run_command(["git", "commit", "-m", commit_message])
-        if not success: return None
-
-        # 5. Faz o push do novo branch
-        success, _ = self._run_command(["git", "push", "-u", "origin", branch_name])
-        if not success: return None
-
-        # 6. Cria o Pull Request usando o gh CLI
-        print("[gh_manager] Criando o Pull Request...")
-        success, output = self._run_command(["gh", "pr", "create", "--title", pr_title, "--body", pr_body, "--fill"])
-        if not success:
+        print("\n[6] Criando Pull Request...")
+        if self.bare:
+            print("- Modo --bare: sem working tree para commitar o README; Pull Request não criado.")
             return None
+        return create_pull_request(self.repo_path)
 
-        pr_url = output.strip()
-        print(f"[gh_manager] Pull Request criado com sucesso: {pr_url}")
-        return pr_url
+    def close(self):
+        """Encerra o `git cat-file` do modo `--bare`, se aberto."""
+        if self.tree is not None:
+            self.tree.close()
+            self.tree = None
 
-    def _run_command(self, command):
-        """Helper para executar comandos no shell dentro do repo_path."""
-        print(f"[gh_manager] Executando: {' '.join(command)}")
-        result = subprocess.run(command, cwd=self.repo_path, capture_output=True, text=True)
-        if result.returncode != 0:
-            print(f"[gh_manager] Erro: {result.stderr}")
-            return False, result.stderr
-        return True, result.stdout
-
-    def run(self):
+    def run(self, create_pr=True):
         try:
-            self.fetch_repository()
-            self.classify_files()
-            self.read_commits()
-            self.analyze_codebase()
-            doc_path = self.build_documentation()
+            with span("[1] Clonando repositório"):
+                self.fetch_repository()
+            with span("[2] Classificando arquivos") as stage:
+                self.classify_files()
+                self.deduplicate_files()
+                if self.shard:
+                    self.detect_shards()
+                stage["files"] = sum(len(files) for files in self.classification.values())
+            with span("[3] Lendo commits") as stage:
+                self.read_commits()
+                stage["commits"] = sum(len(c) for c in self.commits.values())
+            with span("[4] Analisando o código") as stage:
+                self.analyze_codebase()
+                self.build_index()
+                stage["documented_files"] = len(self.code_analysis)
+            with span("[5] Gerando documentação"):
+                doc_path = self.build_documentation()
             if doc_path:
                 print(f"- Documentação gerada em: {doc_path}")
-                pr_url = self.create_pull_request()
-                if pr_url:
-                    print(f"- Pull Request criado com sucesso: {pr_url}")
-                else:
-                    print("- Falha ao criar o Pull Request.")
+                if create_pr:
+                    with span("[6] Criando Pull Request"):
+                        pr_url = self.create_pull_request()
+                    if pr_url:
+                        print(f"- Pull Request criado com sucesso: {pr_url}")
+                    else:
+                        print("- Falha ao criar o Pull Request.")
             else:
                 print("- Falha ao gerar a documentação.")
         except Exception as e:
             print(f"\nOcorreu um erro fatal: {e}")
             sys.exit(1)
+        finally:
+            self.close()
+            TRACER.print_summary()
+            export(self.trace_path, self.chrome_trace_path)
 
 def main():
-    load_dotenv()
-    if len(sys.argv) < 2:
-        print("Uso: python orquestrador.py <url-do-repositorio-github>")
-        sys.exit(1)
-    repo_url = sys.argv[1]
-    orchestrator = ProjectOrchestrator(repo_url)
-    orchestrator.run()
+    # Mesmo pipeline e opções de `python main.py run`, sempre abrindo o Pull Request no final
+    from main import main as cli_main
+    cli_main(["run", "--create-pr", *sys.argv[1:]])
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,58 @@
+"""
+Testes de `analyze_files` em modules/code_analyzer.py: todos os caminhos com mais de um job
+passam pelos workers isolados (modules/worker_pool.py), com ou sem orçamento por arquivo.
+
+Uso: python -m unittest tests.test_code_analyzer (ou python -m pytest tests)
+"""
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from modules import code_analyzer
+
+SOURCES = {
+    "api.js": "import express from 'express';\nconst LIMITE = 10;\nfunction listar(req, res) {}\napp.get('/itens', listar);\n",
+    "Servico.java": "import java.util.List;\npublic class Servico {\n  public List<String> nomes(int total) { return null; }\n}\n",
+    "util.py": "TAXA = 0.1\n\ndef calcular(valor, taxa=TAXA):\n    return valor * taxa\n",
+}
+
+class AnalyzeFilesTest(unittest.TestCase):
+    def setUp(self):
+        self.repo = tempfile.mkdtemp(prefix="code-analyzer-")
+        self.filepaths = []
+        for name, source in SOURCES.items():
+            filepath = os.path.join(self.repo, name)
+            with open(filepath, "w", encoding="utf-8") as f:
+                f.write(source)
+            self.filepaths.append(filepath)
+        code_analyzer.ANALYSIS_CACHE.clear()
+
+    def tearDown(self):
+        code_analyzer.ANALYSIS_CACHE.clear()
+        shutil.rmtree(self.repo, ignore_errors=True)
+
+    def analyze(self, **kwargs):
+        code_analyzer.ANALYSIS_CACHE.clear()
+        with mock.patch.object(code_analyzer, "run_isolated", wraps=code_analyzer.run_isolated) as isolated:
+            results = code_analyzer.analyze_files(self.filepaths, **kwargs)
+        return results, isolated.called
+
+    def test_sem_orcamento_varios_jobs_usam_os_workers_isolados(self):
+        in_process, isolated = self.analyze(jobs=1, timeout=0, max_memory_mb=0)
+        self.assertFalse(isolated)
+        unbounded, isolated = self.analyze(jobs=2, timeout=0, max_memory_mb=0, chunk_size=1)
+        self.assertTrue(isolated)
+        self.assertEqual(unbounded, in_process)
+        self.assertEqual([filepath for filepath, _ in unbounded], self.filepaths)
+
+    def test_com_orcamento_o_resultado_e_o_mesmo(self):
+        in_process, _ = self.analyze(jobs=1, timeout=0, max_memory_mb=0)
+        bounded, isolated = self.analyze(jobs=2, timeout=30, max_memory_mb=1024)
+        self.assertTrue(isolated)
+        self.assertEqual(bounded, in_process)
+        self.assertTrue(all(not analysis.get("error") for _, analysis in bounded))
+
+if __name__ == "__main__":
+    unittest.main()
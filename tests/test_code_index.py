@@ -0,0 +1,57 @@
+"""
+Testes da resolução de imports de modules/code_index.py.
+
+Uso: python -m unittest tests.test_code_index (ou python -m pytest tests)
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from modules.code_analyzer import analyze_code
+from modules.code_index import CodeIndex
+
+FILES = ("app/__init__.py", "app/pkg/__init__.py", "app/pkg/mod.py", "app/sub/__init__.py", "app/sub/x.py")
+
+class ResolveRelativeImportTest(unittest.TestCase):
+    def setUp(self):
+        self.index = CodeIndex({rel_path: {"imports": [], "symbols": []} for rel_path in FILES})
+
+    def test_from_pacote_pai_importa_modulo(self):
+        # `from ..pkg import mod` em app/sub/x.py chega do analisador como "..pkg.mod"
+        self.assertEqual(self.index.resolve("app/sub", "..pkg.mod"), "app/pkg/mod.py")
+
+    def test_from_pacote_pai_importa_nome_do_pacote(self):
+        # `from ..pkg import helper`: helper não é um módulo, então vale o pacote
+        self.assertEqual(self.index.resolve("app/sub", "..pkg.helper"), "app/pkg/__init__.py")
+
+    def test_from_pai_importa_pacote(self):
+        # `from .. import pkg`
+        self.assertEqual(self.index.resolve("app/sub", "..pkg"), "app/pkg/__init__.py")
+
+    def test_from_pai_importa_nome_inexistente(self):
+        # `from .. import helper`: helper vem de app/__init__.py
+        self.assertEqual(self.index.resolve("app/sub", "..helper"), "app/__init__.py")
+
+class ResolveFromAnalysisTest(unittest.TestCase):
+    """O nome gerado pelo analisador para `from ..pkg import mod` vira uma aresta do grafo."""
+
+    def setUp(self):
+        self.repo = tempfile.mkdtemp(prefix="code-index-")
+        for rel_path in FILES:
+            os.makedirs(os.path.join(self.repo, os.path.dirname(rel_path)), exist_ok=True)
+            with open(os.path.join(self.repo, rel_path), "w", encoding="utf-8") as f:
+                f.write("from ..pkg import mod\n" if rel_path == "app/sub/x.py" else "VALOR = 1\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.repo, ignore_errors=True)
+
+    def test_aresta_para_o_modulo(self):
+        analysis = {os.path.join(self.repo, rel_path): analyze_code(os.path.join(self.repo, rel_path), use_disk_cache=False)
+                    for rel_path in FILES}
+        index = CodeIndex.from_analysis(self.repo, analysis)
+        self.assertEqual(index.imports["app/sub/x.py"], ["app/pkg/mod.py"])
+        self.assertEqual(index.importers["app/pkg/mod.py"], ["app/sub/x.py"])
+
+if __name__ == "__main__":
+    unittest.main()
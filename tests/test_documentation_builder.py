@@ -0,0 +1,90 @@
+"""
+Testes da montagem das seções do prompt em modules/documentation_builder.py.
+
+Uso: python -m unittest tests.test_documentation_builder (ou python -m pytest tests)
+"""
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from modules.documentation_builder import batch_sections, build_file_sections, estimate_tokens
+from modules.scanner import scan
+
+SOURCE = "function somar(a, b) {\n  return a + b;\n}\n"
+
+class UnreadableSourceTest(unittest.TestCase):
+    def setUp(self):
+        self.repo = tempfile.mkdtemp(prefix="doc-builder-")
+
+    def tearDown(self):
+        shutil.rmtree(self.repo, ignore_errors=True)
+
+    def analyze(self, rel_path):
+        filepath = os.path.join(self.repo, rel_path)
+        with open(filepath, "w", encoding="utf-8") as f:
+            f.write(SOURCE)
+        return filepath, scan(SOURCE, "javascript")
+
+    def test_arquivo_apagado_apos_a_analise_fica_fora_do_prompt(self):
+        kept, kept_analysis = self.analyze("mantido.js")
+        removed, removed_analysis = self.analyze("removido.js")
+        os.remove(removed)
+
+        log = io.StringIO()
+        with contextlib.redirect_stdout(log):
+            sections = build_file_sections(self.repo, {kept: kept_analysis, removed: removed_analysis})
+
+        self.assertEqual(list(sections), ["mantido.js"])
+        self.assertIn("function somar(a, b)", sections["mantido.js"])
+        self.assertIn("removido.js", log.getvalue())
+
+    def test_leitor_sem_o_arquivo_omite_a_secao(self):
+        # Mesmo contrato do `GitTree.read_source` no modo `--bare`: OSError em vez de conteúdo vazio
+        filepath, analysis = self.analyze("ausente.js")
+
+        def reader(path):
+            raise FileNotFoundError(f"{path} não está no commit analisado")
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            sections = build_file_sections(self.repo, {filepath: analysis}, reader=reader)
+        self.assertEqual(sections, {})
+
+class BatchSectionsTest(unittest.TestCase):
+    LINES = [f"    total += {number}\n" for number in range(5000)]
+    HUGE = ("#### Arquivo: `grande.py`\n\n##### Funções\n- **Função: `somar`**\n  - **Bloco de Código:**\n"
+            "```python\ndef somar():\n" + "".join(LINES) + "```\n")
+    SMALL = {"antes.py": "#### Arquivo: `antes.py`\n\n", "depois.py": "#### Arquivo: `depois.py`\n\n"}
+
+    def batches(self, budget):
+        sections = {"antes.py": self.SMALL["antes.py"], "grande.py": self.HUGE, "depois.py": self.SMALL["depois.py"]}
+        return batch_sections(sections, budget)
+
+    def test_secao_maior_que_o_orcamento_e_dividida_em_lotes_que_cabem_nele(self):
+        budget = 2000
+        batches = self.batches(budget)
+        self.assertGreater(len(batches), 1)
+        for batch in batches:
+            self.assertLessEqual(sum(estimate_tokens(section) for section in batch), budget)
+
+    def test_partes_preservam_o_codigo_e_os_blocos(self):
+        pieces = [piece for batch in self.batches(2000) for piece in batch]
+        self.assertEqual(pieces[0], self.SMALL["antes.py"])
+        self.assertEqual(pieces[-1], self.SMALL["depois.py"])
+        parts = pieces[1:-1]
+        self.assertTrue(parts[0].startswith("#### Arquivo: `grande.py`\n"))
+        for number, part in enumerate(parts[1:], 2):
+            self.assertTrue(part.startswith(f"#### Arquivo: `grande.py` (continuação, parte {number} de {len(parts)})"))
+        # Cada parte fecha o bloco de código que abriu (ou reabriu), e nenhuma linha se perde ou repete
+        for part in parts:
+            self.assertEqual(part.count("```") % 2, 0)
+        code = [line for part in parts for line in part.splitlines(keepends=True) if line.startswith("    total")]
+        self.assertEqual(code, self.LINES)
+
+    def test_secoes_dentro_do_orcamento_nao_mudam(self):
+        self.assertEqual(self.batches(10 ** 6), [[self.SMALL["antes.py"], self.HUGE, self.SMALL["depois.py"]]])
+
+if __name__ == "__main__":
+    unittest.main()
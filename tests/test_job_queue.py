@@ -0,0 +1,47 @@
+"""
+Testes da deduplicação de modules/job_queue.py.
+
+Uso: python -m unittest tests.test_job_queue (ou python -m pytest tests)
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from modules.job_queue import JobQueue
+
+URL = "https://github.com/exemplo/projeto.git"
+
+class EnqueueDedupTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp(prefix="job-queue-")
+        self.queue = JobQueue(os.path.join(self.dir, "jobs.sqlite"))
+
+    def tearDown(self):
+        self.queue.close()
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def test_mesmas_opcoes_sao_deduplicadas_em_qualquer_ordem(self):
+        first, deduplicated = self.queue.enqueue(URL, "main", {"chunked": True, "bare": True})
+        self.assertFalse(deduplicated)
+        again, deduplicated = self.queue.enqueue(URL, "main", {"bare": True, "chunked": True})
+        self.assertTrue(deduplicated)
+        self.assertEqual(again["id"], first["id"])
+
+    def test_opcoes_diferentes_entram_na_fila(self):
+        plain, _ = self.queue.enqueue(URL, "main", {})
+        for options in ({"chunked": True}, {"bare": True}, {"shard": True}, {"chunked": True, "prompt_tokens": 8000}):
+            job, deduplicated = self.queue.enqueue(URL, "main", options)
+            self.assertFalse(deduplicated, options)
+            self.assertNotEqual(job["id"], plain["id"])
+            self.assertEqual(job["options"], options)
+        self.assertEqual(self.queue.stats(), {"queued": 5})
+
+    def test_sem_opcoes_equivale_a_opcoes_vazias(self):
+        first, _ = self.queue.enqueue(URL)
+        again, deduplicated = self.queue.enqueue(URL, None, {})
+        self.assertTrue(deduplicated)
+        self.assertEqual(again["id"], first["id"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+"""
+Testes de modules/ranking.py sobre um repositório Git temporário.
+
+Uso: python -m unittest tests.test_ranking (ou python -m pytest tests)
+"""
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+from modules.ranking import file_history
+
+BODY = "".join(f"linha {number}\n" for number in range(20))
+
+class FileHistoryRenameTest(unittest.TestCase):
+    def setUp(self):
+        self.repo = tempfile.mkdtemp(prefix="ranking-")
+        self.git("init", "-q")
+
+    def tearDown(self):
+        shutil.rmtree(self.repo, ignore_errors=True)
+
+    def git(self, *args, author="Ana"):
+        env = dict(os.environ, GIT_AUTHOR_NAME=author, GIT_AUTHOR_EMAIL=f"{author}@exemplo.com",
+                   GIT_COMMITTER_NAME=author, GIT_COMMITTER_EMAIL=f"{author}@exemplo.com")
+        subprocess.run(["git", *args], cwd=self.repo, env=env, check=True, capture_output=True)
+
+    def write(self, rel_path, content):
+        with open(os.path.join(self.repo, rel_path), "w", encoding="utf-8") as f:
+            f.write(content)
+
+    def commit(self, message, author="Ana"):
+        self.git("add", "-A")
+        self.git("commit", "-q", "-m", message, author=author)
+
+    def test_cadeia_de_renomeacoes_soma_no_caminho_atual(self):
+        # a.py -> b.py -> c.py, com uma linha alterada em cada passo e uma edição depois da última renomeação
+        self.write("a.py", BODY)
+        self.commit("cria a.py")
+        self.git("mv", "a.py", "b.py")
+        self.write("b.py", BODY + "extra b\n")
+        self.commit("renomeia para b.py", author="Bia")
+        self.git("mv", "b.py", "c.py")
+        self.write("c.py", BODY + "extra b\nextra c\n")
+        self.commit("renomeia para c.py")
+        self.write("c.py", BODY.replace("linha 0\n", "primeira\n") + "extra b\nextra c\n")
+        self.commit("edita c.py", author="Caio")
+
+        history = file_history(self.repo)
+
+        self.assertEqual(set(history), {"c.py"})
+        stats = history["c.py"]
+        self.assertEqual(stats["commits"], 4)
+        self.assertEqual(stats["authors"], 3)
+        # 20 linhas criadas, +1 em cada renomeação e 1 substituída (1 removida + 1 adicionada)
+        self.assertEqual(stats["churn"], 20 + 1 + 1 + 2)
+
+    def test_caminho_antigo_reaproveitado_nao_herda_o_historico(self):
+        self.write("a.py", BODY)
+        self.commit("cria a.py")
+        self.git("mv", "a.py", "b.py")
+        self.commit("renomeia para b.py")
+        # Um arquivo novo, sem relação com o antigo, no caminho liberado
+        self.write("a.py", "outro conteúdo\n")
+        self.commit("novo a.py")
+
+        history = file_history(self.repo)
+
+        self.assertEqual(history["b.py"]["commits"], 2)
+        self.assertEqual(history["a.py"]["commits"], 1)
+        self.assertEqual(history["a.py"]["churn"], 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+"""
+Testes de modules/scanner.py: o mesmo arquivo lido como str, bytes ou mmap gera os mesmos registros.
+
+Uso: python -m unittest tests.test_scanner (ou python -m pytest tests)
+"""
+import mmap
+import os
+import tempfile
+import unittest
+
+from modules.scanner import _iter_js_matches, scan
+from modules.symbols import code_text
+
+# Acentos, emoji e CJK antes e entre as construções deslocam as posições em bytes das posições em caracteres
+JS_SOURCE = """// Módulo de ações: configuração ☕ e 日本語
+import { formatar } from './utilitários/formatação';
+const LIMITE_MAXIMO = 10; // máximo por pedido
+const saudação = 'olá';
+function calcular(preço, quantidade) {
+  return preço * quantidade; // 🧮
+}
+const dobrar = (valor) => valor * 2;
+class Carrinho {}
+app.get('/pedidos/ação', handler);
+"""
+
+class NonAsciiSpanTest(unittest.TestCase):
+    def setUp(self):
+        self.data = JS_SOURCE.encode("utf-8")
+
+    def test_iter_js_matches_devolve_offsets_em_bytes(self):
+        matches = list(_iter_js_matches(self.data))
+        self.assertEqual([kind for kind, _ in matches], ["import", "constant", "function", "arrow", "class", "endpoint"])
+        # A posição do casamento já é o deslocamento no arquivo
+        kind, match = matches[2]
+        self.assertEqual(match.start(), self.data.index(b"function calcular"))
+
+    def test_spans_iguais_em_str_e_bytes(self):
+        self.assertEqual(scan(JS_SOURCE, "javascript"), scan(self.data, "javascript"))
+
+    def test_spans_recortam_a_construcao_nos_bytes(self):
+        analysis = scan(JS_SOURCE, "javascript")
+        self.assertEqual(code_text(self.data, analysis["imports"][0]),
+                         "import { formatar } from './utilitários/formatação'")
+        self.assertEqual(analysis["imports"][0].name, "./utilitários/formatação")
+        self.assertEqual(code_text(self.data, analysis["functions"][0]), "function calcular(preço, quantidade)")
+        self.assertEqual(analysis["functions"][0].args, ("preço", "quantidade"))
+        self.assertEqual([endpoint.path for endpoint in analysis["endpoints"]], ["/pedidos/ação"])
+
+    def test_mmap_igual_a_str(self):
+        with tempfile.NamedTemporaryFile(suffix=".js", delete=False) as f:
+            f.write(self.data)
+        try:
+            with open(f.name, "rb") as source, mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                self.assertEqual(scan(mapped, "javascript"), scan(JS_SOURCE, "javascript"))
+        finally:
+            os.remove(f.name)
+
+# Identificadores com letras fora do ASCII: o mesmo arquivo lido como str (arquivos pequenos) ou mmap
+# (a partir de MMAP_THRESHOLD em modules/code_analyzer.py) precisa gerar os mesmos símbolos
+NON_ASCII_SOURCES = {
+    "javascript": """function ação(preço) { return preço; }
+const somarÍtens = (itens) => itens.length;
+class Coração {}
+""",
+    "java": """public class Pedido {
+    public static final int LIMITE = 3;
+    public int calcularPreço(int quantidade) { return quantidade; }
+}
+class Ação {}
+""",
+}
+
+class NonAsciiIdentifierTest(unittest.TestCase):
+    def scan_all_forms(self, source, language):
+        data = source.encode("utf-8")
+        with tempfile.NamedTemporaryFile(delete=False) as f:
+            f.write(data)
+        try:
+            with open(f.name, "rb") as raw, mmap.mmap(raw.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                from_mmap = scan(mapped, language)
+        finally:
+            os.remove(f.name)
+        return scan(source, language), scan(data, language), from_mmap
+
+    def test_js_str_bytes_e_mmap_concordam(self):
+        from_str, from_bytes, from_mmap = self.scan_all_forms(NON_ASCII_SOURCES["javascript"], "javascript")
+        self.assertEqual(from_str, from_bytes)
+        self.assertEqual(from_str, from_mmap)
+        self.assertEqual([function.name for function in from_str["functions"]], ["ação", "somarÍtens"])
+        self.assertEqual(from_str["functions"][0].args, ("preço",))
+        self.assertEqual([cls.name for cls in from_str["classes"]], ["Coração"])
+
+    def test_java_str_bytes_e_mmap_concordam(self):
+        from_str, from_bytes, from_mmap = self.scan_all_forms(NON_ASCII_SOURCES["java"], "java")
+        self.assertEqual(from_str, from_bytes)
+        self.assertEqual(from_str, from_mmap)
+        self.assertEqual([function.name for function in from_str["functions"]], ["calcularPreço"])
+        self.assertEqual([cls.name for cls in from_str["classes"]], ["Pedido", "Ação"])
+        self.assertEqual([constant.name for constant in from_str["constants"]], ["LIMITE"])
+
+if __name__ == "__main__":
+    unittest.main()
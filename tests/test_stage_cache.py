@@ -0,0 +1,65 @@
+"""
+Testes do cache de etapas (modules/stage_cache.py) pelos subcomandos de main.py.
+
+Uso: python -m unittest tests.test_stage_cache (ou python -m pytest tests)
+"""
+import contextlib
+import io
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+import main
+from modules import stage_cache
+
+class StageCacheCwdTest(unittest.TestCase):
+    """As etapas rodadas de diretórios diferentes para o mesmo repositório compartilham o cache."""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp(prefix="stage-cache-")
+        self.repo = os.path.join(self.root, "mono")
+        os.makedirs(os.path.join(self.repo, "lib"))
+        with open(os.path.join(self.repo, "lib", "util.js"), "w", encoding="utf-8") as f:
+            f.write("export function somar(a, b) {\n  return a + b;\n}\n")
+        env = dict(os.environ, GIT_AUTHOR_NAME="Ana", GIT_AUTHOR_EMAIL="ana@exemplo.com",
+                   GIT_COMMITTER_NAME="Ana", GIT_COMMITTER_EMAIL="ana@exemplo.com")
+        for args in (["init", "-q"], ["add", "-A"], ["commit", "-q", "-m", "inicial"]):
+            subprocess.run(["git", *args], cwd=self.repo, env=env, check=True, capture_output=True)
+        self.stage_dir = stage_cache.STAGE_DIR
+        stage_cache.STAGE_DIR = os.path.join(self.root, "stages")
+        self.cwd = os.getcwd()
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        stage_cache.STAGE_DIR = self.stage_dir
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def run_cli(self, cwd, *argv):
+        os.chdir(cwd)
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out), contextlib.redirect_stderr(io.StringIO()):
+            with self.assertRaises(SystemExit) as exit_status:
+                main.main(list(argv))
+        self.assertIn(exit_status.exception.code, (0, None))
+        return out.getvalue()
+
+    def test_prompt_de_outro_diretorio_reaproveita_caminhos_validos(self):
+        self.run_cli(self.repo, "classify", ".")
+        self.run_cli(self.repo, "analyze", ".")
+        self.assertTrue(os.listdir(stage_cache.STAGE_DIR))
+
+        prompt = self.run_cli(self.root, "prompt", self.repo)
+
+        self.assertIn("lib/util.js", prompt)
+        self.assertNotIn("../", prompt)
+        self.assertIn("function somar(a, b)", prompt)
+
+    def test_relativo_e_absoluto_usam_a_mesma_entrada(self):
+        self.run_cli(self.root, "classify", "mono")
+        self.run_cli(self.repo, "classify", ".")
+        self.assertEqual(len(os.listdir(stage_cache.STAGE_DIR)), 1)
+
+if __name__ == "__main__":
+    unittest.main()